@@ -15,6 +15,8 @@ from app.auth.models import User
 from app.products.models import Product
 from app.cart.models import CartItem
 from app.orders.models import Order, OrderItem
+from app.mail.models import OutboxEmail
+from app.inventory.models import Reservation, StockBucket
 
 # Alembic Config
 config = context.config
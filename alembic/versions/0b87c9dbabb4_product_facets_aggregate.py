@@ -0,0 +1,55 @@
+"""product facets aggregate
+
+Revision ID: 0b87c9dbabb4
+Revises: 5c0e7a9d41b3
+Create Date: 2026-10-18 12:20:05.114873
+
+"""
+import math
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b87c9dbabb4'
+down_revision: Union[str, None] = '5c0e7a9d41b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    facets = op.create_table(
+        "product_facets",
+        sa.Column("category", sa.String(), nullable=False),
+        sa.Column("price_bucket", sa.Integer(), nullable=False),
+        sa.Column("product_count", sa.Integer(), nullable=False),
+        sa.Column("min_price", sa.Float(), nullable=False),
+        sa.Column("max_price", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("category", "price_bucket"),
+        if_not_exists=True,
+    )
+
+    # Backfill from the existing catalog (same logic as app.products.facets.rebuild).
+    width = settings.FACET_PRICE_BUCKET_WIDTH
+    cells = {}
+    for category, price in op.get_bind().execute(sa.text("SELECT category, price FROM products")):
+        key = (category or "", math.floor(price / width))
+        count, low, high = cells.get(key, (0, price, price))
+        cells[key] = (count + 1, min(low, price), max(high, price))
+    op.execute(facets.delete())
+    if cells:
+        op.bulk_insert(facets, [
+            {"category": category, "price_bucket": bucket, "product_count": count,
+             "min_price": low, "max_price": high}
+            for (category, bucket), (count, low, high) in cells.items()
+        ])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("product_facets")
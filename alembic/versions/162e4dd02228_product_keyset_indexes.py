@@ -0,0 +1,40 @@
+"""product keyset pagination indexes
+
+Revision ID: 162e4dd02228
+Revises: 342ab15dbc5b
+Create Date: 2026-10-18 10:12:41.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '162e4dd02228'
+down_revision: Union[str, None] = '342ab15dbc5b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keyset cursors compare (stock, id) row values, so stock can't be NULL.
+    op.execute("UPDATE products SET stock = 0 WHERE stock IS NULL")
+    with op.batch_alter_table("products") as batch_op:
+        batch_op.alter_column("stock", existing_type=sa.Integer(), nullable=False, server_default="0")
+
+    op.create_index("ix_products_price_id", "products", ["price", "id"], if_not_exists=True)
+    op.create_index("ix_products_name_id", "products", ["name", "id"], if_not_exists=True)
+    op.create_index("ix_products_stock_id", "products", ["stock", "id"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_products_stock_id", table_name="products", if_exists=True)
+    op.drop_index("ix_products_name_id", table_name="products", if_exists=True)
+    op.drop_index("ix_products_price_id", table_name="products", if_exists=True)
+
+    with op.batch_alter_table("products") as batch_op:
+        batch_op.alter_column("stock", existing_type=sa.Integer(), nullable=True, server_default=None)
@@ -0,0 +1,49 @@
+"""unique cart (user_id, product_id)
+
+Revision ID: 2f7dc8a5b0e6
+Revises: 0b87c9dbabb4
+Create Date: 2026-10-18 13:02:48.530219
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2f7dc8a5b0e6'
+down_revision: Union[str, None] = '0b87c9dbabb4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Fold duplicate lines left by the old read-then-write add_to_cart into
+    # the oldest row before the constraint can be added.
+    op.execute("""
+        UPDATE cart SET quantity = (
+            SELECT SUM(dup.quantity) FROM cart dup
+            WHERE dup.user_id = cart.user_id AND dup.product_id = cart.product_id
+        )
+        WHERE id IN (
+            SELECT MIN(id) FROM cart GROUP BY user_id, product_id HAVING COUNT(*) > 1
+        )
+    """)
+    op.execute("""
+        DELETE FROM cart WHERE id NOT IN (
+            SELECT MIN(id) FROM cart GROUP BY user_id, product_id
+        )
+    """)
+    # Databases bootstrapped by create_all() may already have the constraint.
+    existing = {c["name"] for c in sa.inspect(op.get_bind()).get_unique_constraints("cart")}
+    if "uq_cart_user_product" not in existing:
+        with op.batch_alter_table("cart") as batch_op:
+            batch_op.create_unique_constraint("uq_cart_user_product", ["user_id", "product_id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("cart") as batch_op:
+        batch_op.drop_constraint("uq_cart_user_product", type_="unique")
@@ -0,0 +1,33 @@
+"""order history keyset and order item indexes
+
+Revision ID: 4a1f7c3e9b52
+Revises: 9d3e61f0c2a7
+Create Date: 2026-10-18 16:21:09.503117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4a1f7c3e9b52'
+down_revision: Union[str, None] = '9d3e61f0c2a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Orders created before created_at became a per-row default all share the
+    # process start time; id still breaks the tie in the history cursor.
+    op.create_index("ix_orders_user_id_created_at", "orders", ["user_id", "created_at", "id"], if_not_exists=True)
+    # selectinload / item-count subqueries look items up by order_id
+    op.create_index("ix_order_items_order_id", "order_items", ["order_id"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_order_items_order_id", table_name="order_items", if_exists=True)
+    op.drop_index("ix_orders_user_id_created_at", table_name="orders", if_exists=True)
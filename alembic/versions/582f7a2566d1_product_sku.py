@@ -0,0 +1,34 @@
+"""product sku natural key
+
+Revision ID: 582f7a2566d1
+Revises: 2f7dc8a5b0e6
+Create Date: 2026-10-18 13:47:12.660918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '582f7a2566d1'
+down_revision: Union[str, None] = '2f7dc8a5b0e6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Databases bootstrapped by create_all() may already have the column.
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("products")}
+    if "sku" not in columns:
+        op.add_column("products", sa.Column("sku", sa.String(), nullable=True))
+    op.create_index("ix_products_sku", "products", ["sku"], unique=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_products_sku", table_name="products")
+    with op.batch_alter_table("products") as batch_op:
+        batch_op.drop_column("sku")
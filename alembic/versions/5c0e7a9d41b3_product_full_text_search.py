@@ -0,0 +1,56 @@
+"""product full-text search
+
+Revision ID: 5c0e7a9d41b3
+Revises: 162e4dd02228
+Create Date: 2026-10-18 11:04:27.902615
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c0e7a9d41b3'
+down_revision: Union[str, None] = '162e4dd02228'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute("""
+            ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(category, '')), 'B') ||
+                setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+            ) STORED
+        """)
+        op.execute("CREATE INDEX IF NOT EXISTS ix_products_search_vector ON products USING gin (search_vector)")
+        op.execute("CREATE INDEX IF NOT EXISTS ix_products_name_trgm ON products USING gin (name gin_trgm_ops)")
+    elif dialect == "sqlite":
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+            "name, description, category, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        op.execute("DELETE FROM products_fts")
+        op.execute(
+            "INSERT INTO products_fts (rowid, name, description, category) "
+            "SELECT id, name, coalesce(description, ''), coalesce(category, '') FROM products"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_products_name_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_products_search_vector")
+        op.execute("ALTER TABLE products DROP COLUMN IF EXISTS search_vector")
+    elif dialect == "sqlite":
+        op.execute("DROP TABLE IF EXISTS products_fts")
@@ -0,0 +1,40 @@
+"""updated_at on products and orders for incremental exports
+
+Revision ID: 9d3e61f0c2a7
+Revises: 582f7a2566d1
+Create Date: 2026-10-18 15:02:41.318274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3e61f0c2a7'
+down_revision: Union[str, None] = '582f7a2566d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ("products", "orders")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    for table in TABLES:
+        # Databases bootstrapped by create_all() may already have the column.
+        if "updated_at" not in {column["name"] for column in inspector.get_columns(table)}:
+            op.add_column(table, sa.Column("updated_at", sa.DateTime(), nullable=True))
+            # Existing rows count as changed now, so the first incremental export picks them up.
+            op.execute(f"UPDATE {table} SET updated_at = CURRENT_TIMESTAMP")
+        op.create_index(f"ix_{table}_updated_at", table, ["updated_at"], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        op.drop_index(f"ix_{table}_updated_at", table_name=table)
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column("updated_at")
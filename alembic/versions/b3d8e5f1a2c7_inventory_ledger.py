@@ -0,0 +1,61 @@
+"""inventory ledger
+
+Revision ID: b3d8e5f1a2c7
+Revises: 7e2b90d4a6c1
+Create Date: 2026-10-18 21:12:08.530914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3d8e5f1a2c7'
+down_revision: Union[str, None] = '7e2b90d4a6c1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "inventory_buckets",
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("bucket", sa.Integer(), nullable=False),
+        sa.Column("available", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["product_id"], ["products.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("product_id", "bucket"),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "inventory_reservations",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("bucket", sa.Integer(), nullable=True),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("order_id", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.ForeignKeyConstraint(["order_id"], ["orders.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_inventory_reservations_due", "inventory_reservations", ["status", "expires_at"], if_not_exists=True
+    )
+    op.create_index(
+        "ix_inventory_reservations_user", "inventory_reservations", ["user_id", "status"], if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_inventory_reservations_user", table_name="inventory_reservations", if_exists=True)
+    op.drop_index("ix_inventory_reservations_due", table_name="inventory_reservations", if_exists=True)
+    op.drop_table("inventory_reservations")
+    op.drop_table("inventory_buckets")
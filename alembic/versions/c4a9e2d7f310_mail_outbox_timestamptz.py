@@ -0,0 +1,41 @@
+"""mail outbox timestamps with time zone
+
+Revision ID: c4a9e2d7f310
+Revises: b3d8e5f1a2c7
+Create Date: 2026-10-18 20:31:08.512947
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a9e2d7f310'
+down_revision: Union[str, None] = 'b3d8e5f1a2c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = ("next_attempt_at", "created_at", "sent_at")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Only PostgreSQL has a separate type; SQLite stores the same text either way.
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    # The naive values were written in the session TimeZone, which is also what
+    # the implicit timestamp -> timestamptz cast assumes: run this with the app's.
+    for column in COLUMNS:
+        op.alter_column("mail_outbox", column, type_=sa.DateTime(timezone=True),
+                        existing_type=sa.DateTime(), existing_nullable=column != "next_attempt_at")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for column in COLUMNS:
+        op.alter_column("mail_outbox", column, type_=sa.DateTime(),
+                        existing_type=sa.DateTime(timezone=True), existing_nullable=column != "next_attempt_at")
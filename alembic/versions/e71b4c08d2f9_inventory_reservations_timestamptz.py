@@ -0,0 +1,40 @@
+"""inventory reservation timestamps with time zone
+
+Revision ID: e71b4c08d2f9
+Revises: c4a9e2d7f310
+Create Date: 2026-10-18 21:02:44.180361
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e71b4c08d2f9'
+down_revision: Union[str, None] = 'c4a9e2d7f310'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = ("expires_at", "created_at")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Only PostgreSQL has a separate type; SQLite stores the same text either way.
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    # As in c4a9e2d7f310: the cast reads the naive values in the session TimeZone.
+    for column in COLUMNS:
+        op.alter_column("inventory_reservations", column, type_=sa.DateTime(timezone=True),
+                        existing_type=sa.DateTime(), existing_nullable=column != "expires_at")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for column in COLUMNS:
+        op.alter_column("inventory_reservations", column, type_=sa.DateTime(),
+                        existing_type=sa.DateTime(timezone=True), existing_nullable=column != "expires_at")
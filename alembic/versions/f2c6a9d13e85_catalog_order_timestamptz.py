@@ -0,0 +1,40 @@
+"""product / order timestamps with time zone
+
+Revision ID: f2c6a9d13e85
+Revises: e71b4c08d2f9
+Create Date: 2026-10-18 21:24:09.637201
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c6a9d13e85'
+down_revision: Union[str, None] = 'e71b4c08d2f9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = (("products", "updated_at"), ("orders", "created_at"), ("orders", "updated_at"))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Only PostgreSQL has a separate type; SQLite stores the same text either way.
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    # As in c4a9e2d7f310: the cast reads the naive values in the session TimeZone.
+    for table, column in COLUMNS:
+        op.alter_column(table, column, type_=sa.DateTime(timezone=True),
+                        existing_type=sa.DateTime(), existing_nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for table, column in COLUMNS:
+        op.alter_column(table, column, type_=sa.DateTime(),
+                        existing_type=sa.DateTime(timezone=True), existing_nullable=True)
@@ -1,10 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from app.core.database import SessionLocal
+from app.core.database import get_db, run_db
 from . import schemas, models, utils
 from .schemas import UserSignin, TokenOut
 from app.auth.models import User
-from app.auth.utils import verify_password, create_access_token
+from app.auth.utils import create_access_token
 from app.auth.utils import get_current_user
 from fastapi.security import HTTPAuthorizationCredentials
 from jose import jwt
@@ -12,52 +12,56 @@ from app.core.config import settings
 from .schemas import ForgotPasswordRequest, ResetPasswordRequest
 from .utils import create_reset_token, verify_reset_token
 from app.auth.utils import send_reset_email
+from app.mail.outbox import mail_worker
 from app.core.logger import logger
+from app.core.ratelimit import RateLimit
 
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# bcrypt / SMTP behind these: per-IP limits shed abusive clients with a 429
+signup_limit = RateLimit("signup", per_minute=10, burst=5, concurrency=2)
+signin_limit = RateLimit("signin", per_minute=30, burst=10, concurrency=4)
+forgot_password_limit = RateLimit("forgot_password", per_minute=5, burst=3, concurrency=1)
 
-@router.post("/signup", response_model=schemas.UserOut)
-def signup(user_data: schemas.UserSignup, db: Session = Depends(get_db)):
-    existing_user = db.query(models.User).filter(models.User.email == user_data.email).first()
+@router.post("/signup", response_model=schemas.UserOut, dependencies=[Depends(signup_limit)])
+async def signup(user_data: schemas.UserSignup, db: Session = Depends(get_db)):
+    existing_user = await run_db(db, utils.get_user_by_email, user_data.email)
     if existing_user:
-        logger.info(f"User Already Exists During Signup: {user_data.email}")
+        logger.info("Signup for an already registered email (user %s)", existing_user.id)
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_password = utils.hash_password(user_data.password)
+    hashed_password = await utils.hash_password_async(user_data.password)
     new_user = models.User(
         name=user_data.name,
         email=user_data.email,
         hashed_password=hashed_password,
         role=user_data.role
     )
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    logger.info(f"New signup: {user_data.email}")
+
+    def _create(session: Session):
+        session.add(new_user)
+        session.commit()
+        session.refresh(new_user)
+
+    await run_db(db, _create)
+    logger.info("New signup: user %s", new_user.id)
     return new_user
 
-@router.post("/signin", response_model=TokenOut)
-def signin(user_cred: UserSignin, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == user_cred.email).first()
+@router.post("/signin", response_model=TokenOut, dependencies=[Depends(signin_limit)])
+async def signin(user_cred: UserSignin, db: Session = Depends(get_db)):
+    user = await run_db(db, utils.get_user_by_email, user_cred.email)
 
-    if not user or not verify_password(user_cred.password, user.hashed_password):
-        logger.warning(f"Failed login attempt for {user_cred.email}")
+    if not user or not await utils.verify_password_async(user_cred.password, user.hashed_password):
+        logger.warning("Failed login attempt for user %s", user.id if user else "(unknown email)")
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
-    token = create_access_token(data={"sub": user.email, "role": user.role})
-    logger.info(f"User logged in: {user.email}")
+    token = create_access_token(data={"sub": user.email, "uid": user.id, "role": user.role})
+    logger.info("User logged in: %s", user.id)
     return {"access_token": token, "token_type": "bearer"}
 
 @router.get("/profile")
-def get_my_profile(current_user: User = Depends(get_current_user)):
+async def get_my_profile(current_user: User = Depends(get_current_user)):
     return {
         "id": current_user.id,
         "name": current_user.name,
@@ -74,29 +78,36 @@ def read_profile(token: HTTPAuthorizationCredentials = Depends(utils.oauth2_sche
 
 
 # //reset routes
-@router.post("/forgot-password")
-def forgot_password(request: ForgotPasswordRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == request.email).first()
+@router.post("/forgot-password", dependencies=[Depends(forgot_password_limit)])
+async def forgot_password(request: ForgotPasswordRequest, db: Session = Depends(get_db)):
+    user = await run_db(db, utils.get_user_by_email, request.email)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
     token = create_reset_token(user.email)
-    send_reset_email(user.email, token)
-    logger.info(f"Password reset requested for {request.email}")
+
+    def _queue(session: Session):
+        send_reset_email(session, user.email, token)
+        session.commit()
+
+    # Delivery (and retries) happen in the mail worker, not in this request.
+    await run_db(db, _queue)
+    mail_worker.notify()
+    logger.info("Password reset requested for user %s", user.id)
     return {"message": "Reset email sent"}
 
 
 @router.post("/reset-password")
-def reset_password(request: ResetPasswordRequest, db: Session = Depends(get_db)):
+async def reset_password(request: ResetPasswordRequest, db: Session = Depends(get_db)):
     email = verify_reset_token(request.token)
     if not email:
         raise HTTPException(status_code=400, detail="Invalid or expired token")
 
-    user = db.query(User).filter(User.email == email).first()
+    user = await run_db(db, utils.get_user_by_email, email)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    user.hashed_password = utils.hash_password(request.new_password)
-    db.commit()
-    logger.info(f"Password reset completed for {email}")
+    user.hashed_password = await utils.hash_password_async(request.new_password)
+    await run_db(db, Session.commit)  # also drops the cached principal (after_commit hook)
+    logger.info("Password reset completed for user %s", user.id)
     return {"message": "Password reset successful"}
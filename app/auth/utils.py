@@ -1,29 +1,33 @@
 # app/auth/utils.py
-from passlib.context import CryptContext
 from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
 from app.core.config import settings
-from fastapi import Depends, HTTPException, Security
+from app.auth.hashing import PasswordHasherPool, hash_password, verify_password
+from fastapi import Depends, HTTPException, Request, Security
 from fastapi.security import HTTPBearer
+from sqlalchemy import event, inspect
 from sqlalchemy.orm import Session
-from app.auth.models import User
-from app.core.database import SessionLocal
+from app.auth.models import RoleEnum, User
+from app.core.cache import TTLCache
+from app.core.database import get_db, run_db
+from dataclasses import dataclass
 from fastapi.security import HTTPAuthorizationCredentials
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+from app.mail.outbox import enqueue
 
 
 oauth2_scheme = HTTPBearer()
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+password_pool = PasswordHasherPool(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
 
-def hash_password(password: str):
-    return pwd_context.hash(password)
+async def hash_password_async(password: str):
+    return await password_pool.run(hash_password, password)
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password_async(plain_password, hashed_password):
+    return await password_pool.run(verify_password, plain_password, hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: timedelta = timedelta(minutes=30)):
@@ -33,37 +37,114 @@ def create_access_token(data: dict, expires_delta: timedelta = timedelta(minutes
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+def get_user_by_email(db: Session, email: str):
+    return db.query(User).filter(User.email == email).first()
 
-def get_current_user(
-    token: HTTPAuthorizationCredentials = Security(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated caller: just what authorization and the handlers need."""
+    id: int
+    email: str
+    role: str
+
+
+# Keyed by token subject (email). Invalidated whenever a commit changes a
+# users row, e.g. reset_password or a role change; other workers catch up
+# within the TTL.
+principal_cache = TTLCache(maxsize=settings.AUTH_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL)
+
+
+def invalidate_principal(email: str):
+    principal_cache.pop(email)
+
+
+# Flushes only note the emails whose users rows changed; the cache drops them
+# once the transaction commits. Dropping them at flush time would let a request
+# running before the commit cache the old row again, and a rollback changes
+# nothing, so it just forgets the notes.
+@event.listens_for(Session, "after_flush")
+def _note_changed_users(session, flush_context):
+    for user in (*session.dirty, *session.deleted):
+        if isinstance(user, User):
+            emails = session.info.setdefault("changed_user_emails", set())
+            emails.add(user.email)
+            emails.update(inspect(user).attrs.email.history.deleted)  # old key after an email change
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    for email in session.info.pop("changed_user_emails", ()):
+        invalidate_principal(email)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session):
+    session.info.pop("changed_user_emails", None)
+
+
+def decode_access_token(token: HTTPAuthorizationCredentials) -> dict:
     try:
         payload = jwt.decode(token.credentials, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email = payload.get("sub")
-        if email is None:
+        if payload.get("sub") is None:
             raise HTTPException(status_code=401, detail="Invalid token")
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    return payload
+
+
+def token_user(request: Request):
+    """uid (else sub) claim of a valid bearer token, without a database lookup."""
+    scheme, _, credentials = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not credentials:
+        return None
+    try:
+        payload = jwt.decode(credentials, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    return payload.get("uid") or payload.get("sub")
+
+
+async def get_current_principal(
+    token: HTTPAuthorizationCredentials = Security(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> Principal:
+    payload = decode_access_token(token)
+    email = payload["sub"]
+
+    # Claims-only fast path: the token already carries id and role.
+    if settings.AUTH_CLAIMS_ONLY and "uid" in payload and "role" in payload:
+        return Principal(id=payload["uid"], email=email, role=payload["role"])
+
+    principal = principal_cache.get(email)
+    if principal is None:
+        user = await run_db(db, get_user_by_email, email)
+        if not user:
+            raise HTTPException(status_code=401, detail="User not found")
+        principal = Principal(id=user.id, email=user.email, role=RoleEnum(user.role).value)
+        principal_cache.set(email, principal)
+    return principal
 
-    user = db.query(User).filter(User.email == email).first()
+
+async def get_current_user(
+    token: HTTPAuthorizationCredentials = Security(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> User:
+    """Full users row, for the few routes that need more than a Principal."""
+    email = decode_access_token(token)["sub"]
+
+    user = await run_db(db, get_user_by_email, email)
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
 
     return user
 
-def require_admin(current_user: User = Depends(get_current_user)):
+async def require_admin(current_user: Principal = Depends(get_current_principal)):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     return current_user
 
-def require_user(current_user: User = Depends(get_current_user)):
+async def require_user(current_user: Principal = Depends(get_current_principal)):
     if current_user.role != "user":
         raise HTTPException(status_code=403, detail="Only regular users are allowed")
     return current_user
@@ -81,26 +162,12 @@ def verify_reset_token(token: str):
     except JWTError:
         return None
 
-def send_reset_email(to_email: str, token: str):
-    msg = MIMEMultipart()
-    msg['From'] = settings.EMAIL_USER
-    msg['To'] = to_email
-    msg['Subject'] = 'Password Reset Request'
-
+def send_reset_email(db: Session, to_email: str, token: str):
+    """Queue the reset mail in the outbox; it goes out once the caller commits."""
     reset_link = f"http://localhost:8000/auth/reset-password?token={token}"
     body = f"""Hi 👋,<br><br>
 You requested a password reset. Click the link below to reset your password:<br>
 <a href="{reset_link}">{reset_link}</a><br><br>
 If you didn't request this, please ignore this email.
 """
-
-    msg.attach(MIMEText(body, 'html'))
-
-    try:
-        with smtplib.SMTP(settings.EMAIL_HOST, settings.EMAIL_PORT) as server:
-            server.starttls()
-            server.login(settings.EMAIL_USER, settings.EMAIL_PASSWORD)
-            server.sendmail(settings.EMAIL_USER, to_email, msg.as_string())
-    except Exception as e:
-        print(f"Failed to send email: {e}")
-        raise HTTPException(status_code=500, detail="Failed to send email")
+    return enqueue(db, to_email, 'Password Reset Request', body)
@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy import Column, Integer, ForeignKey, UniqueConstraint
 from app.core.database import Base
 
 from sqlalchemy.orm import relationship
 
 class CartItem(Base):
     __tablename__ = "cart"
+    __table_args__ = (
+        # one row per product per user; also the conflict target of the cart upserts
+        UniqueConstraint("user_id", "product_id", name="uq_cart_user_product"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
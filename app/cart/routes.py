@@ -1,94 +1,246 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import delete, func, literal, select, update
 from sqlalchemy.orm import Session
-from app.core.database import SessionLocal
+from app.core.database import dialect_insert, get_db, run_db
+from app.core.serialization import FastJSONResponse, schema_columns
+from app.products.models import Product
+from app.inventory.models import Reservation
 from app.cart import models, schemas
-from app.auth.utils import require_user
-from app.auth.models import User
+from app.auth.utils import Principal, require_user
 from app.cart.schemas import CartItemOut
-from typing import List
-from app.core.logger import logger
+from app.products.schemas import ProductOut
+from typing import List, Union
+from app.core.logger import SAMPLED, logger
 
 router = APIRouter(prefix="/cart", tags=["Cart"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/", response_model=schemas.CartOut)
-def add_to_cart(
+async def add_to_cart(
     item: schemas.CartAdd,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_user)
+    current_user: Principal = Depends(require_user)
 ):
-    cart_item = db.query(models.CartItem).filter_by(
-        user_id=current_user.id, product_id=item.product_id
-    ).first()
-
-    if cart_item:
-        cart_item.quantity += item.quantity
-    else:
-        cart_item = models.CartItem(
-            user_id=current_user.id,
-            product_id=item.product_id,
-            quantity=item.quantity
+    # Single round trip: INSERT ... SELECT FROM products (so unknown products
+    # insert nothing) ON CONFLICT (user_id, product_id) DO UPDATE ... RETURNING.
+    # Parallel adds can neither race nor duplicate the row.
+    def _add(session: Session):
+        source = select(
+            literal(current_user.id), Product.id, literal(item.quantity)
+        ).where(Product.id == item.product_id)
+        stmt = dialect_insert(session, models.CartItem).from_select(
+            ["user_id", "product_id", "quantity"], source
         )
-        logger.info(f"Added to cart: product {item.product_id} x{item.quantity} by {current_user.email}")
-        db.add(cart_item)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "product_id"],
+            set_={"quantity": models.CartItem.quantity + stmt.excluded.quantity}
+        ).returning(models.CartItem.id, models.CartItem.product_id, models.CartItem.quantity)
+
+        cart_item = session.execute(stmt).first()
+        if not cart_item:
+            raise HTTPException(status_code=404, detail="Product not found")
+        session.commit()
+        return cart_item._asdict()
 
-    db.commit()
-    db.refresh(cart_item)
+    cart_item = await run_db(db, _add)
+    logger.info("Added to cart: product %s x%s by user %s", item.product_id, item.quantity, current_user.id)
     return cart_item
 
 
-# view_cart
-@router.get("/", response_model=List[CartItemOut])
-def get_cart(
+PRODUCT_COLUMNS = schema_columns(Product, ProductOut)
+PRODUCT_FIELDS = tuple(ProductOut.model_fields)
+LINE_SUBTOTAL = models.CartItem.quantity * Product.price
+
+
+def load_cart(session: Session, user_id: int, product_id: int = None) -> dict:
+    # One joined query: plain columns per line, shaped straight into
+    # CartItemOut dicts (no ORM entities, no per-row validation), with the
+    # subtotals and the cart totals (window aggregates) computed in SQL.
+    # A user's own checkout holds are already out of products.stock, so
+    # they count as available to that user.
+    held = select(Reservation.product_id, func.sum(Reservation.quantity).label("quantity"))\
+        .where(Reservation.user_id == user_id, Reservation.status == "held")\
+        .group_by(Reservation.product_id).subquery()
+    query = (
+        select(
+            models.CartItem.id, models.CartItem.quantity, LINE_SUBTOTAL,
+            Product.stock + func.coalesce(held.c.quantity, 0) >= models.CartItem.quantity,
+            func.count().over(), func.sum(models.CartItem.quantity).over(), func.sum(LINE_SUBTOTAL).over(),
+            *PRODUCT_COLUMNS,
+        )
+        .join(Product, Product.id == models.CartItem.product_id)
+        .outerjoin(held, held.c.product_id == models.CartItem.product_id)
+        .where(models.CartItem.user_id == user_id)
+        .order_by(models.CartItem.id)
+    )
+    if product_id is not None:
+        query = query.where(models.CartItem.product_id == product_id)
+    rows = session.execute(query).all()
+    items = [
+        {"id": row[0], "quantity": row[1], "subtotal": row[2], "in_stock": bool(row[3]),
+         "product": dict(zip(PRODUCT_FIELDS, row[7:]))}
+        for row in rows
+    ]
+    first = rows[0] if rows else (None,) * 4 + (0, 0, 0.0)
+    return {
+        "items": items,
+        "item_count": first[4],
+        "total_quantity": first[5],
+        "total": first[6],
+        "all_in_stock": all(item["in_stock"] for item in items),
+    }
+
+
+def _line_columns(user_id: int) -> tuple:
+    """load_cart's line columns for RETURNING from an UPDATE of cart_items."""
+    def of_product(column):
+        return select(column).where(Product.id == models.CartItem.product_id)\
+            .correlate(models.CartItem).scalar_subquery()
+
+    held = select(func.coalesce(func.sum(Reservation.quantity), 0))\
+        .where(Reservation.user_id == user_id, Reservation.status == "held",
+               Reservation.product_id == models.CartItem.product_id)\
+        .correlate(models.CartItem).scalar_subquery()
+    return (
+        models.CartItem.id, models.CartItem.quantity, models.CartItem.quantity * of_product(Product.price),
+        of_product(Product.stock) + held >= models.CartItem.quantity,
+        *(of_product(getattr(Product, field)) for field in PRODUCT_FIELDS),
+    )
+
+
+# bulk sync / guest-cart merge
+@router.post("/batch", response_model=List[CartItemOut])
+async def batch_update_cart(
+    batch: schemas.CartBatch,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_user)
+):
+    quantities = {}
+    for line in batch.items:
+        quantities[line.product_id] = quantities.get(line.product_id, 0) + line.quantity
+
+    # One transaction: validate every id with one query, (replace) drop the
+    # other lines, upsert all lines as one multi-row statement, read back.
+    def _apply(session: Session):
+        if quantities:
+            found = set(session.execute(
+                select(Product.id).where(Product.id.in_(quantities))
+            ).scalars())
+            missing = sorted(set(quantities) - found)
+            if missing:
+                raise HTTPException(status_code=404, detail=f"Products not found: {missing}")
+
+        if batch.mode == schemas.CartBatchMode.replace:
+            session.execute(
+                delete(models.CartItem)
+                .where(models.CartItem.user_id == current_user.id, models.CartItem.product_id.not_in(quantities))
+                .execution_options(synchronize_session=False)
+            )
+
+        if quantities:
+            stmt = dialect_insert(session, models.CartItem)
+            new_quantity = stmt.excluded.quantity
+            if batch.mode == schemas.CartBatchMode.merge:
+                new_quantity = models.CartItem.quantity + stmt.excluded.quantity
+            session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["user_id", "product_id"], set_={"quantity": new_quantity}
+                ),
+                [
+                    {"user_id": current_user.id, "product_id": product_id, "quantity": quantity}
+                    for product_id, quantity in sorted(quantities.items())
+                ],
+            )
+
+        session.commit()
+        return load_cart(session, current_user.id)["items"]
+
+    cart_items = await run_db(db, _apply)
+    logger.info("Cart batch (%s, %s lines) by user %s", batch.mode.value, len(quantities), current_user.id)
+    return FastJSONResponse(cart_items)
+
+
+# view_cart; totals=true wraps the lines with the cart totals (CartView)
+@router.get("/", response_model=Union[List[CartItemOut], schemas.CartView])
+async def get_cart(
+    totals: bool = Query(default=False, description="items plus SQL-computed totals instead of the bare list"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_user)
+    current_user: Principal = Depends(require_user)
 ):
-    cart_items = db.query(models.CartItem).filter_by(user_id=current_user.id).all()
-    logger.info(f"Cart viewed by: {current_user.email}")
-    return cart_items
+    cart = await run_db(db, load_cart, current_user.id)
+    logger.info("Cart viewed by user %s", current_user.id, extra=SAMPLED)
+    return FastJSONResponse(cart if totals else cart["items"])
+
+# header badge: one aggregate row, no product columns
+@router.get("/summary", response_model=schemas.CartSummary)
+async def get_cart_summary(
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_user)
+):
+    def _query(session: Session):
+        row = session.execute(
+            select(
+                func.count(models.CartItem.id),
+                func.coalesce(func.sum(models.CartItem.quantity), 0),
+                func.coalesce(func.sum(LINE_SUBTOTAL), 0.0),
+            )
+            .join(Product, Product.id == models.CartItem.product_id)
+            .where(models.CartItem.user_id == current_user.id)
+        ).one()
+        return {"item_count": row[0], "total_quantity": row[1], "total": row[2]}
+
+    return FastJSONResponse(await run_db(db, _query))
 
 # update_quantity
 @router.put("/{product_id}", response_model=schemas.CartItemOut)
-def update_cart_item(
+async def update_cart_item(
     product_id: int,
     item: schemas.CartAdd,  
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_user)
+    current_user: Principal = Depends(require_user)
 ):
-    cart_item = db.query(models.CartItem).filter_by(
-        user_id=current_user.id, product_id=product_id
-    ).first()
+    # One statement: the UPDATE returns the line the way the cart view shapes
+    # it. SQLite can't return columns of an UPDATE ... FROM table, so the
+    # product columns come from correlated subqueries (primary key lookups).
+    def _update(session: Session):
+        row = session.execute(
+            update(models.CartItem)
+            .where(models.CartItem.user_id == current_user.id, models.CartItem.product_id == product_id)
+            .values(quantity=item.quantity)
+            .returning(*_line_columns(current_user.id))
+            .execution_options(synchronize_session=False)
+        ).first()
 
-    if not cart_item:
-        raise HTTPException(status_code=404, detail="Cart item not found")
+        if not row:
+            raise HTTPException(status_code=404, detail="Cart item not found")
 
-    cart_item.quantity = item.quantity
-    db.commit()
-    db.refresh(cart_item)
-    logger.info(f"Cart item updated by: {current_user.email}")
-    return cart_item
+        session.commit()
+        return {"id": row[0], "quantity": row[1], "subtotal": row[2], "in_stock": bool(row[3]),
+                "product": dict(zip(PRODUCT_FIELDS, row[4:]))}
+
+    cart_item = await run_db(db, _update)
+    logger.info("Cart item %s updated by user %s", product_id, current_user.id)
+    return FastJSONResponse(cart_item)
 
 # delete_cart_product
 @router.delete("/{product_id}")
-def remove_from_cart(
+async def remove_from_cart(
     product_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_user)
+    current_user: Principal = Depends(require_user)
 ):
-    cart_item = db.query(models.CartItem).filter_by(
-        user_id=current_user.id, product_id=product_id
-    ).first()
+    def _remove(session: Session):
+        removed = session.execute(
+            delete(models.CartItem)
+            .where(models.CartItem.user_id == current_user.id, models.CartItem.product_id == product_id)
+            .returning(models.CartItem.id)
+            .execution_options(synchronize_session=False)
+        ).first()
+
+        if not removed:
+            raise HTTPException(status_code=404, detail="Item not found in cart")
 
-    if not cart_item:
-        raise HTTPException(status_code=404, detail="Item not found in cart")
+        session.commit()
 
-    db.delete(cart_item)
-    db.commit()
-    logger.info(f"Removed product {product_id} from cart by {current_user.email}")
+    await run_db(db, _remove)
+    logger.info("Removed product %s from cart by user %s", product_id, current_user.id)
     return {"message": "Item removed from cart"}
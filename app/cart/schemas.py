@@ -1,9 +1,11 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import List
+from enum import Enum
 from app.products.schemas import ProductOut
 
 class CartAdd(BaseModel):
     product_id: int
-    quantity: int
+    quantity: int = Field(..., gt=0)
 
 class CartOut(BaseModel):
     id: int
@@ -14,14 +16,39 @@ class CartOut(BaseModel):
         orm_mode = True
 
 
-class CartAdd(BaseModel):
-    product_id: int
-    quantity: int
-
 class CartItemOut(BaseModel):
     id: int
     quantity: int
     product: ProductOut  # nested product info
+    subtotal: float  # quantity * price
+    in_stock: bool  # stock (plus this user's own checkout holds) covers quantity
 
     class Config:
         orm_mode = True
+
+
+# totals are computed by the database, not the client
+class CartView(BaseModel):
+    items: List[CartItemOut]
+    item_count: int  # cart lines
+    total_quantity: int  # units across all lines
+    total: float
+    all_in_stock: bool
+
+class CartSummary(BaseModel):
+    item_count: int
+    total_quantity: int
+    total: float
+
+
+class CartBatchMode(str, Enum):
+    merge = "merge"      # add quantities to what is already in the cart
+    replace = "replace"  # the cart becomes exactly these lines
+
+class CartBatchItem(BaseModel):
+    product_id: int
+    quantity: int = Field(..., gt=0)
+
+class CartBatch(BaseModel):
+    mode: CartBatchMode = CartBatchMode.merge
+    items: List[CartBatchItem] = Field(default_factory=list, max_length=500)
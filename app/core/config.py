@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
+from typing import Dict, List, Optional, Union
 import os
 
 load_dotenv()  # Load .env
@@ -14,6 +15,94 @@ class Settings(BaseSettings):
     EMAIL_PORT: int = int(os.getenv("EMAIL_PORT", 587))
     EMAIL_USER: str = os.getenv("EMAIL_USER")
     EMAIL_PASSWORD: str = os.getenv("EMAIL_PASSWORD")
+    EMAIL_STARTTLS: bool = True  # off for a local relay such as aiosmtpd
 
-settings = Settings()
+    # App startup: "dev" runs create_all + search/facet setup on every start;
+    # "production" skips them and only checks the DB is at the alembic head
+    STARTUP_MODE: str = "dev"
+
+    # Outbound mail: mail_outbox table drained by a background worker
+    MAIL_WORKER: bool = True  # run the delivery worker in this process
+    MAIL_BATCH_SIZE: int = 50  # messages claimed per pass, sent over one connection
+    MAIL_MAX_ATTEMPTS: int = 8
+    MAIL_RETRY_BASE: float = 5.0  # seconds, doubled per failed attempt
+    MAIL_RETRY_MAX: float = 900.0
+    MAIL_POLL_INTERVAL: float = 10.0  # also picks up mail queued by other processes
+    MAIL_SMTP_TIMEOUT: float = 10.0
+    MAIL_SMTP_IDLE_TIMEOUT: float = 60.0  # close the persistent SMTP connection when idle
+
+    # Logging: JSON lines written by a background QueueListener thread
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # or "text" for the plain one-line format
+    LOG_FILE: str = "logs/app.log"
+    LOG_ASYNC: bool = True  # false = handlers write in the calling thread
+    LOG_QUEUE_SIZE: int = 10000  # records beyond this are dropped, never waited for
+    LOG_SAMPLE_RATES: Dict[str, float] = {}  # e.g. {"INFO": 0.1}; only lines logged with extra=SAMPLED
+
+    # Browser origins allowed to call the API (CORS); empty = same-origin only.
+    # Responses expose X-Next-Cursor, X-Request-ID and Retry-After to their scripts
+    CORS_ORIGINS: List[str] = []  # JSON list, e.g. ["https://shop.example.com"]
+
+    # Prometheus metrics on GET /metrics (per-route latency, SQL per request)
+    METRICS_ENABLED: bool = True
+
+    # N+1 / slow-query detector (development, CI, staging): off / warn / strict
+    QUERY_WATCH: str = "off"
+    QUERY_WATCH_N_PLUS_ONE: int = 5  # same statement shape this often in one request
+    QUERY_WATCH_SLOW_MS: float = 200.0
+
+    # Authenticated-principal cache (per process) and claims-only auth
+    AUTH_CACHE_SIZE: int = 10000
+    AUTH_CACHE_TTL: float = 60.0
+    AUTH_CLAIMS_ONLY: bool = False  # trust uid/role token claims, skip the users lookup
+
+    # bcrypt runs in its own process pool; 0 workers = threadpool fallback
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 64  # queued + running before 503
 
+    # Rate limits (429 + Retry-After) on signup/signin/forgot-password/search;
+    # RATE_LIMITS overrides a route's numbers, e.g.
+    # {"signin": {"per_minute": 60, "burst": 20, "concurrency": 4, "key": "ip"}}
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"  # per process, or redis://host:6379/0 shared by all workers
+    RATE_LIMITS: Dict[str, Dict[str, Union[float, str]]] = {}
+
+    # Public catalog read cache (per process); size 0 disables it. An admin
+    # write clears only its own worker's cache: other workers can serve the
+    # old catalog for up to CATALOG_CACHE_TTL (+ DB_READ_YOUR_WRITES_SECONDS
+    # with read replicas, + CATALOG_CACHE_MAX_AGE in clients)
+    CATALOG_CACHE_SIZE: int = 1024
+    CATALOG_CACHE_TTL: float = 30.0
+    CATALOG_CACHE_MAX_AGE: int = 0  # Cache-Control max-age sent to clients
+
+    # Width of the price histogram buckets behind GET /products/facets
+    # (changing it requires `python -m app.products.facets --rebuild`)
+    FACET_PRICE_BUCKET_WIDTH: float = 500.0
+
+    # Inventory ledger: checkout holds stock for this long; the reaper returns
+    # expired holds and refreshes split products' products.stock copy
+    INVENTORY_HOLD_SECONDS: int = 600
+    INVENTORY_REAPER: bool = True  # run the reaper in this process
+    INVENTORY_REAP_INTERVAL: float = 5.0
+    INVENTORY_REAP_BATCH: int = 500
+
+    # Connection pool (applies to both the sync and the async engine)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800  # seconds; -1 disables
+    DB_POOL_PRE_PING: bool = True
+
+    # Read replicas for read-only endpoints (catalog reads, order history);
+    # a user's reads stay on the primary for a while after their own checkout,
+    # and all of a worker's reads after an admin catalog write in that worker
+    DATABASE_REPLICA_URLS: List[str] = []  # JSON list, e.g. ["postgresql://...@replica1/ecommerce_db"]
+    DB_REPLICA_SELECTION: str = "round_robin"  # or "least_connections"
+    DB_READ_YOUR_WRITES_SECONDS: float = 5.0  # longer than the worst replication lag
+    DB_REPLICA_RETRY_SECONDS: float = 30.0  # a failed replica is skipped this long
+
+    # Async DB mode: serve requests through an AsyncSession (asyncpg / aiosqlite)
+    DB_ASYNC: bool = False
+    ASYNC_DATABASE_URL: Optional[str] = None  # derived from DATABASE_URL when unset
+
+settings = Settings()
@@ -0,0 +1,105 @@
+# app/core/export.py
+"""Constant-memory NDJSON / CSV exports.
+
+Rows come off a server-side cursor (``yield_per``) on a connection owned by
+the export itself, are encoded one batch at a time and handed to a
+StreamingResponse, so memory is bounded by the batch size rather than the
+table size.
+"""
+import csv
+import enum
+import io
+import json
+from datetime import datetime, timezone
+from typing import AsyncIterable, Iterable, List, Optional
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core import database
+from app.core.serialization import isoformat
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+async def stream_rows(stmt, batch_size: int = 1000):
+    """Yield the rows of ``stmt`` in lists of up to ``batch_size``.
+
+    The connection is checked out for the lifetime of the generator (not the
+    request's session, which FastAPI may close before the body is sent) and
+    released when the stream finishes or the client goes away.
+    """
+    stmt = stmt.execution_options(yield_per=batch_size)
+    if settings.DB_ASYNC:
+        async with database.async_engine.connect() as conn:
+            result = await conn.stream(stmt)
+            async for partition in result.partitions():
+                yield partition
+        return
+
+    conn = await run_in_threadpool(database.engine.connect)
+    try:
+        partitions = (await run_in_threadpool(conn.execute, stmt)).partitions()
+        while True:
+            partition = await run_in_threadpool(next, partitions, None)
+            if partition is None:
+                break
+            yield partition
+    finally:
+        await run_in_threadpool(conn.close)
+
+
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Normalize an ``updated_since`` filter; naive timestamps are taken as UTC."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return isoformat(value)
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
+def _ndjson_chunk(records: Iterable[dict]) -> bytes:
+    return "".join(
+        json.dumps(record, default=_plain, separators=(",", ":")) + "\n" for record in records
+    ).encode()
+
+
+async def _encode_ndjson(batches: AsyncIterable[List[dict]]):
+    async for records in batches:
+        if records:
+            yield _ndjson_chunk(records)
+
+
+async def _encode_csv(batches: AsyncIterable[List[dict]], fields: List[str]):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    async for records in batches:
+        for record in records:
+            writer.writerow(_plain(record.get(field)) for field in fields)
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():  # header only: empty export
+        yield buffer.getvalue().encode()
+
+
+def export_response(batches: AsyncIterable[List[dict]], fmt: str, fields: List[str], name: str) -> StreamingResponse:
+    """Stream record batches as ``name.ndjson`` or ``name.csv`` (``fields`` = CSV columns)."""
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {list(EXPORT_FORMATS)}")
+    body = _encode_csv(batches, fields) if fmt == "csv" else _encode_ndjson(batches)
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+    )
@@ -0,0 +1,13 @@
+# app/core/health_routes.py
+from fastapi import APIRouter, Depends
+from app.auth.utils import require_admin
+from app.core.database import pool_status
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+@router.get("/db-pool")
+def get_db_pool_status(current_user=Depends(require_admin)):
+    # Pool saturation at a glance: checked-out / overflow right now, plus
+    # cumulative checkout wait time and "QueuePool limit reached" timeouts.
+    # Admin only: pool sizes and replica health are deployment internals.
+    return pool_status()
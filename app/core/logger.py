@@ -1,23 +1,121 @@
 # app/core/logger.py
+"""Application logger.
+
+Records are handed to a QueueHandler on the calling thread (the event loop,
+mostly) and written by a QueueListener thread, so console/file I/O and JSON
+serialization never run inside a request. Every record carries the current
+request id (see log_requests in app/main.py).
+
+High-volume lines opt into sampling with ``extra=SAMPLED``; LOG_SAMPLE_RATES
+keeps that fraction of them per level. Unflagged records are never sampled.
+"""
+import atexit
+import contextvars
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import os
+import queue
+import random
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from app.core.config import settings
 
-# Create logger
-logger = logging.getLogger("ecommerce")
-logger.setLevel(logging.INFO)
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+SAMPLED = {"sampled": True}
+
+# LogRecord attributes that are not user-supplied ``extra`` fields
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id", "sampled"}
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps the request id and drops sampled-out high-volume records."""
+
+    def filter(self, record):
+        if getattr(record, "sampled", False):
+            rate = settings.LOG_SAMPLE_RATES.get(record.levelname, 1.0)
+            if rate < 1.0 and random.random() >= rate:
+                return False
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, message, request_id + extras."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RESERVED:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
 
-# Formatter
-formatter = logging.Formatter("[%(asctime)s] %(levelname)s - %(message)s")
 
-# Stream handler (console)
-stream_handler = logging.StreamHandler()
-stream_handler.setFormatter(formatter)
-logger.addHandler(stream_handler)
+class _DroppingQueueHandler(QueueHandler):
+    """Never blocks the caller: a full queue drops the record and counts it."""
+
+    dropped = 0
+
+    def prepare(self, record):
+        # Only merge args here; formatting and serialization happen in the
+        # listener. This is the logger's only handler, so no copy is needed.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _DroppingQueueHandler.dropped += 1
+
+
+def _build_handlers():
+    if settings.LOG_FORMAT == "json":
+        formatter = JSONFormatter()
+    else:
+        formatter = logging.Formatter("[%(asctime)s] %(levelname)s - %(message)s")
+
+    # Stream handler (console)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+
+    # File handler (rotating logs); logs/ is not in the repo
+    os.makedirs(os.path.dirname(settings.LOG_FILE) or ".", exist_ok=True)
+    file_handler = RotatingFileHandler(settings.LOG_FILE, maxBytes=1000000, backupCount=3)
+    file_handler.setFormatter(formatter)
+    return [stream_handler, file_handler]
+
+
+# Create logger
+logger = logging.getLogger("ecommerce")
+logger.setLevel(settings.LOG_LEVEL)
+logger.addFilter(RequestContextFilter())
 
-# File handler (rotating logs)
-file_handler = RotatingFileHandler("logs/app.log", maxBytes=1000000, backupCount=3)
-file_handler.setFormatter(formatter)
-logger.addHandler(file_handler)
+listener = None
+if settings.LOG_ASYNC:
+    log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    logger.addHandler(_DroppingQueueHandler(log_queue))
+    listener = QueueListener(log_queue, *_build_handlers(), respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)  # flushes whatever is still queued
+else:
+    for handler in _build_handlers():
+        logger.addHandler(handler)
 
 # Prevent duplicate log entries
 logger.propagate = False
@@ -0,0 +1,232 @@
+# app/core/metrics.py
+"""In-process request / DB metrics rendered in the Prometheus text format.
+
+Writers never take a lock: every thread bumps its own shard of counters and
+a scrape sums the shards. MetricsMiddleware times each request by route
+template (not raw path, so label cardinality stays bounded), and
+instrument_engine() counts SQL statements and their time, both globally and
+for the request that issued them.
+
+/metrics needs no authentication, so connection pool usage is not part of
+it; that stays on the admin-only GET /health/db-pool.
+"""
+import bisect
+import contextvars
+import threading
+import time
+import weakref
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# [statement count, seconds] for the request being handled, shared with the
+# threadpool / greenlet that runs its queries through the copied context.
+_request_db = contextvars.ContextVar("request_db", default=None)
+
+
+class _Shards:
+    """Per-thread dicts of cells; only the owning thread writes to one.
+
+    Worker threads come and go (AnyIO retires idle ones), so shards are keyed
+    by a weak reference to their thread, and the cells of threads that have
+    exited are folded into one retired shard whenever a thread registers or
+    a scrape runs.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._live = {}  # weakref to thread -> cells
+        self._retired = {}  # summed cells of exited threads
+        self._register = threading.Lock()  # taken once per thread and per scrape, never per update
+
+    def mine(self) -> dict:
+        try:
+            return self._local.cells
+        except AttributeError:
+            cells = self._local.cells = {}
+            with self._register:
+                self._retire_exited()
+                self._live[weakref.ref(threading.current_thread())] = cells
+            return cells
+
+    def _retire_exited(self):
+        for ref in [ref for ref in self._live if ref() is None or not ref().is_alive()]:
+            for key, value in self._live.pop(ref).items():
+                if isinstance(value, list):  # histogram cell
+                    total = self._retired.setdefault(key, [0] * len(value))
+                    for index, count in enumerate(value):
+                        total[index] += count
+                else:
+                    self._retired[key] = self._retired.get(key, 0) + value
+
+    def collect(self) -> list:
+        with self._register:
+            self._retire_exited()
+            retired = {key: list(value) if isinstance(value, list) else value for key, value in self._retired.items()}
+            shards = list(self._live.values())
+        return [retired] + [dict(cells) for cells in shards]  # dict() copies atomically under the GIL
+
+
+_shards = _Shards()
+REGISTRY = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name, self.documentation, self.labelnames = name, documentation, tuple(labelnames)
+        REGISTRY.append(self)
+
+    def inc(self, labels=(), amount: float = 1):
+        cells = _shards.mine()
+        key = (self.name, labels)
+        cells[key] = cells.get(key, 0) + amount
+
+    def render(self, shards) -> list:
+        totals = {}
+        for cells in shards:
+            for (name, labels), value in cells.items():
+                if name == self.name:
+                    totals[labels] = totals.get(labels, 0) + value
+        return [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in sorted(totals.items())]
+
+
+class Gauge(Counter):
+    """Up/down counter (inc with a negative amount to decrement)."""
+    kind = "gauge"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name, self.documentation, self.labelnames = name, documentation, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        REGISTRY.append(self)
+
+    def observe(self, labels, value: float):
+        cells = _shards.mine()
+        key = (self.name, labels)
+        cell = cells.get(key)
+        if cell is None:
+            # per-bucket counts (+Inf last), then sum, then count
+            cell = cells[key] = [0] * (len(self.buckets) + 3)
+        cell[bisect.bisect_left(self.buckets, value)] += 1
+        cell[-2] += value
+        cell[-1] += 1
+
+    def render(self, shards) -> list:
+        totals = {}
+        for cells in shards:
+            for (name, labels), cell in cells.items():
+                if name == self.name:
+                    total = totals.setdefault(labels, [0] * len(cell))
+                    for index, value in enumerate(list(cell)):
+                        total[index] += value
+        lines = []
+        for labels, cell in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), cell):
+                cumulative += count
+                le = 'le="+Inf"' if bound == "+Inf" else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(cell[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cell[-1]}")
+        return lines
+
+
+REQUESTS = Counter("http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being served")
+LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency by route", ("method", "route"))
+REQUEST_STATEMENTS = Histogram(
+    "http_request_db_statements", "SQL statements issued per request", ("method", "route"), STATEMENT_BUCKETS
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_seconds", "Time spent in SQL per request", ("method", "route"), DB_TIME_BUCKETS
+)
+DB_STATEMENTS = Counter("db_statements_total", "SQL statements executed")
+DB_TIME = Counter("db_statement_seconds_total", "Time spent executing SQL")
+
+
+class MetricsMiddleware:
+    """ASGI middleware: latency / status / in-flight / per-request DB usage."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500  # unless the app manages to start a response
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        db = [0, 0.0]
+        token = _request_db.set(db)
+        IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            IN_FLIGHT.inc(amount=-1)
+            _request_db.reset(token)
+            # The router stores the matched route in the shared scope.
+            labels = (scope["method"], getattr(scope.get("route"), "path", "unmatched"))
+            REQUESTS.inc((*labels, str(status)))
+            LATENCY.observe(labels, elapsed)
+            REQUEST_STATEMENTS.observe(labels, db[0])
+            REQUEST_DB_TIME.observe(labels, db[1])
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_start
+    DB_STATEMENTS.inc()
+    DB_TIME.inc(amount=elapsed)
+    db = _request_db.get()
+    if db is not None:
+        db[0] += 1
+        db[1] += elapsed
+
+
+def instrument_engine(engine):
+    """Count statements / SQL time on a sync Engine (pass ``async_engine.sync_engine``)."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def render() -> str:
+    shards = _shards.collect()
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render(shards))
+    return "\n".join(lines) + "\n"
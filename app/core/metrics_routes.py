@@ -0,0 +1,11 @@
+# app/core/metrics_routes.py
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.core.metrics import render
+
+router = APIRouter(tags=["Health"])
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics():
+    # Prometheus text exposition format (scrape config: metrics_path /metrics)
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,32 @@
+# app/core/pagination.py
+import base64
+import json
+from fastapi import HTTPException
+
+
+def encode_cursor(*values) -> str:
+    """Opaque keyset cursor: url-safe base64 of the JSON-encoded sort key values."""
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types) -> list:
+    """Sort key values from a cursor, one per type in ``types``; 400 on
+    anything else (a cursor is client input, not something we minted)."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(types):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not all(_is_a(value, kind) for value, kind in zip(values, types)):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def _is_a(value, kind) -> bool:
+    if isinstance(value, bool):  # JSON true/false is never a sort key
+        return False
+    if kind is float:  # json.dumps writes 2.0 as 2.0, but accept a bare 2 too
+        return isinstance(value, (int, float))
+    return isinstance(value, kind)
@@ -0,0 +1,167 @@
+# app/core/querywatch.py
+"""Opt-in N+1 / slow-query detector for development, CI and staging.
+
+With QUERY_WATCH=warn every request (and every ``with watch("label"):``
+block) tracks the SQL it runs. Statements are fingerprinted (literals and
+IN-lists collapsed), and when the request ends:
+
+* a fingerprint executed QUERY_WATCH_N_PLUS_ONE times or more is reported
+  as a likely N+1, with the application stack that issued it;
+* a statement slower than QUERY_WATCH_SLOW_MS is reported with its stack.
+
+Findings are logged as warnings. QUERY_WATCH=strict raises QueryWatchError
+instead, which fails the test (TestClient re-raises server errors) or the
+CI run that hit it. Stacks are only captured for flagged statements.
+
+Strict mode cannot change the response. A request's statements are only
+all known once the endpoint has finished, and by then the response has
+been sent, so the client still gets its normal response. The error
+surfaces in the server (logged by uvicorn as an exception in the ASGI
+app) and in TestClient, which re-raises it from the request call. Use
+strict in tests and CI, never to protect clients.
+"""
+import contextvars
+import os
+import re
+import sysconfig
+import time
+import traceback
+from contextlib import contextmanager
+from sqlalchemy import event
+from app.core.config import settings
+from app.core.logger import logger
+
+MODES = ("off", "warn", "strict")
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# frames from these are library plumbing, not the code that issued the query
+_LIBRARY_PATHS = tuple({sysconfig.get_paths()[key] for key in ("stdlib", "platstdlib", "purelib", "platlib")})
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LISTS = re.compile(r"\(\s*(?:\?|%\(\w+\)s|\$\d+|%s)(?:\s*,\s*(?:\?|%\(\w+\)s|\$\d+|%s))*\s*\)")
+_SPACES = re.compile(r"\s+")
+
+_current = contextvars.ContextVar("query_watch", default=None)
+
+
+class QueryWatchError(RuntimeError):
+    """Raised in strict mode when a request trips the N+1 or slow-query check."""
+
+
+def fingerprint(statement: str) -> str:
+    """Statement shape: literals -> ?, IN (?, ?, ...) -> IN (...), whitespace squeezed."""
+    shape = _LITERALS.sub("?", statement)
+    shape = _PLACEHOLDER_LISTS.sub("(...)", shape)
+    return _SPACES.sub(" ", shape).strip()
+
+
+def _app_stack() -> list:
+    """Application / test frames (innermost last) that led to the current statement."""
+    frames = []
+    for frame in traceback.extract_stack():
+        if not frame.filename.startswith(_LIBRARY_PATHS) and frame.filename != __file__:
+            path = os.path.relpath(frame.filename, ROOT) if frame.filename.startswith(ROOT) else frame.filename
+            frames.append(f"{path}:{frame.lineno} in {frame.name}")
+    return frames
+
+
+class QueryWatch:
+    """Statements seen by one request / watched block."""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.statements = 0
+        self.counts = {}  # fingerprint -> executions
+        self.stacks = {}  # fingerprint -> stack when it crossed the N+1 threshold
+        self.slow = []  # (fingerprint, seconds, stack)
+
+    def record(self, statement: str, elapsed: float):
+        self.statements += 1
+        shape = fingerprint(statement)
+        count = self.counts.get(shape, 0) + 1
+        self.counts[shape] = count
+        if count == settings.QUERY_WATCH_N_PLUS_ONE:
+            self.stacks[shape] = _app_stack()
+        if elapsed * 1000 >= settings.QUERY_WATCH_SLOW_MS:
+            self.slow.append((shape, elapsed, _app_stack()))
+
+    def findings(self) -> list:
+        found = [
+            {"kind": "n+1", "statement": shape, "count": count, "stack": self.stacks.get(shape, [])}
+            for shape, count in self.counts.items()
+            if count >= settings.QUERY_WATCH_N_PLUS_ONE
+        ]
+        found += [
+            {"kind": "slow", "statement": shape, "ms": round(elapsed * 1000, 2), "stack": stack}
+            for shape, elapsed, stack in self.slow
+        ]
+        return found
+
+    def check(self):
+        """Report findings: warning in warn mode, QueryWatchError in strict mode."""
+        found = self.findings()
+        if not found:
+            return
+        summary = "; ".join(_describe(finding) for finding in found)
+        message = f"Query watch: {self.label} ran {self.statements} statements: {summary}"
+        if settings.QUERY_WATCH == "strict":
+            raise QueryWatchError(message)
+        logger.warning(message, extra={"route": self.label, "statements": self.statements, "findings": found})
+
+
+def _describe(finding: dict) -> str:
+    where = finding["stack"][-1] if finding["stack"] else "?"
+    if finding["kind"] == "n+1":
+        return f"N+1 suspect, {finding['count']}x {finding['statement'][:200]} (at {where})"
+    return f"slow query, {finding['ms']}ms {finding['statement'][:200]} (at {where})"
+
+
+@contextmanager
+def watch(label: str):
+    """Watch the statements run inside the block (scripts, tests, CLI jobs)."""
+    current = QueryWatch(label)
+    token = _current.set(current)
+    try:
+        yield current
+    finally:
+        _current.reset(token)
+    current.check()
+
+
+class QueryWatchMiddleware:
+    """ASGI middleware: one QueryWatch per HTTP request, labelled by route.
+
+    The check runs after the response is sent, so in strict mode the error
+    reaches the server and TestClient, not the client.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        current = QueryWatch(scope["path"])
+        token = _current.set(current)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current.reset(token)
+        current.label = f"{scope['method']} {getattr(scope.get('route'), 'path', scope['path'])}"
+        current.check()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        context._watch_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    current = _current.get()
+    if current is not None and hasattr(context, "_watch_start"):
+        current.record(statement, time.perf_counter() - context._watch_start)
+
+
+def watch_engine(engine):
+    """Feed an Engine's statements to the active watch (pass ``async_engine.sync_engine``)."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
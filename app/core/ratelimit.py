@@ -0,0 +1,201 @@
+# app/core/ratelimit.py
+"""Admission control for expensive endpoints: a token bucket (sustained rate
++ burst) and a cap on requests in flight, per client and per route.
+
+A route opts in with a dependency, which runs before the handler touches
+bcrypt, SMTP or the database:
+
+    @router.post("/signin", dependencies=[Depends(RateLimit("signin", per_minute=30, burst=10))])
+
+Clients over the limit get a 429 with Retry-After straight away. Limits are
+keyed by client IP, by the bearer token's user (falling back to the IP) or
+shared by everyone ("global"); RATE_LIMITS overrides the numbers per route
+name. Counters live in this process by default (each worker enforces its
+own limits) or in Redis (RATE_LIMIT_BACKEND=redis://...) to be shared by all
+workers and hosts.
+"""
+import math
+import time
+from collections import OrderedDict
+from fastapi import HTTPException, Request
+from app.auth.utils import token_user
+from app.core.config import settings
+from app.core.logger import SAMPLED, logger
+
+KEYS = ("ip", "user", "global")
+
+
+class MemoryRateLimitBackend:
+    """Per-process counters. Only touched from the event loop, so no locking;
+    the least recently seen buckets are dropped beyond ``maxsize`` keys."""
+
+    def __init__(self, maxsize: int = 100000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()  # key -> (tokens, monotonic time of last update)
+        self._in_flight = {}
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        """Take one token; returns 0, or the seconds until one is available."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return wait
+
+    async def acquire(self, key: str, limit: int) -> bool:
+        count = self._in_flight.get(key, 0)
+        if count >= limit:
+            return False
+        self._in_flight[key] = count + 1
+        return True
+
+    async def release(self, key: str):
+        count = self._in_flight.pop(key, 0) - 1
+        if count > 0:
+            self._in_flight[key] = count
+
+
+class RedisRateLimitBackend:
+    """Counters shared by every worker and host (pip install redis). Each
+    operation is one atomic script call using the Redis server's clock."""
+
+    TAKE = """
+local rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+    # The expiry frees slots held by a process that died mid-request.
+    ACQUIRE = """
+local count = redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+if count > tonumber(ARGV[1]) then
+  redis.call('DECR', KEYS[1])
+  return 0
+end
+return 1
+"""
+    # Never below zero: once the lease has expired (or the key was never set)
+    # there is nothing left to give back, and a negative count would admit
+    # extra requests past the cap until it expired again.
+    RELEASE = """
+local count = tonumber(redis.call('GET', KEYS[1]) or '0')
+if count > 1 then
+  return redis.call('DECR', KEYS[1])
+end
+redis.call('DEL', KEYS[1])
+return 0
+"""
+    LEASE_SECONDS = 60
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+        self._take = self._redis.register_script(self.TAKE)
+        self._acquire = self._redis.register_script(self.ACQUIRE)
+        self._release = self._redis.register_script(self.RELEASE)
+
+    async def take(self, key: str, rate: float, burst: int) -> float:
+        return float(await self._take(keys=[f"ratelimit:tokens:{key}"], args=[rate, burst]))
+
+    async def acquire(self, key: str, limit: int) -> bool:
+        return bool(await self._acquire(keys=[f"ratelimit:in_flight:{key}"], args=[limit, self.LEASE_SECONDS]))
+
+    async def release(self, key: str):
+        await self._release(keys=[f"ratelimit:in_flight:{key}"])
+
+
+def _backend_for(url: str):
+    if url == "memory":
+        return MemoryRateLimitBackend()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisRateLimitBackend(url)
+    raise ValueError(f"RATE_LIMIT_BACKEND must be 'memory' or a redis:// URL, got {url!r}")
+
+
+rate_limit_backend = _backend_for(settings.RATE_LIMIT_BACKEND)
+
+
+def client_ip(request: Request) -> str:
+    # Behind a proxy, run uvicorn with --proxy-headers so this is the real client.
+    return request.client.host if request.client else "unknown"
+
+
+class RateLimit:
+    """Route dependency enforcing ``per_minute`` requests (bursts up to
+    ``burst``; 0 = no rate limit) and at most ``concurrency`` in flight
+    (0 = no cap) per key."""
+
+    def __init__(self, name: str, per_minute: float, burst: int, concurrency: int = 0, key: str = "ip"):
+        limits = {"per_minute": per_minute, "burst": burst, "concurrency": concurrency, "key": key,
+                  **settings.RATE_LIMITS.get(name, {})}
+        if limits["key"] not in KEYS:
+            raise ValueError(f"Rate limit key must be one of {KEYS}")
+        self.name = name
+        self.rate = float(limits["per_minute"]) / 60
+        self.burst = max(1, int(limits["burst"]))
+        self.concurrency = int(limits["concurrency"])
+        self.key = limits["key"]
+        self.rejected = 0
+
+    def identity(self, request: Request) -> str:
+        if self.key == "global":
+            return "*"
+        if self.key == "user":
+            user = token_user(request)
+            if user is not None:
+                return f"user:{user}"
+        return f"ip:{client_ip(request)}"
+
+    def _reject(self, retry_after: float):
+        self.rejected += 1
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests, slow down",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+    async def __call__(self, request: Request):
+        if not settings.RATE_LIMIT_ENABLED:
+            yield
+            return
+        key = f"{self.name}:{self.identity(request)}"
+        acquired = False
+        try:
+            if self.rate > 0:
+                wait = await rate_limit_backend.take(key, self.rate, self.burst)
+                if wait:
+                    self._reject(wait)
+            if self.concurrency:
+                acquired = await rate_limit_backend.acquire(key, self.concurrency)
+                if not acquired:
+                    self._reject(1)
+        except HTTPException:
+            raise
+        except Exception as e:
+            # A shared backend outage must not take the endpoints down with it.
+            logger.warning("Rate limiter unavailable, admitting request: %s", e, extra=SAMPLED)
+        try:
+            yield
+        finally:
+            if acquired:
+                try:
+                    await rate_limit_backend.release(key)
+                except Exception as e:
+                    logger.warning("Rate limiter release failed: %s", e, extra=SAMPLED)
@@ -0,0 +1,84 @@
+# app/core/read_routing.py
+"""Session dependency for read-only endpoints: a replica when
+DATABASE_REPLICA_URLS is set, the primary otherwise.
+
+Replicas lag the primary, so a user who just checked out reads from the
+primary for DB_READ_YOUR_WRITES_SECONDS and sees their own order. The
+checkout handler calls stick_to_primary(), which remembers the user in this
+process and sets a short-lived cookie so other workers honour it too.
+
+Admin catalog writes call stick_all_to_primary() (through
+catalog_cache.bump()): for the same window every read in this process goes
+to the primary, so the catalog cache is not refilled from a replica that
+has not seen the write yet.
+"""
+import math
+import time
+from fastapi import Request, Response
+from app.auth.utils import token_user
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import open_session, replica_set
+
+STICKY_COOKIE = "read_primary_until"
+
+recent_writers = TTLCache(maxsize=10000, ttl=settings.DB_READ_YOUR_WRITES_SECONDS)
+_all_primary_until = 0.0  # time.monotonic(); see stick_all_to_primary()
+
+
+def stick_to_primary(response: Response, user_id: int):
+    """Serve this user's reads from the primary for the next few seconds."""
+    if not replica_set.engines:
+        return
+    window = settings.DB_READ_YOUR_WRITES_SECONDS
+    recent_writers.set(user_id, True)
+    response.set_cookie(
+        STICKY_COOKIE, f"{time.time() + window:.3f}",
+        max_age=math.ceil(window), httponly=True, samesite="lax",
+    )
+
+
+def stick_all_to_primary():
+    """Serve every read in this process from the primary for the next few seconds."""
+    global _all_primary_until
+    if replica_set.engines:
+        _all_primary_until = time.monotonic() + settings.DB_READ_YOUR_WRITES_SECONDS
+
+
+def _sticky(request: Request) -> bool:
+    if time.monotonic() < _all_primary_until:
+        return True
+    user = token_user(request)
+    if user is not None and recent_writers.get(user):
+        return True
+    try:
+        until = float(request.cookies.get(STICKY_COOKIE, 0))
+    except ValueError:
+        return False
+    now = time.time()
+    return now < until <= now + settings.DB_READ_YOUR_WRITES_SECONDS  # ignore forged far-future values
+
+
+def read_target(request: Request):
+    """Replica index for this request's reads, or None for the primary."""
+    if not replica_set.engines or _sticky(request):
+        return None
+    return replica_set.pick()
+
+
+def _get_sync_read_db(request: Request):
+    db = open_session(read_target(request))
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def _get_async_read_db(request: Request):
+    async with open_session(read_target(request)) as db:
+        yield db
+
+
+# Like get_db, for handlers that only read (through run_db, which retries
+# on the primary if the replica fails).
+get_read_db = _get_async_read_db if settings.DB_ASYNC else _get_sync_read_db
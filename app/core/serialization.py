@@ -0,0 +1,60 @@
+# app/core/serialization.py
+"""Fast JSON path for list endpoints.
+
+Hot list endpoints select plain column tuples (``schema_columns``) instead
+of ORM entities, turn them into dicts and encode them with orjson, skipping
+per-object pydantic validation and the jsonable_encoder walk. The route's
+``response_model`` still documents the shape in OpenAPI; the columns are
+derived from the same schema, so the two can't drift apart.
+
+orjson is optional: without it the stdlib json module is used.
+"""
+import enum
+import json
+from datetime import date, datetime
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # stdlib fallback, same output
+    orjson = None
+
+
+def isoformat(value) -> str:
+    """ISO 8601, UTC written as ``Z`` the way pydantic (and orjson's OPT_UTC_Z) write it."""
+    text = value.isoformat()
+    return text[:-6] + "Z" if text.endswith("+00:00") else text
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return isoformat(value)
+    if isinstance(value, enum.Enum):
+        return value.value
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(data) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+    return json.dumps(data, default=_default, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+class FastJSONResponse(Response):
+    """JSON response for data that is already plain dicts / lists / scalars."""
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def schema_columns(model, schema, exclude=()) -> list:
+    """The ``model`` columns backing ``schema``'s fields, in field order,
+    labelled by field name (select them, then ``row._asdict()``). Nested
+    fields go in ``exclude`` and are filled in by the caller."""
+    return [getattr(model, name).label(name) for name in schema.model_fields if name not in exclude]
+
+
+def rows_to_dicts(rows) -> list:
+    return [row._asdict() for row in rows]
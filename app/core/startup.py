@@ -0,0 +1,81 @@
+# app/core/startup.py
+"""Database preparation when an app instance is built (see create_app).
+
+STARTUP_MODE=dev builds a throwaway / local database in place:
+create_all() plus the search and facet setup, all idempotent but each one
+reflecting or querying tables. STARTUP_MODE=production assumes
+``alembic upgrade head`` ran as a deploy step and only compares the
+database's alembic revision with the code's head: two small queries per
+worker, and a worker refuses to start against an out-of-date schema.
+"""
+import os
+import re
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+MODES = ("dev", "production")
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+VERSIONS_DIR = os.path.join(ROOT, "alembic", "versions")
+
+# `revision: str = 'abc'` / `down_revision: Union[str, None] = 'abc'` (or a
+# tuple for merges, or None). Read as text: importing alembic alone costs
+# more than everything else this check does.
+_REVISION = re.compile(r"^revision\b[^=]*=\s*['\"]([0-9A-Za-z_]+)['\"]", re.MULTILINE)
+_DOWN_REVISION = re.compile(r"^down_revision\b[^=]*=(.*)$", re.MULTILINE)
+_QUOTED = re.compile(r"['\"]([0-9A-Za-z_]+)['\"]")
+
+
+class SchemaVersionError(RuntimeError):
+    """The database is not at the alembic head revision this code expects."""
+
+
+def code_heads(versions_dir: str = VERSIONS_DIR) -> set:
+    """Revisions in alembic/versions that no other revision builds on."""
+    revisions, parents = set(), set()
+    for name in os.listdir(versions_dir):
+        if not name.endswith(".py"):
+            continue
+        with open(os.path.join(versions_dir, name), encoding="utf-8") as handle:
+            source = handle.read()
+        revision = _REVISION.search(source)
+        if revision:
+            revisions.add(revision.group(1))
+            down = _DOWN_REVISION.search(source)
+            if down:
+                parents.update(_QUOTED.findall(down.group(1)))
+    return revisions - parents
+
+
+def database_heads(engine: Engine) -> set:
+    with engine.connect() as conn:
+        if not inspect(conn).has_table("alembic_version"):
+            return set()
+        return set(conn.execute(text("SELECT version_num FROM alembic_version")).scalars())
+
+
+def check_schema_head(engine: Engine):
+    expected, current = code_heads(), database_heads(engine)
+    if current != expected:
+        raise SchemaVersionError(
+            f"Database schema is at {sorted(current) or 'no revision'}, code expects "
+            f"{sorted(expected)}; run `alembic upgrade head` before starting the app"
+        )
+
+
+def create_schema(engine: Engine):
+    from app.core.database import Base
+    from app.products import facets
+    from app.products.search import search_backend
+
+    Base.metadata.create_all(bind=engine)  # Create tables
+    search_backend.setup(engine)  # FTS table / search indexes (idempotent)
+    facets.setup(engine)  # backfill product_facets on first run
+
+
+def prepare_database(engine: Engine, mode: str):
+    if mode not in MODES:
+        raise ValueError(f"STARTUP_MODE must be one of {MODES}")
+    if mode == "production":
+        check_schema_head(engine)
+    else:
+        create_schema(engine)
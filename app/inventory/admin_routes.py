@@ -0,0 +1,67 @@
+# app/inventory/admin_routes.py
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.auth.utils import require_admin
+from app.core.database import get_db, run_db
+from app.core.logger import logger
+from app.products.catalog_cache import catalog_cache
+from app.inventory import ledger
+from app.inventory.schemas import InventoryOut, InventorySplit, InventoryStock
+from app.products.models import Product
+
+
+router = APIRouter(prefix="/admin/inventory", tags=["Admin Inventory"])
+
+
+@router.get("/{product_id}", response_model=InventoryOut)
+async def get_inventory(
+    product_id: int,
+    db: Session = Depends(get_db),
+    current_user=Depends(require_admin)
+):
+    def _query(session: Session):
+        if session.scalar(select(Product.id).where(Product.id == product_id)) is None:
+            raise HTTPException(status_code=404, detail="Product not found")
+        return ledger.status(session, product_id)
+
+    return await run_db(db, _query)
+
+
+# split a hot product's stock into N sub-counters before a flash sale (1 = merge back)
+@router.put("/{product_id}/buckets", response_model=InventoryOut)
+async def split_inventory(
+    product_id: int,
+    body: InventorySplit,
+    db: Session = Depends(get_db),
+    current_user=Depends(require_admin)
+):
+    def _split(session: Session):
+        if ledger.split(session, product_id, body.buckets) is None:
+            raise HTTPException(status_code=404, detail="Product not found")
+        session.commit()
+        return ledger.status(session, product_id)
+
+    inventory = await run_db(db, _split)
+    logger.info("Product %s stock split into %s buckets by user %s", product_id, body.buckets, current_user.id)
+    return inventory
+
+
+# set a product's sellable stock; a split product's is re-spread over its buckets
+@router.put("/{product_id}/stock", response_model=InventoryOut)
+async def set_stock(
+    product_id: int,
+    body: InventoryStock,
+    db: Session = Depends(get_db),
+    current_user=Depends(require_admin)
+):
+    def _set(session: Session):
+        if ledger.set_available(session, product_id, body.available) is None:
+            raise HTTPException(status_code=404, detail="Product not found")
+        session.commit()
+        return ledger.status(session, product_id)
+
+    inventory = await run_db(db, _set)
+    catalog_cache.bump()
+    logger.info("Product %s stock set to %s by user %s", product_id, body.available, current_user.id)
+    return inventory
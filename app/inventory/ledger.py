@@ -0,0 +1,384 @@
+# app/inventory/ledger.py
+"""Stock ledger: time-limited reservations and split (hot) products.
+
+Checkout no longer decrements products.stock under a row lock held for
+the whole transaction. It reserves the cart (reserve()), which takes the
+quantities out of stock right away and records one held row per source in
+inventory_reservations. Placing the order then commits those rows
+(commit()). Holds that are never committed expire after
+INVENTORY_HOLD_SECONDS, and the reaper gives the stock back (reap()).
+
+A hot product can be split into N sub-counters (split()). Its sellable
+stock then lives in N inventory_buckets rows. A reservation takes from one
+bucket picked at random with SKIP LOCKED, so concurrent flash-sale
+checkouts land on different rows instead of queueing on one. It only waits
+on a busy bucket, or spreads over several, when the unlocked buckets run
+short. products.stock of a split product is a display copy, refreshed by
+the reaper (refresh_stock()); its stock is edited with set_available().
+
+Whether a product is split is read under a KEY SHARE lock on its products
+row (lock_products()). Checkouts don't block each other on it, but split()
+needs an exclusive lock, so the split state cannot change between that
+read and the decrement.
+
+Every decrement is guarded (``available >= qty``), so stock can never go
+negative, even where FOR UPDATE / SKIP LOCKED are no-ops (SQLite).
+"""
+from collections import defaultdict
+from datetime import timedelta
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import utcnow
+from app.inventory.models import Reservation, StockBucket
+from app.products.models import Product
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_ids):
+        self.product_ids = sorted(product_ids)
+        super().__init__(f"Insufficient stock for product IDs: {self.product_ids}")
+
+
+def bucket_counts(session: Session, product_ids) -> dict:
+    """product id -> number of buckets, for the split products among ``product_ids``."""
+    return dict(session.execute(
+        select(StockBucket.product_id, func.count())
+        .where(StockBucket.product_id.in_(list(product_ids)))
+        .group_by(StockBucket.product_id)
+    ).all())
+
+
+def lock_products(session: Session, *criteria) -> list:
+    """KEY SHARE lock the matching products rows (in id order) and return their
+    ids: pins their split state until commit without blocking stock updates."""
+    return session.execute(
+        select(Product.id).where(*criteria).order_by(Product.id)
+        .with_for_update(read=True, key_share=True)
+    ).scalars().all()
+
+
+def split_stock(session: Session, key, *criteria) -> dict:
+    """``key`` -> (products.stock, bucket total) for the split products matching ``criteria``."""
+    return {
+        row[0]: (row[1], row[2]) for row in session.execute(
+            select(key, Product.stock, func.sum(StockBucket.available))
+            .join(StockBucket, StockBucket.product_id == Product.id)
+            .where(*criteria)
+            .group_by(key, Product.stock)
+        )
+    }
+
+
+def _take_from_products(session: Session, quantities: dict) -> list:
+    """Decrement products.stock for unsplit products; returns the ids that were short."""
+    if not quantities:
+        return []
+    # Lock in id order so concurrent checkouts never deadlock on each other;
+    # NO KEY UPDATE, as the other checkouts hold KEY SHARE on the same rows.
+    stock = dict(session.execute(
+        select(Product.id, Product.stock)
+        .where(Product.id.in_(quantities))
+        .order_by(Product.id)
+        .with_for_update(key_share=True)
+    ).all())
+    short = [pid for pid, qty in quantities.items() if stock.get(pid, 0) < qty]
+    if short:
+        return short
+    qty_for = case(quantities, value=Product.id)
+    decremented = session.execute(
+        update(Product)
+        .where(Product.id.in_(quantities), Product.stock >= qty_for)
+        .values(stock=Product.stock - qty_for)
+        .returning(Product.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    return sorted(set(quantities) - set(decremented))
+
+
+def _take_from_one_bucket(session: Session, product_id: int, quantity: int, skip_locked: bool):
+    pick = select(StockBucket.bucket)\
+        .where(StockBucket.product_id == product_id, StockBucket.available >= quantity)\
+        .order_by(func.random()).limit(1)
+    if skip_locked:
+        pick = pick.with_for_update(skip_locked=True)
+    # Without SKIP LOCKED, only the UPDATE waits, on the one picked row: a
+    # locking subquery would keep rows that failed their recheck after a wait
+    # locked, in random order, and two waiting checkouts could deadlock.
+    pick = pick.scalar_subquery()
+    return session.execute(
+        update(StockBucket)
+        .where(
+            StockBucket.product_id == product_id,
+            StockBucket.bucket == pick,
+            StockBucket.available >= quantity,
+        )
+        .values(available=StockBucket.available - quantity)
+        .returning(StockBucket.bucket)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+
+
+def _take_from_buckets(session: Session, product_id: int, quantity: int):
+    """[(bucket, qty), ...] taken for a split product, or None when it is short."""
+    # Any free bucket that covers the line; else wait for a busy one, which
+    # may be drained by the time it is free (the guard then updates nothing).
+    for skip_locked in (True, False, False, False):
+        bucket = _take_from_one_bucket(session, product_id, quantity, skip_locked)
+        if bucket is not None:
+            return [(bucket, quantity)]
+
+    # No single bucket holds enough: lock them all (in order) and spread the line.
+    buckets = session.execute(
+        select(StockBucket.bucket, StockBucket.available)
+        .where(StockBucket.product_id == product_id, StockBucket.available > 0)
+        .order_by(StockBucket.bucket)
+        .with_for_update()
+    ).all()
+    if sum(row.available for row in buckets) < quantity:
+        return None
+    parts, remaining = [], quantity
+    for row in sorted(buckets, key=lambda row: -row.available):
+        if remaining == 0:
+            break
+        take = min(row.available, remaining)
+        parts.append((row.bucket, take))
+        remaining -= take
+    for bucket, take in sorted(parts):
+        session.execute(
+            update(StockBucket)
+            .where(StockBucket.product_id == product_id, StockBucket.bucket == bucket)
+            .values(available=StockBucket.available - take)
+            .execution_options(synchronize_session=False)
+        )
+    return parts
+
+
+def _give_back(session: Session, rows):
+    """Return released (product_id, bucket, quantity) rows to stock."""
+    rows = list(rows)
+    if not rows:
+        return
+    product_ids = {row.product_id for row in rows}
+    lock_products(session, Product.id.in_(product_ids))
+    counts = bucket_counts(session, product_ids)
+    to_products, to_buckets = defaultdict(int), defaultdict(int)
+    for row in rows:
+        buckets = counts.get(row.product_id)
+        if buckets:
+            # the product may have been re-split (or split) since the hold was taken
+            to_buckets[(row.product_id, (row.bucket or 0) % buckets)] += row.quantity
+        else:
+            to_products[row.product_id] += row.quantity
+
+    if to_products:
+        qty_for = case(dict(to_products), value=Product.id)
+        session.execute(
+            update(Product)
+            .where(Product.id.in_(to_products))
+            .values(stock=Product.stock + qty_for)
+            .execution_options(synchronize_session=False)
+        )
+    for (product_id, bucket), quantity in sorted(to_buckets.items()):
+        session.execute(
+            update(StockBucket)
+            .where(StockBucket.product_id == product_id, StockBucket.bucket == bucket)
+            .values(available=StockBucket.available + quantity)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def _release(session: Session, *criteria) -> int:
+    released = session.execute(
+        update(Reservation)
+        .where(Reservation.status == "held", *criteria)
+        .values(status="released")
+        .returning(Reservation.product_id, Reservation.bucket, Reservation.quantity)
+        .execution_options(synchronize_session=False)
+    ).all()
+    _give_back(session, released)
+    return len(released)
+
+
+def reserve(session: Session, user_id: int, quantities: dict) -> list:
+    """Make the user's holds match ``quantities`` (product id -> qty).
+
+    Holds that already match are extended; every other hold of the user is
+    released and the difference is taken from stock. Raises
+    InsufficientStock (the caller rolls back). Returns the held lines.
+    """
+    expires_at = utcnow() + timedelta(seconds=settings.INVENTORY_HOLD_SECONDS)
+    held = defaultdict(list)
+    for row in session.execute(
+        select(Reservation.id, Reservation.product_id, Reservation.quantity)
+        .where(Reservation.user_id == user_id, Reservation.status == "held", Reservation.expires_at > utcnow())
+    ):
+        held[row.product_id].append(row)
+
+    kept_products = {
+        product_id for product_id, rows in held.items()
+        if sum(row.quantity for row in rows) == quantities.get(product_id)
+    }
+    keep = [row.id for product_id in kept_products for row in held[product_id]]
+    _release(session, Reservation.user_id == user_id, Reservation.id.not_in(keep))
+    if keep:
+        session.execute(
+            update(Reservation)
+            .where(Reservation.id.in_(keep), Reservation.status == "held")
+            .values(expires_at=expires_at)
+            .execution_options(synchronize_session=False)
+        )
+
+    needed = {pid: qty for pid, qty in quantities.items() if pid not in kept_products}
+    if needed:
+        lock_products(session, Product.id.in_(needed))
+    split = bucket_counts(session, needed)
+    short = _take_from_products(session, {pid: qty for pid, qty in needed.items() if pid not in split})
+    taken = []
+    if not short:
+        for product_id in sorted(split):  # id order, like the products.stock locks
+            parts = _take_from_buckets(session, product_id, needed[product_id])
+            if parts is None:
+                short.append(product_id)
+                break
+            taken += [(product_id, bucket, qty) for bucket, qty in parts]
+        taken += [(pid, None, qty) for pid, qty in needed.items() if pid not in split]
+    if short:
+        raise InsufficientStock(short)
+
+    if taken:
+        session.execute(insert(Reservation), [
+            {"user_id": user_id, "product_id": pid, "bucket": bucket, "quantity": qty,
+             "status": "held", "expires_at": expires_at, "created_at": utcnow()}
+            for pid, bucket, qty in taken
+        ])
+    return [
+        {"product_id": pid, "quantity": qty, "expires_at": expires_at}
+        for pid, qty in sorted(quantities.items())
+    ]
+
+
+def commit(session: Session, user_id: int, order_id: int, quantities: dict) -> bool:
+    """Turn the user's holds for ``quantities`` into sold stock of ``order_id``.
+
+    False when the holds no longer cover the order (e.g. the reaper released
+    them meanwhile); the caller rolls back.
+    """
+    committed = session.execute(
+        update(Reservation)
+        .where(
+            Reservation.user_id == user_id,
+            Reservation.status == "held",
+            Reservation.product_id.in_(quantities),
+        )
+        .values(status="committed", order_id=order_id)
+        .returning(Reservation.product_id, Reservation.quantity)
+        .execution_options(synchronize_session=False)
+    ).all()
+    covered = defaultdict(int)
+    for row in committed:
+        covered[row.product_id] += row.quantity
+    return covered == quantities
+
+
+def release_holds(session: Session, user_id: int) -> int:
+    """Give back every hold of the user (cart abandoned / emptied)."""
+    return _release(session, Reservation.user_id == user_id)
+
+
+def reap(session: Session, limit: int) -> int:
+    """Release up to ``limit`` expired holds; returns how many were released."""
+    expired = select(Reservation.id)\
+        .where(Reservation.status == "held", Reservation.expires_at <= utcnow())\
+        .order_by(Reservation.id).limit(limit)\
+        .with_for_update(skip_locked=True)
+    ids = session.execute(expired).scalars().all()
+    if not ids:
+        return 0
+    return _release(session, Reservation.id.in_(ids))
+
+
+def refresh_stock(session: Session) -> list:
+    """Copy each split product's bucket total into products.stock; returns the ids that changed."""
+    total = select(func.coalesce(func.sum(StockBucket.available), 0))\
+        .where(StockBucket.product_id == Product.id).scalar_subquery()
+    return session.execute(
+        update(Product)
+        .where(Product.id.in_(select(StockBucket.product_id).distinct()), Product.stock != total)
+        .values(stock=total)
+        .returning(Product.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+
+
+def _distribute(session: Session, product_id: int, buckets: int, available: int):
+    session.execute(delete(StockBucket).where(StockBucket.product_id == product_id))
+    if buckets > 1:
+        share, extra = divmod(available, buckets)
+        session.execute(insert(StockBucket), [
+            {"product_id": product_id, "bucket": bucket, "available": share + (1 if bucket < extra else 0)}
+            for bucket in range(buckets)
+        ])
+
+
+def split(session: Session, product_id: int, buckets: int):
+    """Spread a product's sellable stock over ``buckets`` sub-counters (1 = merge
+    back into products.stock). Returns the available total, or None if the
+    product does not exist. Outstanding holds keep working either way."""
+    product = session.execute(
+        select(Product.id, Product.stock).where(Product.id == product_id).with_for_update()
+    ).first()
+    if product is None:
+        return None
+    current = session.execute(
+        select(StockBucket.available)
+        .where(StockBucket.product_id == product_id)
+        .order_by(StockBucket.bucket)
+        .with_for_update()
+    ).scalars().all()
+    available = sum(current) if current else product.stock
+    _distribute(session, product_id, buckets, available)
+    session.execute(
+        update(Product).where(Product.id == product_id).values(stock=available)
+        .execution_options(synchronize_session=False)
+    )
+    return available
+
+
+def set_available(session: Session, product_id: int, available: int):
+    """Admin stock edit: make ``available`` units sellable, re-spread over the
+    buckets of a split product. Returns None if the product does not exist."""
+    if session.execute(select(Product.id).where(Product.id == product_id).with_for_update()).first() is None:
+        return None
+    buckets = bucket_counts(session, [product_id]).get(product_id)
+    if buckets:
+        session.execute(
+            select(StockBucket.bucket).where(StockBucket.product_id == product_id).with_for_update()
+        ).all()
+        _distribute(session, product_id, buckets, available)
+    session.execute(
+        update(Product).where(Product.id == product_id).values(stock=available)
+        .execution_options(synchronize_session=False)
+    )
+    return available
+
+
+def status(session: Session, product_id: int) -> dict:
+    buckets = session.execute(
+        select(StockBucket.bucket, StockBucket.available)
+        .where(StockBucket.product_id == product_id)
+        .order_by(StockBucket.bucket)
+    ).all()
+    holds = dict(session.execute(
+        select(Reservation.status, func.coalesce(func.sum(Reservation.quantity), 0))
+        .where(Reservation.product_id == product_id, Reservation.status.in_(("held", "committed")))
+        .group_by(Reservation.status)
+    ).all())
+    stock = session.scalar(select(Product.stock).where(Product.id == product_id))
+    return {
+        "product_id": product_id,
+        "available": sum(row.available for row in buckets) if buckets else stock,
+        "buckets": [row.available for row in buckets],
+        "held": holds.get("held", 0),
+        "sold": holds.get("committed", 0),
+    }
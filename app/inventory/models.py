@@ -0,0 +1,39 @@
+from sqlalchemy import Column, ForeignKey, Index, Integer, PrimaryKeyConstraint, String
+from app.core.database import Base, UTCDateTime, utcnow
+
+
+class StockBucket(Base):
+    """One sub-counter of a split (hot) product's sellable stock.
+
+    A product with bucket rows sells from them instead of products.stock, so
+    concurrent checkouts decrement different rows. See app/inventory/ledger.py.
+    """
+    __tablename__ = "inventory_buckets"
+    __table_args__ = (PrimaryKeyConstraint("product_id", "bucket"),)
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    bucket = Column(Integer, nullable=False)  # 0 .. N-1
+    available = Column(Integer, nullable=False, default=0)
+
+
+class Reservation(Base):
+    """Stock taken out of a bucket (or products.stock when bucket is NULL)
+    for one user: held until expires_at, then committed by checkout or
+    released back by the reaper."""
+    __tablename__ = "inventory_reservations"
+    __table_args__ = (
+        # the reaper scans held rows by expiry; checkout looks up a user's holds
+        Index("ix_inventory_reservations_due", "status", "expires_at"),
+        Index("ix_inventory_reservations_user", "user_id", "status"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    product_id = Column(Integer, nullable=False)
+    bucket = Column(Integer)  # NULL: taken from products.stock (product not split)
+    quantity = Column(Integer, nullable=False)
+    status = Column(String, nullable=False, default="held")  # held / committed / released
+    # timestamptz on PostgreSQL, like mail_outbox: compared with utcnow()
+    expires_at = Column(UTCDateTime, nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id"))  # set when committed
+    created_at = Column(UTCDateTime, default=utcnow)
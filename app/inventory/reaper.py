@@ -0,0 +1,65 @@
+# app/inventory/reaper.py
+"""Background task that returns expired reservations to stock.
+
+Every INVENTORY_REAP_INTERVAL seconds it releases expired holds in batches
+(claimed with SKIP LOCKED, so every app process can run one) and refreshes
+the display stock of split products.
+"""
+import asyncio
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.logger import logger
+from app.inventory import ledger
+from app.products.catalog_cache import catalog_cache
+
+
+class InventoryReaper:
+    def __init__(self):
+        self.released = 0
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                released, refreshed = await run_in_threadpool(self.run_once)
+            except Exception as e:
+                logger.error("Inventory reaper pass failed: %s", e)
+            else:
+                for product_id in refreshed:
+                    catalog_cache.invalidate(("detail", product_id))  # stock changed
+                if released:
+                    logger.info("Inventory reaper released %s expired holds", released)
+            await asyncio.sleep(settings.INVENTORY_REAP_INTERVAL)
+
+    def run_once(self):
+        """One pass: (holds released, ids of split products whose stock copy changed)."""
+        released = 0
+        with SessionLocal() as db:
+            while True:
+                count = ledger.reap(db, settings.INVENTORY_REAP_BATCH)
+                db.commit()
+                released += count
+                if count < settings.INVENTORY_REAP_BATCH:
+                    break
+            refreshed = ledger.refresh_stock(db)
+            db.commit()
+        self.released += released
+        return released, refreshed
+
+
+inventory_reaper = InventoryReaper()
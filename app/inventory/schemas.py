@@ -0,0 +1,24 @@
+from pydantic import BaseModel, Field
+from typing import List
+from datetime import datetime
+
+class ReservationLineOut(BaseModel):
+    product_id: int
+    quantity: int
+
+class ReservationOut(BaseModel):
+    expires_at: datetime  # holds are released after this unless the order is placed
+    items: List[ReservationLineOut]
+
+class InventorySplit(BaseModel):
+    buckets: int = Field(..., ge=1, le=256)  # 1 = merge back into products.stock
+
+class InventoryStock(BaseModel):
+    available: int = Field(..., ge=0)  # sellable units, on top of outstanding holds
+
+class InventoryOut(BaseModel):
+    product_id: int
+    available: int  # sellable now (holds already taken out)
+    buckets: List[int]  # per sub-counter; empty when the product is not split
+    held: int
+    sold: int
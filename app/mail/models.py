@@ -0,0 +1,24 @@
+from sqlalchemy import Column, Index, Integer, String, Text
+from app.core.database import Base, UTCDateTime, utcnow
+
+
+class OutboxEmail(Base):
+    """One outbound message; delivered and retried by app/mail/outbox.py."""
+    __tablename__ = "mail_outbox"
+    __table_args__ = (
+        # the worker polls for pending rows that are due
+        Index("ix_mail_outbox_due", "status", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    to_address = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    html_body = Column(Text, nullable=False)
+    status = Column(String, nullable=False, default="pending")  # pending / sent / failed
+    attempts = Column(Integer, nullable=False, default=0)
+    # timezone-aware (timestamptz on PostgreSQL): the worker does arithmetic on
+    # next_attempt_at, which a naive column would store in the session TimeZone
+    next_attempt_at = Column(UTCDateTime, nullable=False, default=utcnow)  # also the in-flight lease
+    last_error = Column(String)
+    created_at = Column(UTCDateTime, default=utcnow)
+    sent_at = Column(UTCDateTime)
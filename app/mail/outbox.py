@@ -0,0 +1,243 @@
+# app/mail/outbox.py
+"""Outbound mail: a persisted outbox drained by an in-process async worker.
+
+Request handlers add a row with enqueue() inside their own transaction and
+return right away. MailWorker wakes up on notify() (or every
+MAIL_POLL_INTERVAL), claims due rows in batches, delivers them over one
+reused SMTP connection and retries failures with exponential backoff.
+Claimed rows are leased rather than locked, so several app processes can
+share the outbox, and mail left in flight by a crash or restart is picked
+up again once the lease runs out (delivery is at-least-once).
+
+SMTP calls are blocking (smtplib), so the worker runs them on a single
+dedicated thread that owns the connection.
+"""
+import asyncio
+import random
+import smtplib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from email.message import EmailMessage
+from typing import Optional
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal, utcnow
+from app.core.logger import logger
+from app.mail.models import OutboxEmail
+
+LEASE_SECONDS = 600  # a claimed batch must be delivered (or given back) within this
+MIN_WAIT = 0.5  # floor for the worker's sleep between passes
+
+
+def enqueue(db: Session, to_address: str, subject: str, html_body: str) -> OutboxEmail:
+    """Queue a message; it is delivered once the caller commits (then call mail_worker.notify())."""
+    email = OutboxEmail(to_address=to_address, subject=subject, html_body=html_body)
+    db.add(email)
+    return email
+
+
+def retry_delay(attempts: int) -> float:
+    """Seconds before the next try: MAIL_RETRY_BASE doubled per attempt, capped, +-20% jitter."""
+    delay = min(settings.MAIL_RETRY_BASE * 2 ** min(attempts - 1, 30), settings.MAIL_RETRY_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _classify(exc: Exception) -> str:
+    """'permanent' (give up on this message), 'retry' (this message later) or
+    'connection' (the relay itself is failing: stop the batch)."""
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in exc.recipients.values()]
+        return "permanent" if codes and all(code >= 500 for code in codes) else "retry"
+    if isinstance(exc, (smtplib.SMTPSenderRefused, smtplib.SMTPDataError)):
+        return "permanent" if exc.smtp_code >= 500 else "retry"
+    if isinstance(exc, OSError):  # smtplib errors, refused connects, timeouts
+        return "connection"
+    return "permanent"  # the message itself can't be built / encoded
+
+
+def _build_message(row) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = settings.EMAIL_USER
+    message["To"] = row.to_address
+    message["Subject"] = row.subject
+    message.set_content(row.html_body, subtype="html")
+    return message
+
+
+class SMTPConnection:
+    """A lazily opened SMTP session kept across messages and batches.
+
+    Only ever used from the mail worker's thread.
+    """
+
+    def __init__(self):
+        self._smtp = None
+        self._last_used = 0.0
+
+    def _open(self):
+        smtp = smtplib.SMTP(settings.EMAIL_HOST, settings.EMAIL_PORT, timeout=settings.MAIL_SMTP_TIMEOUT)
+        try:
+            if settings.EMAIL_STARTTLS:
+                smtp.starttls()
+            if settings.EMAIL_PASSWORD:
+                smtp.login(settings.EMAIL_USER, settings.EMAIL_PASSWORD)
+        except Exception:
+            smtp.close()
+            raise
+        return smtp
+
+    def send(self, message: EmailMessage):
+        reused = self._smtp is not None
+        if not reused:
+            self._smtp = self._open()
+        try:
+            self._smtp.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            self.close()
+            if not reused:
+                raise
+            # the relay dropped our idle connection: reconnect once
+            self._smtp = self._open()
+            self._smtp.send_message(message)
+        self._last_used = time.monotonic()
+
+    def close(self):
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self._smtp.close()
+        self._smtp = None
+
+    def close_if_idle(self, idle_seconds: float):
+        if self._smtp is not None and time.monotonic() - self._last_used > idle_seconds:
+            self.close()
+
+
+class MailWorker:
+    def __init__(self):
+        self.connection = SMTPConnection()
+        self.sent = 0
+        self.failed = 0
+        self._executor = None
+        self._task = None
+        self._wakeup = None
+
+    def notify(self):
+        """Wake the worker after committing new outbox rows (call from the event loop)."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def start(self):
+        if self._task is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="mail")
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        # queued behind a batch still in flight, so its results get recorded first
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.connection.close)
+        self._executor.shutdown()
+        self._task = self._executor = self._wakeup = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            try:
+                wait = await loop.run_in_executor(self._executor, self.drain)
+            except Exception as e:
+                logger.error("Mail worker pass failed: %s", e)
+                wait = None
+            timeout = settings.MAIL_POLL_INTERVAL if wait is None else min(wait, settings.MAIL_POLL_INTERVAL)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(timeout, MIN_WAIT))
+            except asyncio.TimeoutError:
+                pass
+
+    def drain(self) -> Optional[float]:
+        """Deliver every due message. Returns seconds until the next pending
+        message is due, or None when nothing is pending."""
+        with SessionLocal() as db:
+            while self.process_batch(db):
+                pass
+            self.connection.close_if_idle(settings.MAIL_SMTP_IDLE_TIMEOUT)
+            next_attempt_at = db.scalar(
+                select(func.min(OutboxEmail.next_attempt_at)).where(OutboxEmail.status == "pending")
+            )
+        if next_attempt_at is None:
+            return None
+        return (next_attempt_at - utcnow()).total_seconds()
+
+    def process_batch(self, db: Session) -> bool:
+        """Claim, deliver and record one batch. Returns whether to keep draining."""
+        table = OutboxEmail.__table__
+        now = utcnow()
+        due = select(table.c.id)\
+            .where(table.c.status == "pending", table.c.next_attempt_at <= now)\
+            .order_by(table.c.id).limit(settings.MAIL_BATCH_SIZE)\
+            .with_for_update(skip_locked=True)
+        # Pushing next_attempt_at past the lease hides the rows from other workers.
+        claimed = db.execute(
+            update(table)
+            .where(table.c.id.in_(due.scalar_subquery()), table.c.status == "pending", table.c.next_attempt_at <= now)
+            .values(next_attempt_at=now + timedelta(seconds=LEASE_SECONDS))
+            .returning(table.c.id, table.c.to_address, table.c.subject, table.c.html_body, table.c.attempts)
+        ).all()
+        db.commit()
+        if not claimed:
+            return False
+
+        results, deferred, relay_down = [], [], False
+        for index, row in enumerate(claimed):
+            try:
+                self.connection.send(_build_message(row))
+            except Exception as e:
+                kind = _classify(e)
+                results.append((row, e, kind))
+                if kind == "connection":
+                    self.connection.close()
+                    relay_down = True
+                    deferred = claimed[index + 1:]
+                    break
+            else:
+                results.append((row, None, None))
+
+        now = utcnow()
+        for row, error, kind in results:
+            attempts = row.attempts + 1
+            if error is None:
+                values = {"status": "sent", "attempts": attempts, "sent_at": now, "last_error": None}
+                self.sent += 1
+            elif kind == "permanent" or attempts >= settings.MAIL_MAX_ATTEMPTS:
+                values = {"status": "failed", "attempts": attempts, "last_error": str(error)[:500]}
+                self.failed += 1
+                logger.error("Giving up on mail %s after %s attempt(s): %s", row.id, attempts, error)
+            else:
+                values = {
+                    "attempts": attempts, "last_error": str(error)[:500],
+                    "next_attempt_at": now + timedelta(seconds=retry_delay(attempts)),
+                }
+                logger.warning("Mail %s failed (attempt %s), will retry: %s", row.id, attempts, error)
+            db.execute(update(table).where(table.c.id == row.id).values(**values))
+        # The relay is down: hand the untried rest of the batch back without charging an attempt.
+        for row in deferred:
+            db.execute(
+                update(table).where(table.c.id == row.id)
+                .values(next_attempt_at=now + timedelta(seconds=retry_delay(row.attempts + 1)))
+            )
+        db.commit()
+        return not relay_down
+
+
+mail_worker = MailWorker()
@@ -1,58 +1,142 @@
 from fastapi import FastAPI
-from app.auth import routes as auth_routes
-from app.core.database import Base, engine
-from app.auth import models as auth_models
-from app.products.models import Product
-from fastapi.openapi.models import APIKey, APIKeyIn, SecuritySchemeType
+import re
+import time
+import uuid
+from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
-from app.products import routes as product_routes
 from app.core.config import settings
-from app.products import public_routes as public_products
-from app.cart import routes as cart_routes
-from app.cart.models import CartItem
-from app.orders import checkout_routes, order_routes
-from app.orders.models import Order, OrderItem
 from starlette.requests import Request
-from app.core.logger import logger
+from app.core.logger import SAMPLED, logger, request_id_var
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import HTTPException
 
-Base.metadata.create_all(bind=engine)  # Create tables
+# Importing this module has no side effects: routers, models and the database
+# check load in create_app(). Run with `uvicorn app.main:create_app --factory`,
+# or keep `uvicorn app.main:app`, which builds the app on first access.
 
-app = FastAPI()
+REQUEST_ID_PATTERN = re.compile(r"[A-Za-z0-9._-]{1,128}")
 
-print("DB URL:", settings.DATABASE_URL)
+# response headers a cross-origin script may read (beyond the CORS-safelisted ones)
+EXPOSED_HEADERS = ["X-Next-Cursor", "X-Request-ID", "Retry-After"]
 
-app.include_router(auth_routes.router) # auth_routes
-
-app.include_router(product_routes.router)         # /admin/products
-app.include_router(public_products.router)        # /products
-
-app.include_router(cart_routes.router) # cart_routes
-
-app.include_router(checkout_routes.router) # checkout_routes
-app.include_router(order_routes.router) # order_routes
-
-@app.middleware("http")
 async def log_requests(request: Request, call_next):
-    ip = request.client.host
-    method = request.method
-    path = request.url.path
-    logger.info(f"[{ip}] {method} {path}")
-    response = await call_next(request)
-    return response
-
-@app.exception_handler(HTTPException)
+    # Reuse the caller's X-Request-ID (proxies, clients) or mint one; every log
+    # line written while handling the request carries it.
+    request_id = request.headers.get("X-Request-ID", "")
+    if not REQUEST_ID_PATTERN.fullmatch(request_id):
+        request_id = uuid.uuid4().hex
+    token = request_id_var.set(request_id)
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request_id
+        logger.info(
+            "%s %s %s", request.method, request.url.path, response.status_code,
+            extra={**SAMPLED, "client": request.client.host if request.client else None,
+                   "status": response.status_code,
+                   "duration_ms": round((time.perf_counter() - start) * 1000, 2)},
+        )
+        return response
+    finally:
+        request_id_var.reset(token)
+
 async def custom_http_exception_handler(request: Request, exc: HTTPException):
-    logger.error(f"ERROR {exc.status_code} at {request.url.path}: {exc.detail}")
+    if exc.status_code == 429:  # shed by a rate limit: can be a flood, so sampled
+        logger.warning("429 at %s: %s", request.url.path, exc.detail, extra=SAMPLED)
+    else:
+        logger.error("ERROR %s at %s: %s", exc.status_code, request.url.path, exc.detail)
     return JSONResponse(
         status_code=exc.status_code,
-        content={"detail": exc.detail}
+        content={"detail": exc.detail},
+        headers=exc.headers  # keep Retry-After & co.
     )
 
 
+def create_app() -> FastAPI:
+    from app.auth import routes as auth_routes
+    from app.auth.utils import password_pool
+    from app.cart import routes as cart_routes
+    from app.core import health_routes, metrics_routes
+    from app.core.database import engine
+    from app.core.metrics import MetricsMiddleware
+    from app.core.querywatch import QueryWatchMiddleware
+    from app.core.startup import prepare_database
+    from app.inventory import admin_routes as inventory_admin_routes
+    from app.inventory.reaper import inventory_reaper
+    from app.mail.outbox import mail_worker
+    from app.orders import admin_routes as order_admin_routes, checkout_routes, order_routes
+    from app.products import public_routes as public_products
+    from app.products import routes as product_routes
+
+    # dev: create_all + search/facet setup; production: alembic head check only
+    prepare_database(engine, settings.STARTUP_MODE)
+
+    app = FastAPI()
+
+    logger.info("DB URL: %r", engine.url)  # repr masks the password; keeps stdout clean
+
+    app.include_router(auth_routes.router) # auth_routes
+
+    app.include_router(product_routes.router)         # /admin/products
+    app.include_router(public_products.router)        # /products
+
+    app.include_router(cart_routes.router) # cart_routes
+
+    app.include_router(checkout_routes.router) # checkout_routes
+    app.include_router(order_routes.router) # order_routes
+    app.include_router(order_admin_routes.router)     # /admin/orders
+    app.include_router(inventory_admin_routes.router)  # /admin/inventory
+
+    app.include_router(health_routes.router) # /health
+
+    if settings.METRICS_ENABLED:
+        app.include_router(metrics_routes.router)  # /metrics
+
+    app.middleware("http")(log_requests)
+
+    if settings.QUERY_WATCH != "off":
+        app.add_middleware(QueryWatchMiddleware)  # N+1 / slow-query report per request
+
+    if settings.METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)  # times the whole stack
+
+    if settings.CORS_ORIGINS:
+        app.add_middleware(
+            CORSMiddleware, allow_origins=settings.CORS_ORIGINS, allow_methods=["*"],
+            allow_headers=["*"], expose_headers=EXPOSED_HEADERS,
+        )  # outermost: preflights never reach the app
+
+    @app.on_event("startup")
+    async def start_mail_worker():
+        if settings.MAIL_WORKER:
+            mail_worker.start()  # also resumes mail left pending by a restart
+
+    @app.on_event("startup")
+    async def start_inventory_reaper():
+        if settings.INVENTORY_REAPER:
+            inventory_reaper.start()  # returns expired checkout holds to stock
+
+    @app.on_event("shutdown")
+    def shutdown_password_pool():
+        password_pool.shutdown()
+
+    @app.on_event("shutdown")
+    async def stop_mail_worker():
+        await mail_worker.stop()
+
+    @app.on_event("shutdown")
+    async def stop_inventory_reaper():
+        await inventory_reaper.stop()
+
+    app.add_exception_handler(HTTPException, custom_http_exception_handler)
+
+    # Built on the first /openapi.json or /docs request, not per worker start.
+    app.openapi = lambda: custom_openapi(app)
+    return app
+
+
 # Optional Swagger customization
-def custom_openapi():
+def custom_openapi(app: FastAPI):
     if app.openapi_schema:
         return app.openapi_schema
     openapi_schema = get_openapi(
@@ -75,4 +159,12 @@ def custom_openapi():
     app.openapi_schema = openapi_schema
     return app.openapi_schema
 
-app.openapi = custom_openapi
+
+def __getattr__(name):
+    # `from app.main import app` / `uvicorn app.main:app`: one shared instance,
+    # built on first access.
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
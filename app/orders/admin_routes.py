@@ -0,0 +1,67 @@
+# app/orders/admin_routes.py
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select
+from typing import Optional
+from datetime import datetime
+from app.auth.utils import require_admin
+from app.core.export import as_utc, export_response, stream_rows
+from app.core.logger import logger
+from app.orders.models import Order, OrderItem
+
+
+router = APIRouter(prefix="/admin/orders", tags=["Admin Orders"])
+
+ORDER_COLUMNS = ("user_id", "status", "total_amount", "created_at", "updated_at")
+ITEM_COLUMNS = ("product_id", "quantity", "price_at_purchase")
+# CSV is one row per order item, with the order columns repeated
+CSV_FIELDS = ["order_id", *ORDER_COLUMNS, *ITEM_COLUMNS]
+
+
+async def _group_orders(row_batches):
+    """Fold (order, item) join rows into nested order records.
+
+    Rows arrive ordered by order id, so an order is complete once a row for
+    the next one shows up; the last order of a batch is held back until then.
+    """
+    current = None
+    async for rows in row_batches:
+        done = []
+        for row in rows:
+            if current is None or current["id"] != row.order_id:
+                if current is not None:
+                    done.append(current)
+                current = {"id": row.order_id, **{name: row._mapping[name] for name in ORDER_COLUMNS}, "items": []}
+            if row.product_id is not None:
+                current["items"].append({name: row._mapping[name] for name in ITEM_COLUMNS})
+        yield done
+    if current is not None:
+        yield [current]
+
+
+async def _item_rows(row_batches):
+    async for rows in row_batches:
+        yield [row._mapping for row in rows]
+
+
+# export: every order with its items, NDJSON (nested) or CSV (one row per item)
+@router.get("/export")
+async def export_orders(
+    format: str = Query(default="ndjson", description="ndjson or csv"),
+    updated_since: Optional[datetime] = Query(default=None, description="only orders changed at or after this time"),
+    batch_size: int = Query(default=1000, ge=1, le=10000),
+    current_user=Depends(require_admin)
+):
+    stmt = select(
+        Order.id.label("order_id"),
+        *(Order.__table__.c[name] for name in ORDER_COLUMNS),
+        *(OrderItem.__table__.c[name] for name in ITEM_COLUMNS),
+    ).outerjoin(OrderItem, OrderItem.order_id == Order.id)\
+        .order_by(Order.id, OrderItem.id)
+    if updated_since is not None:
+        stmt = stmt.where(Order.updated_at >= as_utc(updated_since))
+
+    rows = stream_rows(stmt, batch_size)
+    batches = _item_rows(rows) if format == "csv" else _group_orders(rows)
+    response = export_response(batches, format, CSV_FIELDS, "orders")
+    logger.info("Order export (%s) started by user %s", format, current_user.id)
+    return response
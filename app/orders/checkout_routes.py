@@ -1,62 +1,128 @@
 # app/orders/checkout_routes.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import func, insert, select
 from sqlalchemy.orm import Session
-from app.core.database import SessionLocal
-from app.auth.utils import require_user
-from app.auth.models import User
+from app.core.database import get_db, run_db
+from app.core.read_routing import stick_to_primary
+from app.auth.utils import Principal, require_user
 from app.cart.models import CartItem
 from app.products.models import Product
+from app.products.catalog_cache import catalog_cache
 from app.orders import models, schemas
+from app.inventory import ledger
+from app.inventory.schemas import ReservationOut
 from app.core.logger import logger
 
 
 router = APIRouter(prefix="/checkout", tags=["Checkout"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+
+def cart_quantities(session: Session, user_id: int) -> dict:
+    quantities = dict(session.execute(
+        select(CartItem.product_id, func.sum(CartItem.quantity))
+        .where(CartItem.user_id == user_id)
+        .group_by(CartItem.product_id)
+    ).all())
+    if not quantities:
+        raise HTTPException(status_code=400, detail="Cart is empty")
+    if any(qty <= 0 for qty in quantities.values()):
+        raise HTTPException(status_code=400, detail="Cart contains an invalid quantity")
+    return quantities
+
 
 @router.post("/", response_model=schemas.OrderOut)
-def checkout(
+async def checkout(
+    response: Response,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_user)
+    current_user: Principal = Depends(require_user)
 ):
-    cart_items = db.query(CartItem).filter_by(user_id=current_user.id).all()
+    # Read the cart, reserve its stock in the ledger, insert the order and its
+    # items, commit the reservations, clear the cart.
+    def _checkout(session: Session):
+        quantities = cart_quantities(session, current_user.id)
 
-    if not cart_items:
-        raise HTTPException(status_code=400, detail="Cart is empty")
+        prices = dict(session.execute(
+            select(Product.id, Product.price).where(Product.id.in_(quantities))
+        ).all())
+
+        missing = sorted(set(quantities) - set(prices))
+        if missing:
+            session.rollback()
+            raise HTTPException(status_code=404, detail=f"Product ID {missing[0]} not found")
+
+        # Takes the stock (or reuses matching holds from POST /checkout/reserve);
+        # hot products are decremented on one of their sub-counters.
+        try:
+            ledger.reserve(session, current_user.id, quantities)
+        except ledger.InsufficientStock as e:
+            session.rollback()
+            raise HTTPException(status_code=409, detail=f"Insufficient stock for product IDs: {e.product_ids}")
+
+        items = [
+            {"product_id": pid, "quantity": qty, "price_at_purchase": prices[pid]}
+            for pid, qty in sorted(quantities.items())
+        ]
+        total = sum(item["price_at_purchase"] * item["quantity"] for item in items)
+
+        order = models.Order(user_id=current_user.id, total_amount=total, status="paid")
+        session.add(order)
+        session.flush()
+        session.execute(insert(models.OrderItem), [dict(item, order_id=order.id) for item in items])
+        if not ledger.commit(session, current_user.id, order.id, quantities):
+            session.rollback()
+            raise HTTPException(status_code=409, detail="Stock changed during checkout, please retry")
+        session.query(CartItem).filter_by(user_id=current_user.id).delete(synchronize_session=False)
+        session.commit()
+
+        return {
+            "id": order.id,
+            "total_amount": order.total_amount,
+            "status": order.status,
+            "created_at": order.created_at,
+            "items": items,
+        }
 
-    total = 0
-    order_items = []
-
-    for item in cart_items:
-        product = db.query(Product).filter_by(id=item.product_id).first()
-        if not product:
-            raise HTTPException(status_code=404, detail=f"Product ID {item.product_id} not found")
-
-        subtotal = product.price * item.quantity
-        total += subtotal
-
-        order_item = models.OrderItem(
-            product_id=product.id,
-            quantity=item.quantity,
-            price_at_purchase=product.price
-        )
-        order_items.append(order_item)
-
-    order = models.Order(
-        user_id=current_user.id,
-        total_amount=total,
-        status="paid",
-        items=order_items
-    )
-
-    db.add(order)
-    db.query(CartItem).filter_by(user_id=current_user.id).delete()
-    db.commit()
-    logger.info(f"User {current_user.email} placed an order. Total: ₹{total}")
-    db.refresh(order)
+    order = await run_db(db, _checkout)
+    for item in order["items"]:
+        catalog_cache.invalidate(("detail", item["product_id"]))  # stock changed
+    stick_to_primary(response, current_user.id)  # their order history must show this order
+    logger.info("User %s placed order %s. Total: ₹%s", current_user.id, order["id"], order["total_amount"])
     return order
+
+
+# hold the cart's stock for INVENTORY_HOLD_SECONDS while the user pays; POST /checkout/ uses the holds
+@router.post("/reserve", response_model=ReservationOut)
+async def reserve_cart(
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_user)
+):
+    def _reserve(session: Session):
+        quantities = cart_quantities(session, current_user.id)
+        try:
+            lines = ledger.reserve(session, current_user.id, quantities)
+        except ledger.InsufficientStock as e:
+            session.rollback()
+            raise HTTPException(status_code=409, detail=f"Insufficient stock for product IDs: {e.product_ids}")
+        session.commit()
+        return {"expires_at": lines[0]["expires_at"], "items": lines}
+
+    reservation = await run_db(db, _reserve)
+    for item in reservation["items"]:
+        catalog_cache.invalidate(("detail", item["product_id"]))  # stock changed
+    logger.info("Cart reserved by user %s until %s", current_user.id, reservation["expires_at"])
+    return reservation
+
+# give the held stock back (checkout abandoned)
+@router.delete("/reserve")
+async def release_cart(
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_user)
+):
+    def _release(session: Session):
+        released = ledger.release_holds(session, current_user.id)
+        session.commit()
+        return released
+
+    released = await run_db(db, _release)
+    logger.info("Released %s holds for user %s", released, current_user.id)
+    return {"message": "Reservation released", "released": released}
@@ -1,7 +1,6 @@
-from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, Enum
+from sqlalchemy import Column, Integer, Float, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
-from app.core.database import Base
-from datetime import datetime, timezone
+from app.core.database import Base, UTCDateTime, utcnow
 import enum
 
 class OrderStatus(str, enum.Enum):
@@ -11,12 +10,17 @@ class OrderStatus(str, enum.Enum):
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        # a user's history, newest first, seeks by (created_at, id)
+        Index("ix_orders_user_id_created_at", "user_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     total_amount = Column(Float)
     status = Column(Enum(OrderStatus), default="paid")
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    created_at = Column(UTCDateTime, default=utcnow)
+    updated_at = Column(UTCDateTime, default=utcnow, onupdate=utcnow, index=True)
 
     items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")  
 
@@ -25,7 +29,7 @@ class OrderItem(Base):
     __tablename__ = "order_items"
 
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id"))  
+    order_id = Column(Integer, ForeignKey("orders.id"), index=True)
     product_id = Column(Integer)
     quantity = Column(Integer)
     price_at_purchase = Column(Float)
@@ -1,45 +1,96 @@
 # app/orders/order_routes.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select, tuple_
 from sqlalchemy.orm import Session, joinedload
-from app.core.database import SessionLocal
-from app.auth.utils import require_user
-from app.auth.models import User
+from app.core.database import run_db
+from app.core.read_routing import get_read_db
+from app.core.pagination import decode_cursor, encode_cursor
+from app.core.serialization import FastJSONResponse, isoformat, rows_to_dicts, schema_columns
+from app.auth.utils import Principal, require_user
 from app.orders import models, schemas
-from typing import List
-from app.core.logger import logger
+from typing import List, Optional, Union
+from datetime import datetime
+from app.core.logger import SAMPLED, logger
 
 
 router = APIRouter(prefix="/orders", tags=["Orders"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-@router.get("/", response_model=List[schemas.OrderOut])
-def get_order_history(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_user)
+ORDER_HISTORY_KEY = (models.Order.created_at.desc(), models.Order.id.desc())
+ORDER_COLUMNS = schema_columns(models.Order, schemas.OrderOut, exclude=("items",))
+ITEM_COLUMNS = schema_columns(models.OrderItem, schemas.OrderItemOut)
+
+
+def _summary_columns():
+    # counted in SQL per order, so item rows never leave the database
+    lines = select(func.count(models.OrderItem.id))\
+        .where(models.OrderItem.order_id == models.Order.id).scalar_subquery()
+    units = select(func.coalesce(func.sum(models.OrderItem.quantity), 0))\
+        .where(models.OrderItem.order_id == models.Order.id).scalar_subquery()
+    return (
+        models.Order.id, models.Order.total_amount, models.Order.status, models.Order.created_at,
+        lines.label("item_count"), units.label("total_quantity"),
+    )
+
+
+# newest first, keyset-paginated via X-Next-Cursor; summary=true skips the item lists
+@router.get("/", response_model=Union[List[schemas.OrderOut], List[schemas.OrderSummaryOut]])
+async def get_order_history(
+    limit: int = Query(default=20, ge=1, le=100),
+    cursor: Optional[str] = Query(default=None, description="X-Next-Cursor from the previous page"),
+    summary: bool = Query(default=False, description="order headers with item counts, no items"),
+    db: Session = Depends(get_read_db),  # replica unless the user just checked out
+    current_user: Principal = Depends(require_user)
 ):
-    orders = db.query(models.Order)\
-        .options(joinedload(models.Order.items))\
-        .filter_by(user_id=current_user.id).all()
-    logger.info(f"Order list viewed by: {current_user.email}")
-    return orders
+    after = None
+    if cursor:
+        created_at, order_id = decode_cursor(cursor, str, int)
+        try:
+            after = (datetime.fromisoformat(created_at), order_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    def _query(session: Session):
+        query = session.query(*(_summary_columns() if summary else ORDER_COLUMNS))
+        query = query.filter(models.Order.user_id == current_user.id)
+        if after is not None:
+            # a plain tuple binds through the columns' types, so the cursor time
+            # is normalized to UTC (UTCDateTime) whatever offset it was written with
+            query = query.filter(tuple_(models.Order.created_at, models.Order.id) < after)
+        orders = rows_to_dicts(query.order_by(*ORDER_HISTORY_KEY).limit(limit))
+        if not summary and orders:
+            # items come in one extra IN query instead of repeating every order row per item
+            items = {order["id"]: order.setdefault("items", []) for order in orders}
+            rows = session.execute(
+                select(models.OrderItem.order_id, *ITEM_COLUMNS)
+                .where(models.OrderItem.order_id.in_(items))
+                .order_by(models.OrderItem.id)
+            )
+            for order_id, *values in rows:
+                items[order_id].append(dict(zip(schemas.OrderItemOut.model_fields, values)))
+        return orders
+
+    orders = await run_db(db, _query)
+    headers = {}
+    if len(orders) == limit:
+        last = orders[-1]
+        headers["X-Next-Cursor"] = encode_cursor(isoformat(last["created_at"]), last["id"])
+    logger.info("Order list viewed by user %s", current_user.id, extra=SAMPLED)
+    return FastJSONResponse(orders, headers=headers)
 
 @router.get("/{order_id}", response_model=schemas.OrderOut)
-def get_order_details(
+async def get_order_details(
     order_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_user)
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(require_user)
 ):
-    order = db.query(models.Order)\
-        .options(joinedload(models.Order.items))\
-        .filter_by(id=order_id, user_id=current_user.id).first()
+    def _query(session: Session):
+        return session.query(models.Order)\
+            .options(joinedload(models.Order.items))\
+            .filter_by(id=order_id, user_id=current_user.id).first()
+
+    order = await run_db(db, _query)
     if not order:
-        logger.info(f"Order not found {order_id} viewed by: {current_user.email}")
+        logger.info("Order not found %s viewed by user %s", order_id, current_user.id, extra=SAMPLED)
         raise HTTPException(status_code=404, detail="Order not found")
-    logger.info(f"Order {order_id} viewed by: {current_user.email}")
+    logger.info("Order %s viewed by user %s", order_id, current_user.id, extra=SAMPLED)
     return order
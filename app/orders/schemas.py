@@ -19,3 +19,14 @@ class OrderOut(BaseModel):
 
     class Config:
         orm_mode = True
+
+class OrderSummaryOut(BaseModel):
+    id: int
+    total_amount: float
+    status: str
+    created_at: datetime
+    item_count: int  # order lines
+    total_quantity: int  # units across all lines
+
+    class Config:
+        orm_mode = True
@@ -0,0 +1,89 @@
+# app/products/catalog_cache.py
+"""In-process cache for public catalog reads, with ETag / conditional GET.
+
+Entries are keyed by (catalog version, normalized query) and hold the
+already-serialized JSON body. Admin product writes call ``bump()``, so
+every later read in that process misses and re-queries; with read replicas
+those re-queries go to the primary for DB_READ_YOUR_WRITES_SECONDS, so a
+lagging replica's pre-write rows are not cached for CATALOG_CACHE_TTL.
+Other worker processes only drop their entries when the TTL expires them
+(see ``bump()``). Checkout stock decrements do not bump the version;
+checkout only drops the detail entries of the products it sold, so
+listings may show stock up to CATALOG_CACHE_TTL seconds old (checkout
+itself always checks the real stock).
+"""
+import hashlib
+from dataclasses import dataclass, field
+from fastapi import Request, Response
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.read_routing import stick_all_to_primary
+from app.core.serialization import dumps
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+    headers: dict = field(default_factory=dict)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+class CatalogCache:
+    def __init__(self, maxsize: int, ttl: float, max_age: int):
+        self.version = 0
+        self.max_age = max_age
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def bump(self):
+        """Called after any admin product write; retires every cached entry.
+
+        The version lives in this process only: other workers keep serving
+        their entries until CATALOG_CACHE_TTL expires them (and one that
+        expires while the replicas still lag is refilled from a replica, so
+        add DB_READ_YOUR_WRITES_SECONDS there).
+        """
+        self.version += 1
+        self._entries.clear()
+        stick_all_to_primary()  # refill from the primary until the replicas catch up
+
+    def invalidate(self, key: tuple):
+        self._entries.pop((self.version,) + key)
+
+    async def respond(self, request: Request, key: tuple, produce) -> Response:
+        """Serve ``key`` from cache or from ``await produce()``.
+
+        ``produce`` returns ``(data, headers)`` where ``data`` is already plain
+        dicts / lists shaped like the route's response model; it is encoded
+        once, on the miss (see app/core/serialization.py).
+        """
+        cache_key = (self.version,) + key  # version read *before* the query
+        entry = self._entries.get(cache_key)
+        if entry is None:
+            data, headers = await produce()
+            body = dumps(data)
+            etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+            entry = CachedResponse(body=body, etag=etag, headers=headers)
+            self._entries.set(cache_key, entry)
+
+        headers = {
+            "ETag": entry.etag,
+            "Cache-Control": f"public, max-age={self.max_age}, must-revalidate",
+            **entry.headers,
+        }
+        if etag_matches(request.headers.get("if-none-match"), entry.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+catalog_cache = CatalogCache(
+    maxsize=settings.CATALOG_CACHE_SIZE,
+    ttl=settings.CATALOG_CACHE_TTL,
+    max_age=settings.CATALOG_CACHE_MAX_AGE,
+)
@@ -0,0 +1,209 @@
+# app/products/facets.py
+"""Category counts and price histogram from the precomputed product_facets table.
+
+Admin writes call add_product / remove_product inside their transaction,
+so each change touches one aggregate row; the bulk importer applies each
+batch's changes with apply_changes. A facet request reads aggregate
+rows; only the (at most two) buckets cut by a min_price/max_price filter
+are recounted from products, with a price range scan bounded to a bucket.
+"""
+import math
+import sys
+from typing import Optional
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import dialect_insert
+from app.products.models import Product, ProductFacet
+
+BUCKET_WIDTH = settings.FACET_PRICE_BUCKET_WIDTH
+
+
+def bucket_of(price: float) -> int:
+    return math.floor(price / BUCKET_WIDTH)
+
+
+def add_product(db: Session, category: Optional[str], price: float):
+    _add_to_cell(db, category or "", bucket_of(price), 1, price, price)
+
+
+def _add_to_cell(db: Session, category: str, bucket: int, count: int, low: float, high: float):
+    table = ProductFacet.__table__
+    stmt = dialect_insert(db, table).values(
+        category=category, price_bucket=bucket, product_count=count, min_price=low, max_price=high,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["category", "price_bucket"],
+        set_={
+            "product_count": table.c.product_count + count,
+            "min_price": case((stmt.excluded.min_price < table.c.min_price, stmt.excluded.min_price), else_=table.c.min_price),
+            "max_price": case((stmt.excluded.max_price > table.c.max_price, stmt.excluded.max_price), else_=table.c.max_price),
+        },
+    )
+    db.execute(stmt)
+
+
+def remove_product(db: Session, category: Optional[str], price: float):
+    """Call after the product row is deleted/changed and flushed."""
+    category = category or ""
+    bucket = bucket_of(price)
+    facet = db.query(ProductFacet).filter_by(category=category, price_bucket=bucket)
+    row = facet.with_entities(ProductFacet.product_count, ProductFacet.min_price, ProductFacet.max_price).first()
+    if row is None:
+        return
+    if row.product_count <= 1:
+        facet.delete(synchronize_session=False)
+        return
+
+    values = {"product_count": ProductFacet.product_count - 1}
+    if price <= row.min_price or price >= row.max_price:
+        # The removed product was an extreme of its bucket: recount just that bucket.
+        low, high = _bucket_products(db, category, bucket)\
+            .with_entities(func.min(Product.price), func.max(Product.price)).one()
+        values.update(min_price=low, max_price=high)
+    facet.update(values, synchronize_session=False)
+
+
+def update_product(db: Session, old: tuple, new: tuple):
+    """``old`` / ``new`` are (category, price) before and after the change."""
+    if (old[0] or "", bucket_of(old[1])) == (new[0] or "", bucket_of(new[1])) and old[1] == new[1]:
+        return
+    remove_product(db, *old)
+    add_product(db, *new)
+
+
+def apply_changes(db: Session, changes: list):
+    """Bulk form of add_product / update_product, for one batch of writes.
+
+    ``changes`` holds (old, new) (category, price) pairs, old None for a new
+    product; call after the product rows are written. New values are summed
+    per bucket into one upsert each; a bucket that lost products is recounted
+    from products (a range scan bounded to that bucket)."""
+    recount, added = set(), {}
+    for old, new in changes:
+        if old is not None:
+            if (old[0] or "", old[1]) == (new[0] or "", new[1]):
+                continue
+            recount.add((old[0] or "", bucket_of(old[1])))
+        key = (new[0] or "", bucket_of(new[1]))
+        count, low, high = added.get(key, (0, new[1], new[1]))
+        added[key] = (count + 1, min(low, new[1]), max(high, new[1]))
+
+    for (category, bucket), cell in sorted(added.items()):
+        if (category, bucket) not in recount:
+            _add_to_cell(db, category, bucket, *cell)
+    for category, bucket in sorted(recount):
+        facet = db.query(ProductFacet).filter_by(category=category, price_bucket=bucket)
+        count, low, high = _bucket_products(db, category, bucket)\
+            .with_entities(func.count(), func.min(Product.price), func.max(Product.price)).one()
+        facet.delete(synchronize_session=False)
+        if count:
+            _add_to_cell(db, category, bucket, count, low, high)
+
+
+def _bucket_products(db: Session, category: str, bucket: int):
+    return db.query(Product).filter(
+        func.coalesce(Product.category, "") == category,
+        Product.price >= bucket * BUCKET_WIDTH,
+        Product.price < (bucket + 1) * BUCKET_WIDTH,
+    )
+
+
+def _edge_rows(db: Session, bucket: int, low: Optional[float], high: Optional[float]):
+    """Exact (category, count, min, max) for the part of a bucket inside [low, high]."""
+    query = db.query(
+        func.coalesce(Product.category, ""), func.count(), func.min(Product.price), func.max(Product.price)
+    ).filter(
+        Product.price >= (bucket * BUCKET_WIDTH if low is None else low),
+        Product.price < (bucket + 1) * BUCKET_WIDTH,
+    )
+    if high is not None:
+        query = query.filter(Product.price <= high)
+    return [(category, bucket, count, lo, hi) for category, count, lo, hi in query.group_by(func.coalesce(Product.category, ""))]
+
+
+def get_facets(db: Session, category: Optional[str] = None,
+               min_price: Optional[float] = None, max_price: Optional[float] = None) -> dict:
+    low_bucket = bucket_of(min_price) if min_price is not None else None
+    high_bucket = bucket_of(max_price) if max_price is not None else None
+
+    query = db.query(
+        ProductFacet.category, ProductFacet.price_bucket, ProductFacet.product_count,
+        ProductFacet.min_price, ProductFacet.max_price,
+    )
+    if low_bucket is not None:
+        query = query.filter(ProductFacet.price_bucket >= low_bucket)
+    if high_bucket is not None:
+        query = query.filter(ProductFacet.price_bucket <= high_bucket)
+    rows = [tuple(row) for row in query]
+
+    # Buckets only partly inside the price filter are recounted exactly.
+    edges = {}
+    if min_price is not None and min_price > low_bucket * BUCKET_WIDTH:
+        edges[low_bucket] = (min_price, max_price if high_bucket == low_bucket else None)
+    if max_price is not None and high_bucket not in edges:
+        edges[high_bucket] = (None, max_price)
+    if edges:
+        rows = [row for row in rows if row[1] not in edges]
+        for bucket, (low, high) in edges.items():
+            rows += _edge_rows(db, bucket, low, high)
+
+    # Category counts ignore the category filter itself (so the storefront
+    # can offer the other categories); price stats and histogram apply it.
+    categories, histogram = {}, {}
+    low_price = high_price = None
+    total = 0
+    for row_category, bucket, count, row_min, row_max in rows:
+        categories[row_category] = categories.get(row_category, 0) + count
+        if category and row_category != category:
+            continue
+        total += count
+        histogram[bucket] = histogram.get(bucket, 0) + count
+        low_price = row_min if low_price is None else min(low_price, row_min)
+        high_price = row_max if high_price is None else max(high_price, row_max)
+
+    return {
+        "total": total,
+        "categories": [
+            {"category": name, "count": count}
+            for name, count in sorted(categories.items(), key=lambda item: (-item[1], item[0]))
+        ],
+        "min_price": low_price,
+        "max_price": high_price,
+        "bucket_width": BUCKET_WIDTH,
+        "price_histogram": [
+            {"min": bucket * BUCKET_WIDTH, "max": (bucket + 1) * BUCKET_WIDTH, "count": histogram[bucket]}
+            for bucket in sorted(histogram)
+        ],
+    }
+
+
+def rebuild(db: Session):
+    """Recompute product_facets from scratch (one full scan; setup/maintenance only)."""
+    cells = {}
+    for category, price in db.query(Product.category, Product.price).yield_per(10000):
+        key = (category or "", bucket_of(price))
+        count, low, high = cells.get(key, (0, price, price))
+        cells[key] = (count + 1, min(low, price), max(high, price))
+    db.query(ProductFacet).delete(synchronize_session=False)
+    db.add_all(
+        ProductFacet(category=category, price_bucket=bucket, product_count=count, min_price=low, max_price=high)
+        for (category, bucket), (count, low, high) in cells.items()
+    )
+
+
+def setup(engine):
+    """Backfill the aggregate once if it is empty but products exist."""
+    with Session(engine) as db:
+        if db.query(ProductFacet.category).first() is None and db.query(Product.id).first() is not None:
+            rebuild(db)
+            db.commit()
+
+
+if __name__ == "__main__":
+    if "--rebuild" in sys.argv:
+        from app.core.database import SessionLocal
+        with SessionLocal() as db:
+            rebuild(db)
+            db.commit()
+        print("Rebuilt product_facets.")
@@ -0,0 +1,253 @@
+# app/products/importer.py
+"""Streaming product import from CSV or NDJSON.
+
+Records are parsed one line at a time, validated against ProductCreate and
+upserted on ``sku`` in fixed-size batches (one multi-row INSERT ... ON
+CONFLICT per batch, committed together with its product_facets changes),
+so memory stays flat whatever the feed size. Invalid rows are reported and
+skipped; they never abort a batch.
+Rows that would change the stock of a split product are reported too: its
+stock lives in the inventory ledger (PUT /admin/inventory/{id}/stock).
+
+    python -m app.products.importer feed.csv [--format ndjson] [--batch-size 1000]
+"""
+import argparse
+import codecs
+import csv
+import json
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.core.database import dialect_insert, utcnow
+from app.inventory import ledger
+from app.products import facets
+from app.products.models import Product
+from app.products.schemas import ProductCreate
+from app.products.search import search_backend
+
+FORMATS = ("csv", "ndjson")
+MAX_REPORTED_ERRORS = 1000
+UPSERT_COLUMNS = ("name", "description", "price", "stock", "category", "image_url")
+
+
+class RecordParser:
+    """Push parser: feed text lines, get ``(row_number, dict)`` records back."""
+
+    def __init__(self, fmt: str):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported import format '{fmt}'")
+        self.fmt = fmt
+        self.line_no = 0
+        self._header = None
+        self._pending = []  # CSV lines of a record whose quoted field spans lines
+        self._pending_start = 0
+
+    def feed(self, line: str):
+        """Returns a record, an ``(row, Exception)`` pair, or None (nothing complete yet)."""
+        self.line_no += 1
+        if self.fmt == "ndjson":
+            if not line.strip():
+                return None
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("expected a JSON object")
+            except ValueError as e:
+                return self.line_no, e
+            return self.line_no, record
+
+        if not self._pending:
+            self._pending_start = self.line_no
+        self._pending.append(line)
+        text = "\n".join(self._pending)
+        if text.count('"') % 2:  # still inside a quoted field
+            return None
+        self._pending = []
+        if not text.strip():
+            return None
+        values = next(csv.reader([text]))
+        if self._header is None:
+            self._header = [name.strip() for name in values]
+            return None
+        if len(values) != len(self._header):
+            return self._pending_start, ValueError(
+                f"expected {len(self._header)} columns, got {len(values)}"
+            )
+        return self._pending_start, dict(zip(self._header, values))
+
+
+class ProductImport:
+    """Validates records and hands back full batches ready for write_batch()."""
+
+    def __init__(self, batch_size: int = 1000):
+        self.batch_size = batch_size
+        self.batch = {}  # sku -> (row, values); a later row for the same sku wins
+        self.processed = 0
+        self.upserted = 0
+        self.error_count = 0
+        self.errors = []
+
+    def error(self, row: int, message: str):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": message})
+
+    def add(self, parsed):
+        """Takes a RecordParser result; returns a full batch to write, or None."""
+        if parsed is None:
+            return None
+        row, record = parsed
+        self.processed += 1
+        if isinstance(record, Exception):
+            self.error(row, str(record))
+            return None
+
+        sku = str(record.get("sku") or "").strip()
+        if not sku:
+            self.error(row, "sku is required for import")
+            return None
+        try:
+            values = ProductCreate(**record).model_dump()
+        except ValidationError as e:
+            self.error(row, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+            return None
+        values["sku"] = sku
+
+        self.batch[sku] = (row, values)
+        if len(self.batch) >= self.batch_size:
+            return self.take_batch()
+        return None
+
+    def take_batch(self):
+        batch, self.batch = list(self.batch.values()), {}
+        return batch
+
+    def report(self) -> dict:
+        return {
+            "processed": self.processed,
+            "upserted": self.upserted,
+            "failed": self.error_count,
+            "errors": self.errors,
+            "errors_truncated": self.error_count > len(self.errors),
+        }
+
+
+def _upsert(db: Session, rows: list):
+    stmt = dialect_insert(db, Product.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["sku"],
+        # ON CONFLICT DO UPDATE skips Column.onupdate, so stamp updated_at here.
+        set_={**{column: stmt.excluded[column] for column in UPSERT_COLUMNS}, "updated_at": utcnow()},
+    ).returning(Product.id)
+    return db.execute(stmt, rows).scalars().all()
+
+
+def _split_stock_rows(db: Session, batch: list):
+    """Split ``batch`` into rows to upsert and the row numbers of those that
+    would change the stock of a split product. Kept rows of a split product
+    carry its live stock, which refreshes the display copy."""
+    skus = [values["sku"] for _, values in batch]
+    ledger.lock_products(db, Product.sku.in_(skus))  # no split() until this batch commits
+    split = ledger.split_stock(db, Product.sku, Product.sku.in_(skus))
+    rows, rejected = [], []
+    for row, values in batch:
+        stock = split.get(values["sku"])
+        if stock is None:
+            rows.append(values)
+        elif values["stock"] in stock:
+            rows.append({**values, "stock": stock[1]})
+        else:
+            rejected.append(row)
+    return rows, rejected
+
+
+def _facet_changes(db: Session, rows: list) -> list:
+    """(old, new) (category, price) pairs for facets.apply_changes(). Takes
+    the row locks the upsert would, so no admin edit slips in between."""
+    old = {
+        sku: (category, price) for sku, category, price in db.execute(
+            select(Product.sku, Product.category, Product.price)
+            .where(Product.sku.in_([values["sku"] for values in rows]))
+            .order_by(Product.id).with_for_update()
+        )
+    }
+    return [(old.get(values["sku"]), (values["category"], values["price"])) for values in rows]
+
+
+def _write(db: Session, job: ProductImport, batch: list):
+    rows, rejected = _split_stock_rows(db, batch)
+    if rows:
+        changes = _facet_changes(db, rows)
+        ids = _upsert(db, rows)
+        search_backend.reindex(db, ids)
+        facets.apply_changes(db, changes)
+    db.commit()
+    job.upserted += len(rows)
+    for row in rejected:
+        job.error(row, "stock of a split product is set with PUT /admin/inventory/{id}/stock")
+
+
+def write_batch(db: Session, job: ProductImport, batch: list):
+    """Upsert one batch and commit it. A failing batch is retried row by row
+    so only the offending rows are reported."""
+    if not batch:
+        return
+    try:
+        _write(db, job, batch)
+        return
+    except SQLAlchemyError:
+        db.rollback()
+
+    for row, values in batch:
+        try:
+            _write(db, job, [(row, values)])
+        except SQLAlchemyError as e:
+            db.rollback()
+            job.error(row, str(getattr(e, "orig", e)).strip())
+
+
+def finish_import(db: Session, job: ProductImport):
+    write_batch(db, job, job.take_batch())
+
+
+async def aiter_lines(chunks):
+    """Decode an async stream of byte chunks into text lines."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+def import_file(db: Session, path: str, fmt: str, batch_size: int = 1000) -> dict:
+    parser = RecordParser(fmt)
+    job = ProductImport(batch_size)
+    with open(path, encoding="utf-8-sig", newline="") as feed:
+        for line in feed:
+            batch = job.add(parser.feed(line.rstrip("\r\n")))
+            if batch:
+                write_batch(db, job, batch)
+    finish_import(db, job)
+    return job.report()
+
+
+if __name__ == "__main__":
+    from app.core.database import SessionLocal, engine
+
+    cli = argparse.ArgumentParser(description="Bulk import products from a CSV or NDJSON feed")
+    cli.add_argument("path")
+    cli.add_argument("--format", choices=FORMATS, help="defaults to the file extension")
+    cli.add_argument("--batch-size", type=int, default=1000)
+    args = cli.parse_args()
+
+    search_backend.setup(engine)
+    fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+    with SessionLocal() as db:
+        report = import_file(db, args.path, fmt, args.batch_size)
+    print(json.dumps(report, indent=2))
@@ -1,13 +1,37 @@
-from sqlalchemy import Column, Integer, String, Float
-from app.core.database import Base
+from sqlalchemy import Column, Index, Integer, String, Float, PrimaryKeyConstraint
+from app.core.database import Base, UTCDateTime, utcnow
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        # (sort key, id) pairs for keyset pagination in list_products
+        Index("ix_products_price_id", "price", "id"),
+        Index("ix_products_name_id", "name", "id"),
+        Index("ix_products_stock_id", "stock", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     description = Column(String)
     price = Column(Float, nullable=False)
-    stock = Column(Integer, default=0)
+    stock = Column(Integer, default=0, server_default="0", nullable=False)
     category = Column(String)
     image_url = Column(String)
+    sku = Column(String, unique=True, index=True)  # natural key for bulk imports
+    updated_at = Column(UTCDateTime, default=utcnow, onupdate=utcnow, index=True)  # export ?updated_since=
+
+
+class ProductFacet(Base):
+    """Precomputed product count and price range per (category, price bucket).
+
+    Maintained incrementally by app/products/facets.py so the facets
+    endpoint never aggregates over the products table.
+    """
+    __tablename__ = "product_facets"
+    __table_args__ = (PrimaryKeyConstraint("category", "price_bucket"),)
+
+    category = Column(String, nullable=False)  # "" for uncategorized products
+    price_bucket = Column(Integer, nullable=False)  # floor(price / FACET_PRICE_BUCKET_WIDTH)
+    product_count = Column(Integer, nullable=False, default=0)
+    min_price = Column(Float, nullable=False)
+    max_price = Column(Float, nullable=False)
@@ -1,57 +1,145 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Request
+from sqlalchemy import select, tuple_
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.products.models import Product
-from app.products.schemas import ProductOut
-from app.core.database import SessionLocal
+from app.products.schemas import ProductFacets, ProductOut
+from app.products import facets
+from app.core.database import get_db, run_db
+from app.core.read_routing import get_read_db
+from app.core.pagination import decode_cursor, encode_cursor
+from app.core.serialization import rows_to_dicts, schema_columns
+from app.products.search import search_backend
+from app.products.catalog_cache import catalog_cache
+from app.core.ratelimit import RateLimit
 
 router = APIRouter(prefix="/products", tags=["Public Products"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Every sort is (column, id) so ordering is total and keyset-pageable; each
+# pair is backed by a composite index (see Product.__table_args__).
+SORT_COLUMNS = {"id": Product.id, "price": Product.price, "name": Product.name, "stock": Product.stock}
+
+# Reads select just ProductOut's columns as tuples (no ORM identity map,
+# no per-row validation); the catalog cache encodes the dicts once.
+PRODUCT_COLUMNS = schema_columns(Product, ProductOut)
+
+def _check_price_range(min_price: Optional[float], max_price: Optional[float]):
+    # an inverted range matches nothing; say so instead of answering with an
+    # empty list here and bucket-level counts from /products/facets
+    if min_price is not None and max_price is not None and min_price > max_price:
+        raise HTTPException(status_code=422, detail="min_price must not be greater than max_price")
 
 @router.get("/", response_model=List[ProductOut])
-def list_products(
+async def list_products(
+    request: Request,
     category: Optional[str] = None,
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     sort_by: Optional[str] = Query(default="id"),
     page: int = 1,
     page_size: int = 10,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(default=None, description="X-Next-Cursor from the previous page; replaces page"),
+    db: Session = Depends(get_read_db)
 ):
-    query = db.query(Product)
+    _check_price_range(min_price, max_price)
+    if sort_by not in SORT_COLUMNS:
+        sort_by = "id"
+    sort_column = SORT_COLUMNS[sort_by]
+    key_columns = (Product.id,) if sort_by == "id" else (sort_column, Product.id)
+
+    after = None
+    if cursor:
+        cursor_sort, *after = decode_cursor(cursor, str, *(column.type.python_type for column in key_columns))
+        if cursor_sort != sort_by:
+            raise HTTPException(status_code=400, detail="Cursor does not match sort_by")
+
+    def _query(session: Session):
+        query = session.query(*PRODUCT_COLUMNS)
+
+        if category:
+            query = query.filter(Product.category == category)
+        if min_price is not None:
+            query = query.filter(Product.price >= min_price)
+        if max_price is not None:
+            query = query.filter(Product.price <= max_price)
 
-    if category:
-        query = query.filter(Product.category == category)
-    if min_price is not None:
-        query = query.filter(Product.price >= min_price)
-    if max_price is not None:
-        query = query.filter(Product.price <= max_price)
+        query = query.order_by(*key_columns)
 
-    if sort_by in ["price", "name", "stock"]:
-        query = query.order_by(getattr(Product, sort_by))
+        if after is not None:
+            # Keyset: seek past the last row seen instead of OFFSET-scanning.
+            query = query.filter(tuple_(*key_columns) > tuple_(*after))
+        else:
+            query = query.offset((page - 1) * page_size)
 
-    offset = (page - 1) * page_size
-    query = query.offset(offset).limit(page_size)
+        return rows_to_dicts(query.limit(page_size))
 
-    return query.all()
+    async def _produce():
+        products = await run_db(db, _query)
+        headers = {}
+        if len(products) == page_size:
+            last = products[-1]
+            headers["X-Next-Cursor"] = encode_cursor(
+                sort_by, *(last[column.key] for column in key_columns)
+            )
+        return products, headers
+
+    key = ("list", category, min_price, max_price, sort_by, page_size, cursor or page)
+    return await catalog_cache.respond(request, key, _produce)
 
 # //search prod by keyword
-@router.get("/search", response_model=List[ProductOut])
-def search_products(keyword: str, db: Session = Depends(get_db)):
-    return db.query(Product).filter(Product.name.ilike(f"%{keyword}%")).all()
+# a keyword search can scan the table: per-IP limit, cache hits included
+search_limit = RateLimit("search", per_minute=120, burst=30, concurrency=4)
+
+@router.get("/search", response_model=List[ProductOut], dependencies=[Depends(search_limit)])
+async def search_products(
+    request: Request,
+    keyword: str = Query(..., min_length=1),
+    page: int = Query(default=1, ge=1),
+    page_size: int = Query(default=20, ge=1, le=100),
+    db: Session = Depends(get_read_db)
+):
+    # Relevance-ranked, index-backed search (see app/products/search.py)
+    def _query(session: Session):
+        return rows_to_dicts(search_backend.search(
+            session, keyword, limit=page_size, offset=(page - 1) * page_size, columns=PRODUCT_COLUMNS
+        ))
+
+    async def _produce():
+        return await run_db(db, _query), {}
+
+    key = ("search", " ".join(keyword.lower().split()), page, page_size)
+    return await catalog_cache.respond(request, key, _produce)
+
+# category counts + price histogram for the current filters
+@router.get("/facets", response_model=ProductFacets)
+async def get_product_facets(
+    request: Request,
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    db: Session = Depends(get_db)
+):
+    _check_price_range(min_price, max_price)
+
+    async def _produce():
+        return await run_db(db, facets.get_facets, category, min_price, max_price), {}
+
+    key = ("facets", category, min_price, max_price)
+    return await catalog_cache.respond(request, key, _produce)
 
 # search prod by id
 @router.get("/{product_id}", response_model=ProductOut)
-def get_product_detail(product_id: int, db: Session = Depends(get_db)):
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    return product
+async def get_product_detail(product_id: int, request: Request, db: Session = Depends(get_read_db)):
+    def _query(session: Session):
+        row = session.execute(select(*PRODUCT_COLUMNS).where(Product.id == product_id)).first()
+        return row._asdict() if row else None
+
+    async def _produce():
+        product = await run_db(db, _query)
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
+        return product, {}
+
+    return await catalog_cache.respond(request, ("detail", product_id), _produce)
 
 
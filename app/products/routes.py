@@ -1,77 +1,180 @@
-from fastapi import APIRouter, Depends, HTTPException 
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from app.core.database import SessionLocal
+from app.core.database import get_db, run_db
 from . import models, schemas
 from app.auth.utils import require_admin
 from app.core.logger import logger
-from typing import List
+from typing import List, Optional
+from datetime import datetime
+from app.core.export import as_utc, export_response, stream_rows
+from app.core.serialization import FastJSONResponse, rows_to_dicts, schema_columns
 from .models import Product
 from .schemas import ProductOut
+from .search import search_backend
+from . import facets
+from .catalog_cache import catalog_cache
+from app.inventory import ledger
+from .importer import FORMATS, ProductImport, RecordParser, aiter_lines, finish_import, write_batch
 
 router = APIRouter(prefix="/admin/products", tags=["Admin Products"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/", response_model=schemas.ProductOut)
-def create_product(
+async def create_product(
     product: schemas.ProductCreate,
     db: Session = Depends(get_db),
     current_user=Depends(require_admin)
 ):
     new_product = models.Product(**product.model_dump())
-    db.add(new_product)
-    db.commit()
-    db.refresh(new_product)
-    logger.info(f"Product created: {product.name} by {current_user.email}")
+
+    def _create(session: Session):
+        session.add(new_product)
+        try:
+            session.flush()
+        except IntegrityError:
+            session.rollback()
+            raise HTTPException(status_code=409, detail="A product with this SKU already exists")
+        search_backend.index_product(session, new_product)
+        facets.add_product(session, new_product.category, new_product.price)
+        session.commit()
+        session.refresh(new_product)
+
+    await run_db(db, _create)
+    catalog_cache.bump()
+    logger.info("Product created: %s (%s) by user %s", new_product.id, product.name, current_user.id)
     return new_product
 
 
 
+# bulk import: stream a CSV / NDJSON body, upsert on sku in batches
+@router.post("/import")
+async def import_products(
+    request: Request,
+    format: str = Query(default=None, description="csv or ndjson; defaults from Content-Type"),
+    batch_size: int = Query(default=1000, ge=1, le=10000),
+    db: Session = Depends(get_db),
+    current_user=Depends(require_admin)
+):
+    if format is None:
+        format = "ndjson" if "json" in request.headers.get("content-type", "") else "csv"
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {list(FORMATS)}")
+
+    parser = RecordParser(format)
+    job = ProductImport(batch_size)
+    async for line in aiter_lines(request.stream()):
+        batch = job.add(parser.feed(line))
+        if batch:
+            await run_db(db, write_batch, job, batch)
+    await run_db(db, finish_import, job)
+
+    catalog_cache.bump()
+    logger.info("Product import by user %s: %s upserted, %s failed", current_user.id, job.upserted, job.error_count)
+    return job.report()
+
+
+EXPORT_COLUMNS = ("id", "sku", "name", "description", "price", "stock", "category", "image_url", "updated_at")
+
+# export: stream the catalog as NDJSON / CSV straight off a server-side cursor
+@router.get("/export")
+async def export_products(
+    format: str = Query(default="ndjson", description="ndjson or csv"),
+    updated_since: Optional[datetime] = Query(default=None, description="only products changed at or after this time"),
+    batch_size: int = Query(default=1000, ge=1, le=10000),
+    current_user=Depends(require_admin)
+):
+    stmt = select(*(Product.__table__.c[name] for name in EXPORT_COLUMNS)).order_by(Product.id)
+    if updated_since is not None:
+        stmt = stmt.where(Product.updated_at >= as_utc(updated_since))
+
+    async def batches():
+        async for rows in stream_rows(stmt, batch_size):
+            yield [dict(row._mapping) for row in rows]
+
+    response = export_response(batches(), format, list(EXPORT_COLUMNS), "products")
+    logger.info("Product export (%s) started by user %s", format, current_user.id)
+    return response
+
+
 @router.get("/", response_model=List[ProductOut])
-def get_all_products(
+async def get_all_products(
     db: Session = Depends(get_db),
     current_user=Depends(require_admin)
 ):
-    return db.query(Product).all()
+    def _query(session: Session):
+        return rows_to_dicts(session.execute(select(*schema_columns(Product, ProductOut)).order_by(Product.id)))
+
+    return FastJSONResponse(await run_db(db, _query))
 
 # update_product
 @router.put("/{product_id}", response_model=ProductOut)
-def update_product(
+async def update_product(
     product_id: int,
     updated_product: schemas.ProductCreate,
     db: Session = Depends(get_db),
     current_user=Depends(require_admin)
 ):
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
+    def _update(session: Session):
+        # the row lock keeps split() out until commit
+        product = session.query(Product).filter(Product.id == product_id).with_for_update().first()
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
+
+        values = updated_product.model_dump(exclude_unset=True)
+        split = ledger.split_stock(session, Product.id, Product.id == product_id).get(product_id)
+        if split:
+            # A split product sells from its buckets; products.stock is a display
+            # copy that may lag them, so only an unchanged stock is accepted here.
+            if values.get("stock", product.stock) not in split:
+                session.rollback()
+                raise HTTPException(
+                    status_code=409,
+                    detail=f"Product stock is split, set it with PUT /admin/inventory/{product_id}/stock",
+                )
+            values["stock"] = split[1]
 
-    for key, value in updated_product.dict().items():
-        setattr(product, key, value)
+        old_facet = (product.category, product.price)
+        for key, value in values.items():
+            setattr(product, key, value)
 
-    db.commit()
-    logger.info(f"Product updated: {product_id} by {current_user.email}")
-    db.refresh(product)
+        try:
+            session.flush()
+        except IntegrityError:
+            session.rollback()
+            raise HTTPException(status_code=409, detail="A product with this SKU already exists")
+        search_backend.index_product(session, product)
+        facets.update_product(session, old_facet, (product.category, product.price))
+        session.commit()
+        session.refresh(product)
+        return product
+
+    product = await run_db(db, _update)
+    catalog_cache.bump()
+    logger.info("Product updated: %s by user %s", product_id, current_user.id)
     return product
 
 # delete Product
 @router.delete("/{product_id}")
-def delete_product(
+async def delete_product(
     product_id: int,
     db: Session = Depends(get_db),
     current_user=Depends(require_admin)
 ):
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
+    def _delete(session: Session):
+        product = session.query(Product).filter(Product.id == product_id).first()
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
+
+        old_facet = (product.category, product.price)
+        session.delete(product)
+        session.flush()
+        search_backend.remove_product(session, product_id)
+        facets.remove_product(session, *old_facet)
+        session.commit()
 
-    db.delete(product)
-    db.commit()
-    logger.info(f"Product deleted: {product_id} by {current_user.email}")
+    await run_db(db, _delete)
+    catalog_cache.bump()
+    logger.info("Product deleted: %s by user %s", product_id, current_user.id)
     return {"message": "Product deleted successfully"}
 
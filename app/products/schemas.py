@@ -1,4 +1,5 @@
 from pydantic import BaseModel, field_validator
+from typing import List, Optional
 
 class ProductCreate(BaseModel):
     name: str
@@ -7,6 +8,7 @@ class ProductCreate(BaseModel):
     stock: int
     category: str
     image_url: str
+    sku: Optional[str] = None
 
     @field_validator("price")
     def validate_price(cls, v):
@@ -21,9 +23,9 @@ class ProductCreate(BaseModel):
         return v
 
     @field_validator("name", "description", "category", "image_url")
-    def validate_non_empty(cls, v, field):
+    def validate_non_empty(cls, v, info):
         if not v.strip():
-            raise ValueError(f"{field.name} must not be empty")
+            raise ValueError(f"{info.field_name} must not be empty")
         return v
 
 class ProductOut(ProductCreate):
@@ -31,3 +33,21 @@ class ProductOut(ProductCreate):
 
     class Config:
         orm_mode = True
+
+
+class CategoryFacet(BaseModel):
+    category: str
+    count: int
+
+class PriceBucket(BaseModel):
+    min: float
+    max: float
+    count: int
+
+class ProductFacets(BaseModel):
+    total: int
+    categories: List[CategoryFacet]
+    min_price: Optional[float]
+    max_price: Optional[float]
+    bucket_width: float
+    price_histogram: List[PriceBucket]
@@ -0,0 +1,168 @@
+# app/products/search.py
+"""Ranked product search over name, category and description.
+
+Postgres: a generated ``search_vector`` tsvector column with a GIN index,
+plus a pg_trgm index on name for typo tolerance (migration 5c0e7a9d41b3).
+SQLite: an FTS5 table ``products_fts`` keyed by product id, kept in sync
+by the admin product routes. Anything else falls back to ILIKE on name.
+"""
+import re
+from sqlalchemy import column, func, literal_column, or_, table, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from app.core.database import engine
+from app.core.logger import logger
+from app.products.models import Product
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+products_fts = table("products_fts", column("rowid"))
+
+
+def tokenize(keyword: str) -> list:
+    return _TOKEN.findall(keyword.lower())
+
+
+class LikeSearchBackend:
+    name = "like"
+
+    def setup(self, engine):
+        pass
+
+    def index_product(self, db: Session, product: Product):
+        pass
+
+    def remove_product(self, db: Session, product_id: int):
+        pass
+
+    def reindex(self, db: Session, product_ids=None):
+        pass
+
+    def search(self, db: Session, keyword: str, limit: int, offset: int, columns=(Product,)):
+        return db.query(*columns)\
+            .filter(Product.name.ilike(f"%{keyword}%"))\
+            .order_by(Product.id)\
+            .offset(offset).limit(limit).all()
+
+
+class PostgresSearchBackend(LikeSearchBackend):
+    name = "postgres"
+
+    # Same DDL as the migration, so a create_all()-built dev database works too.
+    DDL = [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        """ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector
+           GENERATED ALWAYS AS (
+               setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+               setweight(to_tsvector('simple', coalesce(category, '')), 'B') ||
+               setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+           ) STORED""",
+        "CREATE INDEX IF NOT EXISTS ix_products_search_vector ON products USING gin (search_vector)",
+        "CREATE INDEX IF NOT EXISTS ix_products_name_trgm ON products USING gin (name gin_trgm_ops)",
+    ]
+
+    def setup(self, engine):
+        with engine.begin() as conn:
+            for statement in self.DDL:
+                conn.execute(text(statement))
+
+    # index_product / remove_product stay no-ops: the generated column and
+    # its GIN index are maintained by Postgres on every write.
+
+    def search(self, db: Session, keyword: str, limit: int, offset: int, columns=(Product,)):
+        tokens = tokenize(keyword)
+        if not tokens:
+            return []
+        # Prefix match on every token (search-as-you-type), OR a trigram hit
+        # on the name so "hodie" still finds "Hoodie".
+        tsquery = func.to_tsquery("simple", " & ".join(f"{token}:*" for token in tokens))
+        vector = literal_column("products.search_vector")
+        rank = func.ts_rank_cd(vector, tsquery) + func.similarity(Product.name, keyword)
+        return db.query(*columns)\
+            .filter(or_(vector.op("@@")(tsquery), Product.name.op("%")(keyword)))\
+            .order_by(rank.desc(), Product.id)\
+            .offset(offset).limit(limit).all()
+
+
+class SQLiteSearchBackend(LikeSearchBackend):
+    name = "sqlite_fts5"
+    available = True
+
+    def setup(self, engine):
+        try:
+            with engine.begin() as conn:
+                exists = conn.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'"
+                )).first()
+                if not exists:
+                    conn.execute(text(
+                        "CREATE VIRTUAL TABLE products_fts USING fts5("
+                        "name, description, category, tokenize = 'unicode61 remove_diacritics 2')"
+                    ))
+                    conn.execute(text(
+                        "INSERT INTO products_fts (rowid, name, description, category) "
+                        "SELECT id, name, coalesce(description, ''), coalesce(category, '') FROM products"
+                    ))
+        except OperationalError as e:
+            self.available = False
+            logger.warning("SQLite FTS5 unavailable, product search falls back to LIKE: %s", e)
+
+    def index_product(self, db: Session, product: Product):
+        if self.available:
+            db.execute(
+                text("INSERT OR REPLACE INTO products_fts (rowid, name, description, category) "
+                     "VALUES (:id, :name, :description, :category)"),
+                {"id": product.id, "name": product.name,
+                 "description": product.description or "", "category": product.category or ""},
+            )
+
+    def remove_product(self, db: Session, product_id: int):
+        if self.available:
+            db.execute(text("DELETE FROM products_fts WHERE rowid = :id"), {"id": product_id})
+
+    def reindex(self, db: Session, product_ids=None):
+        """Re-sync FTS rows for the given products (all when None), e.g. after a bulk load."""
+        if not self.available:
+            return
+        if product_ids is None:
+            db.execute(text("DELETE FROM products_fts"))
+            rows = db.query(Product.id, Product.name, Product.description, Product.category)
+        else:
+            rows = db.query(Product.id, Product.name, Product.description, Product.category)\
+                .filter(Product.id.in_(list(product_ids)))
+        params = [
+            {"id": r.id, "name": r.name, "description": r.description or "", "category": r.category or ""}
+            for r in rows
+        ]
+        if params:
+            db.execute(
+                text("INSERT OR REPLACE INTO products_fts (rowid, name, description, category) "
+                     "VALUES (:id, :name, :description, :category)"),
+                params,
+            )
+
+    def search(self, db: Session, keyword: str, limit: int, offset: int, columns=(Product,)):
+        if not self.available:
+            return super().search(db, keyword, limit, offset, columns)
+        tokens = tokenize(keyword)
+        if not tokens:
+            return []
+        # Quoted prefix terms: user input can never be parsed as FTS5 syntax.
+        match = " ".join(f'"{token}"*' for token in tokens)
+        return db.query(*columns)\
+            .join(products_fts, products_fts.c.rowid == Product.id)\
+            .filter(text("products_fts MATCH :match"))\
+            .order_by(text("bm25(products_fts, 10.0, 1.0, 3.0)"), Product.id)\
+            .params(match=match)\
+            .offset(offset).limit(limit).all()
+
+
+def _backend_for(dialect_name: str) -> LikeSearchBackend:
+    if dialect_name == "postgresql":
+        return PostgresSearchBackend()
+    if dialect_name == "sqlite":
+        return SQLiteSearchBackend()
+    return LikeSearchBackend()
+
+
+search_backend = _backend_for(engine.dialect.name)
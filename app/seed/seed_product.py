@@ -1,6 +1,8 @@
 # seed/seed_products.py
 from app.core.database import SessionLocal
 from app.products.models import Product
+from app.products import facets
+from app.products.search import search_backend
 
 # Sample product data
 product_data = [
@@ -51,7 +53,11 @@ def seed_products():
     for data in product_data:
         existing = db.query(Product).filter_by(name=data["name"]).first()
         if not existing:
-            db.add(Product(**data))
+            product = Product(**data)
+            db.add(product)
+            db.flush()
+            search_backend.index_product(db, product)
+            facets.add_product(db, product.category, product.price)
     db.commit()
     db.close()
     print("Seeded default products into the database.")
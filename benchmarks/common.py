@@ -0,0 +1,101 @@
+# benchmarks/common.py
+# Shared plumbing for the benchmark scripts: point the app at a throwaway
+# database before it is imported, seed data, and summarize latencies.
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup_env(database_url: str = None, **overrides):
+    """Configure env vars for the app. Must run before ``import app.main``."""
+    if database_url is None:
+        database_url = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="shop-bench-"), "bench.db")
+    os.environ["DATABASE_URL"] = database_url
+    for key in ("EMAIL_HOST", "EMAIL_USER", "EMAIL_PASSWORD"):
+        os.environ.setdefault(key, "bench")
+    # every in-process client shares one IP; benchmarks opt in to rate limits
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    for key, value in overrides.items():
+        if value is not None:
+            os.environ[key] = str(value)
+    os.chdir(ROOT)
+    os.makedirs("logs", exist_ok=True)
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    return database_url
+
+
+def seed(users: int = 1, products: int = 200, password: str = "benchpass1"):
+    """Insert bench users (user0@gmail.com ...) and products; returns the emails."""
+    from app.auth.hashing import hash_password
+    from app.auth.models import User
+    from app.core.database import SessionLocal
+    from app.products import facets
+    from app.products.models import Product
+    from app.products.search import search_backend
+
+    hashed = hash_password(password)
+    categories = ["clothing", "electronics", "footwear", "stationery", "home"]
+    db = SessionLocal()
+    try:
+        db.add_all(
+            User(name=f"Bench {i}", email=f"user{i}@gmail.com", hashed_password=hashed, role="user")
+            for i in range(users)
+        )
+        db.add_all(
+            Product(
+                name=f"Bench product {i}",
+                description=f"Benchmark item number {i}",
+                price=round(10 + (i * 7.31) % 4990, 2),
+                stock=1000,
+                category=categories[i % len(categories)],
+                image_url=f"https://example.com/images/{i}.png",
+            )
+            for i in range(products)
+        )
+        db.flush()
+        search_backend.reindex(db)  # bulk insert bypasses the admin routes' index upkeep
+        facets.rebuild(db)
+        db.commit()
+    finally:
+        db.close()
+    return [f"user{i}@gmail.com" for i in range(users)]
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def summarize(latencies, elapsed: float = None) -> dict:
+    """Latencies in seconds -> count/throughput/percentiles in milliseconds."""
+    summary = {
+        "count": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(max(latencies, default=0.0) * 1000, 3),
+    }
+    if elapsed:
+        summary["throughput_rps"] = round(len(latencies) / elapsed, 2)
+    return summary
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+
+
+def emit(result: dict):
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,94 @@
+# benchmarks/logging_overhead.py
+"""Request latency and per-call cost of logging, by logging pipeline.
+
+    python -m benchmarks.logging_overhead --mode off     # LOG_LEVEL=WARNING: no info lines at all
+    python -m benchmarks.logging_overhead --mode sync    # text handlers writing on the event loop (old setup)
+    python -m benchmarks.logging_overhead --mode queue   # QueueHandler -> JSON in the listener thread
+
+Drives GET /cart/ and GET /orders/ (three info lines each, access log
+included) with concurrent clients and prints JSON with p50/p95/p99, plus the
+time one logger.info() call costs the caller. Console output goes to
+/dev/null, but it is still written.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from benchmarks.common import Timer, emit, seed, setup_env, summarize
+
+MODES = {
+    "off": {"LOG_LEVEL": "WARNING"},
+    "sync": {"LOG_ASYNC": "false", "LOG_FORMAT": "text"},
+    "queue": {"LOG_ASYNC": "true", "LOG_FORMAT": "json"},
+}
+
+
+def logger_call_cost(calls: int) -> dict:
+    from app.core.logger import SAMPLED, logger
+
+    latencies = []
+    for i in range(calls):
+        start = time.perf_counter()
+        logger.info("Cart viewed by user %s", i, extra=SAMPLED)
+        latencies.append(time.perf_counter() - start)
+    return {name.replace("_ms", "_us"): round(value * 1000, 2) for name, value in summarize(latencies).items() if name.endswith("_ms")}
+
+
+async def run(args):
+    import httpx
+    from app.main import app
+
+    emails = seed(users=args.clients, products=50)
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        headers = []
+        for email in emails:
+            r = await client.post("/auth/signin", json={"email": email, "password": "benchpass1"})
+            auth = {"Authorization": f"Bearer {r.json()['access_token']}"}
+            for product_id in (1, 2, 3):
+                await client.post("/cart/", json={"product_id": product_id, "quantity": 1}, headers=auth)
+            headers.append(auth)
+
+        async def worker(auth):
+            for i in range(args.requests):
+                path = "/cart/" if i % 2 else "/orders/"
+                start = time.perf_counter()
+                r = await client.get(path, headers=auth)
+                latencies.append(time.perf_counter() - start)
+                assert r.status_code == 200, r.text
+
+        with Timer() as timer:
+            await asyncio.gather(*(worker(auth) for auth in headers))
+
+    return summarize(latencies, timer.elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=MODES, default="queue")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--requests", type=int, default=250, help="requests per client")
+    parser.add_argument("--calls", type=int, default=20000, help="direct logger.info() calls to time")
+    args = parser.parse_args()
+
+    log_file = os.path.join(tempfile.mkdtemp(prefix="shop-bench-logs-"), "app.log")
+    setup_env(LOG_FILE=log_file, PASSWORD_HASH_WORKERS=0, **MODES[args.mode])
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 2)  # console handler still writes, just not to the terminal
+
+    requests = asyncio.run(run(args))
+    emit({
+        "benchmark": "logging_overhead",
+        "mode": args.mode,
+        "clients": args.clients,
+        "requests": requests,
+        "logger_info_call": logger_call_cost(args.calls),
+    })
+
+
+if __name__ == "__main__":
+    main()
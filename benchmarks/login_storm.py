@@ -0,0 +1,97 @@
+# benchmarks/login_storm.py
+"""Signin and catalog latency while a login storm is running.
+
+    python -m benchmarks.login_storm --hash-workers 0   # bcrypt in the threadpool
+    python -m benchmarks.login_storm --hash-workers 4   # bcrypt process pool
+    python -m benchmarks.login_storm --rate-limit       # per-IP limits on
+
+The storm comes from one client IP; a few legitimate users (each on its own
+IP) sign in every few seconds while others browse the catalog. Prints JSON
+with p50/p95/p99 for the storm's and the legitimate signins and for
+/products/, plus how many signins were shed with 503 by the bounded hashing
+queue or with 429 by the rate limiter.
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+from benchmarks.common import emit, seed, setup_env, summarize
+
+
+async def run(args):
+    import httpx
+    from app.main import app
+    from app.auth.utils import password_pool
+
+    emails = seed(users=args.storm + args.legit, products=500)
+    signin_lat, legit_lat, catalog_lat, statuses = [], [], [], Counter()
+    deadline = time.perf_counter() + args.duration
+
+    def client_from(ip):
+        transport = httpx.ASGITransport(app=app, client=(ip, 50000))
+        return httpx.AsyncClient(transport=transport, base_url="http://bench")
+
+    storm = client_from("203.0.113.66")
+    legit = [client_from(f"198.51.100.{i + 1}") for i in range(args.legit)]
+    browser = client_from("198.51.100.200")
+
+    async def signin_loop(client, email, label, latencies, pause=0.0):
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            r = await client.post("/auth/signin", json={"email": email, "password": "benchpass1"})
+            statuses[f"{label}_{r.status_code}"] += 1
+            if r.status_code == 200:
+                latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(pause)
+
+    async def catalog_loop(worker):
+        page = worker
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            r = await browser.get("/products/", params={"page": page % 50 + 1, "page_size": 10})
+            statuses[f"catalog_{r.status_code}"] += 1
+            catalog_lat.append(time.perf_counter() - start)
+            page += 1
+
+    await asyncio.gather(
+        *(signin_loop(storm, email, "signin", signin_lat) for email in emails[:args.storm]),
+        *(signin_loop(client, email, "legit_signin", legit_lat, pause=3.0)
+          for client, email in zip(legit, emails[args.storm:])),
+        *(catalog_loop(i) for i in range(args.catalog)),
+    )
+    for client in (storm, browser, *legit):
+        await client.aclose()
+
+    password_pool.shutdown()
+    emit({
+        "benchmark": "login_storm",
+        "hash_workers": args.hash_workers,
+        "max_pending": args.max_pending,
+        "rate_limit": args.rate_limit,
+        "duration_s": args.duration,
+        "signin": summarize(signin_lat, args.duration),
+        "legit_signin": summarize(legit_lat, args.duration),
+        "catalog": summarize(catalog_lat, args.duration),
+        "statuses": dict(statuses),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--storm", type=int, default=32, help="concurrent signins from the abusive IP")
+    parser.add_argument("--legit", type=int, default=4, help="users signing in every 3s, one IP each")
+    parser.add_argument("--catalog", type=int, default=8, help="concurrent catalog clients")
+    parser.add_argument("--hash-workers", type=int, default=2)
+    parser.add_argument("--max-pending", type=int, default=64)
+    parser.add_argument("--rate-limit", action="store_true", help="enable the per-IP rate limits")
+    args = parser.parse_args()
+
+    setup_env(PASSWORD_HASH_WORKERS=args.hash_workers, PASSWORD_HASH_MAX_PENDING=args.max_pending,
+              RATE_LIMIT_ENABLED=str(args.rate_limit).lower())
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
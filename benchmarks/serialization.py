@@ -0,0 +1,142 @@
+# benchmarks/serialization.py
+"""CPU cost of building 1,000-row JSON responses: ORM + pydantic vs column tuples + orjson.
+
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --rows 5000 --repeat 50
+
+Seeds --rows products and a cart holding every one of them, then times, per
+response, fetching and encoding
+
+* ``orm_pydantic``: ORM entities (joinedload for the cart, line subtotals and
+  stock flags in Python) validated through TypeAdapter(List[...]) with
+  from_attributes, then dump_json (the old path);
+* ``tuples_json``: schema_columns() tuples -> dicts, stdlib json (the
+  fallback when orjson is missing);
+* ``tuples_orjson``: the same dicts through app.core.serialization.dumps.
+
+Prints JSON with wall and CPU milliseconds per response (median of
+--repeat), split into query and encode, and the CPU saving against
+orm_pydantic. Every variant must produce the same JSON document.
+"""
+import argparse
+import json
+import statistics
+import time
+
+from benchmarks.common import emit, seed, setup_env
+
+
+def measure(fetch, encode, repeat: int) -> dict:
+    walls, cpus, query_cpus = [], [], []
+    body = None
+    for _ in range(repeat):
+        wall, cpu = time.perf_counter(), time.process_time()
+        data = fetch()
+        fetched = time.process_time()
+        body = encode(data)
+        cpus.append(time.process_time() - cpu)
+        query_cpus.append(fetched - cpu)
+        walls.append(time.perf_counter() - wall)
+    return {
+        "wall_ms": round(statistics.median(walls) * 1000, 3),
+        "cpu_ms": round(statistics.median(cpus) * 1000, 3),
+        "query_cpu_ms": round(statistics.median(query_cpus) * 1000, 3),
+        "encode_cpu_ms": round((statistics.median(cpus) - statistics.median(query_cpus)) * 1000, 3),
+        "bytes": len(body),
+        "_body": body,
+    }
+
+
+def variants(session, user_id: int) -> dict:
+    from typing import List
+    from pydantic import TypeAdapter
+    from sqlalchemy import select
+    from sqlalchemy.orm import joinedload
+    from app.cart.models import CartItem
+    from app.cart.routes import load_cart
+    from app.cart.schemas import CartItemOut
+    from app.core.serialization import dumps, rows_to_dicts, schema_columns
+    from app.products.models import Product
+    from app.products.schemas import ProductOut
+
+    products_adapter = TypeAdapter(List[ProductOut])
+    cart_adapter = TypeAdapter(List[CartItemOut])
+    columns = schema_columns(Product, ProductOut)
+
+    def orm_products():
+        session.expunge_all()  # a request starts with an empty identity map
+        return session.query(Product).order_by(Product.id).all()
+
+    def orm_cart():
+        session.expunge_all()
+        lines = session.query(CartItem).options(joinedload(CartItem.product))\
+            .filter_by(user_id=user_id).order_by(CartItem.id).all()
+        return [
+            {"id": line.id, "quantity": line.quantity, "product": line.product,
+             "subtotal": line.quantity * line.product.price, "in_stock": line.product.stock >= line.quantity}
+            for line in lines
+        ]
+
+    def tuple_products():
+        return rows_to_dicts(session.execute(select(*columns).order_by(Product.id)))
+
+    def pydantic(adapter):
+        return lambda data: adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+
+    def stdlib(data):
+        return json.dumps(data, default=str, separators=(",", ":")).encode()
+
+    return {
+        "products": {
+            "orm_pydantic": (orm_products, pydantic(products_adapter)),
+            "tuples_json": (tuple_products, stdlib),
+            "tuples_orjson": (tuple_products, dumps),
+        },
+        "cart": {
+            "orm_pydantic": (orm_cart, pydantic(cart_adapter)),
+            "tuples_json": (lambda: load_cart(session, user_id)["items"], stdlib),
+            "tuples_orjson": (lambda: load_cart(session, user_id)["items"], dumps),
+        },
+    }
+
+
+def run(args) -> dict:
+    from app.main import app  # noqa: F401  (building it creates the tables)
+    from sqlalchemy import select
+    from app.auth.models import User
+    from app.cart.models import CartItem
+    from app.core.database import SessionLocal
+
+    seed(users=1, products=args.rows)
+    results = {}
+    with SessionLocal() as session:
+        user_id = session.execute(select(User.id)).scalar_one()
+        session.add_all(CartItem(user_id=user_id, product_id=i, quantity=1 + i % 3) for i in range(1, args.rows + 1))
+        session.commit()
+
+        for endpoint, cases in variants(session, user_id).items():
+            for fetch, encode in cases.values():  # warm statement caches / imports
+                encode(fetch())
+            measured = {name: measure(fetch, encode, args.repeat) for name, (fetch, encode) in cases.items()}
+            documents = {name: json.loads(result.pop("_body")) for name, result in measured.items()}
+            assert all(document == documents["orm_pydantic"] for document in documents.values()), endpoint
+            base = measured["orm_pydantic"]["cpu_ms"]
+            for result in measured.values():
+                result["cpu_saving_pct"] = round((base - result["cpu_ms"]) / base * 100, 1)
+            results[endpoint] = measured
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", help="defaults to a throwaway SQLite file")
+    parser.add_argument("--rows", type=int, default=1000, help="rows per response")
+    parser.add_argument("--repeat", type=int, default=30, help="timed responses per variant")
+    args = parser.parse_args()
+
+    setup_env(args.database_url, PASSWORD_HASH_WORKERS=0)
+    emit({"benchmark": "serialization", "rows": args.rows, "repeat": args.repeat, "results": run(args)})
+
+
+if __name__ == "__main__":
+    main()
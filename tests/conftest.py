@@ -0,0 +1,97 @@
+# tests/conftest.py
+# The app reads its settings when first imported, so the environment is set
+# here, before any test module imports it: a throwaway SQLite database, logs
+# in the same temp dir, and no background workers (tests drive them).
+import os
+import tempfile
+
+import pytest
+
+TMP = tempfile.mkdtemp(prefix="shop-tests-")
+os.environ.update({
+    "DATABASE_URL": "sqlite:///" + os.path.join(TMP, "shop.db"),
+    "EMAIL_HOST": "127.0.0.1",
+    "EMAIL_USER": "shop@example.com",
+    "EMAIL_PASSWORD": "test",
+    "LOG_FILE": os.path.join(TMP, "app.log"),
+    "LOG_ASYNC": "false",
+    "MAIL_WORKER": "false",
+    "INVENTORY_REAPER": "false",
+    "PASSWORD_HASH_WORKERS": "0",
+    "RATE_LIMIT_ENABLED": "false",
+    "QUERY_WATCH": "warn",  # statement listeners on; tests/test_querywatch.py goes strict
+})
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app.main import create_app
+
+    return create_app()
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    from fastapi.testclient import TestClient
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def db():
+    from app.core.database import SessionLocal
+
+    with SessionLocal() as session:
+        yield session
+
+
+_users = iter(range(1, 1_000_000))
+
+
+def make_user(role: str = "user") -> dict:
+    """New users row; returns its bearer auth headers."""
+    from app.auth.models import User
+    from app.auth.utils import create_access_token
+    from app.core.database import SessionLocal
+
+    email = f"{role}{next(_users)}@example.com"
+    with SessionLocal() as session:
+        user = User(name=email, email=email, hashed_password="x", role=role)
+        session.add(user)
+        session.commit()
+        token = create_access_token({"sub": email, "uid": user.id, "role": role})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def user_headers(client):
+    return make_user("user")
+
+
+@pytest.fixture
+def admin_headers(client):
+    return make_user("admin")
+
+
+@pytest.fixture
+def make_product(client):
+    from app.core.database import SessionLocal
+    from app.products import facets
+    from app.products.models import Product
+    from app.products.search import search_backend
+
+    def make_product(stock: int = 10, price: float = 100.0, category: str = "electronics", **values) -> int:
+        with SessionLocal() as session:
+            product = Product(
+                name=values.pop("name", "Test product"), description="A product under test", price=price,
+                stock=stock, category=category, image_url="https://example.com/p.png", **values,
+            )
+            session.add(product)
+            session.flush()
+            search_backend.index_product(session, product)
+            facets.add_product(session, product.category, product.price)
+            session.commit()
+            return product.id
+
+    return make_product
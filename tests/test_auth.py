@@ -0,0 +1,47 @@
+# tests/test_auth.py
+from conftest import make_user
+
+
+def users_row(session, client, headers):
+    from app.auth.models import User
+
+    email = client.get("/auth/profile", headers=headers).json()["email"]
+    return session.query(User).filter_by(email=email).one()
+
+
+def test_role_change_applies_from_the_next_request_after_commit(client, db):
+    headers = make_user()
+    assert client.get("/cart/summary", headers=headers).status_code == 200  # principal now cached
+
+    user = users_row(db, client, headers)
+    user.role = "admin"
+    db.flush()
+    # still uncommitted: a request now sees (and may re-cache) the committed role
+    assert client.get("/cart/summary", headers=headers).status_code == 200
+    db.commit()
+    assert client.get("/cart/summary", headers=headers).status_code == 403
+    assert client.get("/admin/products/", headers=headers).status_code == 200
+
+
+def test_rolled_back_change_keeps_the_cached_principal(client, db):
+    from app.auth.utils import principal_cache
+
+    headers = make_user()
+    assert client.get("/cart/summary", headers=headers).status_code == 200
+    user = users_row(db, client, headers)
+    email = user.email
+
+    user.role = "admin"
+    db.flush()
+    db.rollback()
+    assert principal_cache.get(email) is not None
+    assert client.get("/cart/summary", headers=headers).status_code == 200
+
+
+def test_deleted_user_is_refused_on_the_next_request(client, db):
+    headers = make_user()
+    assert client.get("/cart/summary", headers=headers).status_code == 200
+
+    db.delete(users_row(db, client, headers))
+    db.commit()
+    assert client.get("/cart/summary", headers=headers).status_code == 401
@@ -0,0 +1,135 @@
+# tests/test_cart.py
+import os
+import re
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from conftest import make_user
+
+
+@contextmanager
+def cart_statements():
+    """Verbs of the SQL statements on the cart table while the block runs."""
+    from app.core.database import engine
+
+    seen = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if re.search(r"\b(FROM|UPDATE|INTO)\s+cart\b", statement):
+            seen.append(statement.split(None, 1)[0].upper())
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield seen
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def test_cart_view_is_a_list_unless_totals_are_asked_for(client, make_product):
+    headers = make_user()
+    cheap, dear = make_product(price=10.0, stock=5), make_product(price=25.0, stock=1)
+    client.post("/cart/", json={"product_id": cheap, "quantity": 3}, headers=headers)
+    client.post("/cart/", json={"product_id": dear, "quantity": 2}, headers=headers)
+
+    lines = client.get("/cart/", headers=headers).json()
+    assert [(line["product"]["id"], line["quantity"], line["subtotal"], line["in_stock"]) for line in lines] == [
+        (cheap, 3, 30.0, True), (dear, 2, 50.0, False),
+    ]
+    view = client.get("/cart/", params={"totals": "true"}, headers=headers).json()
+    assert view["items"] == lines
+    assert (view["item_count"], view["total_quantity"], view["total"], view["all_in_stock"]) == (2, 5, 80.0, False)
+    summary = client.get("/cart/summary", headers=headers).json()
+    assert summary == {"item_count": 2, "total_quantity": 5, "total": 80.0}
+
+
+def test_update_is_one_statement_returning_the_line(client, make_product):
+    headers = make_user()
+    product_id = make_product(price=10.0, stock=5)
+    client.post("/cart/", json={"product_id": product_id, "quantity": 1}, headers=headers)
+
+    with cart_statements() as statements:
+        r = client.put(f"/cart/{product_id}", json={"product_id": product_id, "quantity": 6}, headers=headers)
+    assert statements == ["UPDATE"]
+    line = r.json()
+    assert (line["quantity"], line["subtotal"], line["in_stock"]) == (6, 60.0, False)
+    assert line == client.get("/cart/", headers=headers).json()[0]
+
+    assert client.put("/cart/999999", json={"product_id": 999999, "quantity": 1}, headers=headers).status_code == 404
+
+
+def test_adding_twice_upserts_one_line(client, make_product):
+    headers = make_user()
+    product_id = make_product(price=10.0, stock=5)
+
+    first = client.post("/cart/", json={"product_id": product_id, "quantity": 2}, headers=headers).json()
+    with cart_statements() as statements:
+        second = client.post("/cart/", json={"product_id": product_id, "quantity": 3}, headers=headers).json()
+    assert statements == ["INSERT"]
+    assert second == {"id": first["id"], "product_id": product_id, "quantity": 5}
+    assert [line["quantity"] for line in client.get("/cart/", headers=headers).json()] == [5]
+
+    assert client.post("/cart/", json={"product_id": 999999, "quantity": 1}, headers=headers).status_code == 404
+
+
+def test_quantities_must_be_positive(client, make_product):
+    headers = make_user()
+    product_id = make_product()
+    client.post("/cart/", json={"product_id": product_id, "quantity": 2}, headers=headers)
+
+    for quantity in (0, -3):
+        line = {"product_id": product_id, "quantity": quantity}
+        assert client.post("/cart/", json=line, headers=headers).status_code == 422
+        assert client.put(f"/cart/{product_id}", json=line, headers=headers).status_code == 422
+        for mode in ("merge", "replace"):
+            batch = {"mode": mode, "items": [line]}
+            assert client.post("/cart/batch", json=batch, headers=headers).status_code == 422
+    assert [line["quantity"] for line in client.get("/cart/", headers=headers).json()] == [2]
+
+
+def test_batch_merge_and_replace(client, make_product):
+    headers = make_user()
+    a, b, c = make_product(price=1.0), make_product(price=2.0), make_product(price=3.0)
+    client.post("/cart/", json={"product_id": a, "quantity": 1}, headers=headers)
+    client.post("/cart/", json={"product_id": b, "quantity": 1}, headers=headers)
+
+    def lines(response):
+        assert response.status_code == 200, response.text
+        return [(line["product"]["id"], line["quantity"]) for line in response.json()]
+
+    # merge adds to existing lines, sums repeated ids and leaves the rest alone
+    merged = client.post("/cart/batch", json={"mode": "merge", "items": [
+        {"product_id": a, "quantity": 2}, {"product_id": c, "quantity": 1}, {"product_id": c, "quantity": 4},
+    ]}, headers=headers)
+    assert lines(merged) == [(a, 3), (b, 1), (c, 5)]
+
+    replaced = client.post("/cart/batch", json={"mode": "replace", "items": [
+        {"product_id": c, "quantity": 2},
+    ]}, headers=headers)
+    assert lines(replaced) == [(c, 2)]
+
+    # an unknown id fails the whole batch
+    r = client.post("/cart/batch", json={"mode": "merge", "items": [
+        {"product_id": a, "quantity": 1}, {"product_id": 999999, "quantity": 1},
+    ]}, headers=headers)
+    assert r.status_code == 404
+    assert lines(client.get("/cart/", headers=headers)) == [(c, 2)]
+
+    assert lines(client.post("/cart/batch", json={"mode": "replace", "items": []}, headers=headers)) == []
+
+
+def test_cart_logs_are_lazy_and_name_the_user_by_id(client, make_product, caplog):
+    headers = make_user()
+    product_id = make_product()
+    profile = client.get("/auth/profile", headers=headers).json()
+
+    with caplog.at_level("INFO", logger="ecommerce"):
+        client.post("/cart/", json={"product_id": product_id, "quantity": 1}, headers=headers)
+        client.put(f"/cart/{product_id}", json={"product_id": product_id, "quantity": 2}, headers=headers)
+        client.delete(f"/cart/{product_id}", headers=headers)
+    cart_lines = [record for record in caplog.records if record.pathname.endswith(os.path.join("cart", "routes.py"))]
+    assert len(cart_lines) == 3
+    for record in cart_lines:
+        assert record.args and "%s" in record.msg  # formatted by the handler, not the caller
+        assert f"user {profile['id']}" in record.getMessage()
+        assert profile["email"] not in record.getMessage()
@@ -0,0 +1,21 @@
+# tests/test_exports.py
+import json
+from datetime import datetime, timedelta, timezone
+
+KOLKATA = timezone(timedelta(hours=5, minutes=30))
+
+
+def test_updated_since_is_an_instant_whatever_its_offset(client, admin_headers, make_product):
+    product_id = make_product()
+    now = datetime.now(timezone.utc)
+
+    def exported(since: datetime) -> dict:
+        r = client.get("/admin/products/export", params={"updated_since": since.isoformat()}, headers=admin_headers)
+        return {row["id"]: row for row in map(json.loads, r.text.splitlines())}
+
+    assert product_id in exported((now - timedelta(minutes=1)).astimezone(KOLKATA))
+    assert product_id not in exported((now + timedelta(minutes=1)).astimezone(KOLKATA))
+    assert product_id in exported((now - timedelta(minutes=1)).replace(tzinfo=None))  # naive: UTC
+    row = exported(now - timedelta(minutes=1))[product_id]
+    assert row["updated_at"].endswith("Z")
+    assert abs(datetime.fromisoformat(row["updated_at"]) - now) < timedelta(minutes=1)
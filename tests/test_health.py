@@ -0,0 +1,14 @@
+# tests/test_health.py
+
+
+def test_db_pool_status_is_admin_only(client, user_headers, admin_headers):
+    assert client.get("/health/db-pool").status_code == 401
+    assert client.get("/health/db-pool", headers=user_headers).status_code == 403
+    r = client.get("/health/db-pool", headers=admin_headers)
+    assert r.status_code == 200 and "checked_out" in r.json()["primary"]
+
+
+def test_metrics_do_not_publish_pool_status(client):
+    r = client.get("/metrics")
+    assert r.status_code == 200 and "http_requests_total" in r.text
+    assert "db_pool" not in r.text and "replica" not in r.text
@@ -0,0 +1,114 @@
+# tests/test_import.py
+import json
+
+import pytest
+
+HEAD = "sku,name,description,price,stock,category,image_url"
+
+
+def csv_feed(*rows) -> str:
+    return "\n".join([HEAD, *rows])
+
+
+def csv_row(sku: str, price=100.0, category="import-check", stock=5, name="Imported") -> str:
+    return f"{sku},{name},An imported product,{price},{stock},{category},https://example.com/i.png"
+
+
+def ndjson_row(sku: str, price=100.0, category="import-check", stock=5, name="Imported") -> str:
+    return json.dumps({
+        "sku": sku, "name": name, "description": "An imported product", "price": price,
+        "stock": stock, "category": category, "image_url": "https://example.com/i.png",
+    })
+
+
+def run_import(client, admin_headers, fmt: str, body: str, **params) -> dict:
+    r = client.post("/admin/products/import", params={"format": fmt, **params}, content=body, headers=admin_headers)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def products_by_sku(client, admin_headers, prefix: str) -> dict:
+    products = client.get("/admin/products/", headers=admin_headers).json()
+    return {p["sku"]: p for p in products if (p["sku"] or "").startswith(prefix)}
+
+
+def facet_rows(db) -> list:
+    from app.products.models import ProductFacet
+
+    return sorted(db.query(
+        ProductFacet.category, ProductFacet.price_bucket, ProductFacet.product_count,
+        ProductFacet.min_price, ProductFacet.max_price,
+    ).all())
+
+
+def assert_facets_match_a_rebuild(db):
+    from app.products import facets
+
+    kept = facet_rows(db)
+    facets.rebuild(db)
+    db.flush()
+    try:
+        assert kept == facet_rows(db)
+    finally:
+        db.rollback()
+
+
+@pytest.mark.parametrize("fmt, row, feed", [
+    ("csv", csv_row, csv_feed),
+    ("ndjson", ndjson_row, lambda *rows: "\n".join(rows)),
+])
+def test_import_upserts_on_sku(monkeypatch, client, admin_headers, db, fmt, row, feed):
+    from app.products import facets
+
+    rebuild = facets.rebuild
+    monkeypatch.setattr(facets, "rebuild", lambda db: pytest.fail("the import rescanned the whole catalog"))
+    prefix = f"IMP-{fmt}-"
+    first = run_import(client, admin_headers, fmt, feed(
+        row(prefix + "1", price=100.0), row(prefix + "2", price=700.0), row(prefix + "3", price=1200.0),
+    ), batch_size=2)
+    assert (first["processed"], first["upserted"], first["failed"]) == (3, 3, 0)
+    ids = {sku: p["id"] for sku, p in products_by_sku(client, admin_headers, prefix).items()}
+
+    # same skus again: rows are updated in place (moving buckets / categories), plus one new sku
+    second = run_import(client, admin_headers, fmt, feed(
+        row(prefix + "1", price=650.0, name="Renamed"), row(prefix + "2", price=700.0, category="import-other"),
+        row(prefix + "3", price=1200.0), row(prefix + "4", price=90.0),
+    ), batch_size=3)
+    assert (second["processed"], second["upserted"], second["failed"]) == (4, 4, 0)
+    products = products_by_sku(client, admin_headers, prefix)
+    assert {sku: p["id"] for sku, p in products.items() if sku in ids} == ids
+    assert (products[prefix + "1"]["name"], products[prefix + "1"]["price"]) == ("Renamed", 650.0)
+    assert products[prefix + "2"]["category"] == "import-other"
+    assert len(products) == 4
+    monkeypatch.setattr(facets, "rebuild", rebuild)
+    assert_facets_match_a_rebuild(db)
+
+
+def test_import_reports_bad_rows_and_keeps_the_rest(client, admin_headers, db):
+    report = run_import(client, admin_headers, "csv", "\n".join([
+        HEAD,
+        csv_row("IMP-BAD-1"),
+        csv_row("", price=5.0),  # no sku
+        csv_row("IMP-BAD-2", price="cheap"),
+        "IMP-BAD-3,too,few",
+        csv_row("IMP-BAD-4", price=2500.0),
+    ]))
+    assert (report["processed"], report["upserted"], report["failed"]) == (5, 2, 3)
+    assert [error["row"] for error in report["errors"]] == [3, 4, 5]
+    assert "price" in report["errors"][1]["error"]
+    assert report["errors_truncated"] is False
+    assert set(products_by_sku(client, admin_headers, "IMP-BAD-")) == {"IMP-BAD-1", "IMP-BAD-4"}
+
+    report = run_import(client, admin_headers, "ndjson", "\n".join([ndjson_row("IMP-BAD-5"), "[1, 2]", "{oops"]))
+    assert (report["upserted"], [error["row"] for error in report["errors"]]) == (1, [2, 3])
+    assert_facets_match_a_rebuild(db)
+
+
+def test_error_report_is_truncated(monkeypatch, client, admin_headers):
+    from app.products import importer
+
+    monkeypatch.setattr(importer, "MAX_REPORTED_ERRORS", 3)
+    report = run_import(client, admin_headers, "ndjson", "\n".join(["{}"] * 5 + [ndjson_row("IMP-TRUNC-1")]))
+    assert (report["processed"], report["upserted"], report["failed"]) == (6, 1, 5)
+    assert [error["row"] for error in report["errors"]] == [1, 2, 3]
+    assert report["errors_truncated"] is True
@@ -0,0 +1,97 @@
+# tests/test_inventory.py
+import threading
+
+from conftest import make_user
+
+
+def checkout(client, product_id: int, quantity: int = 1):
+    headers = make_user()
+    client.post("/cart/", json={"product_id": product_id, "quantity": quantity}, headers=headers)
+    return client.post("/checkout/", headers=headers)
+
+
+def product_body(**values) -> dict:
+    return {"name": "Test product", "description": "A product under test", "price": 100.0, "stock": 4,
+            "category": "electronics", "image_url": "https://example.com/p.png", **values}
+
+
+def test_admin_edit_does_not_respread_stale_stock(client, admin_headers, make_product):
+    product_id = make_product(stock=4)
+    r = client.put(f"/admin/inventory/{product_id}/buckets", json={"buckets": 2}, headers=admin_headers)
+    assert r.json()["buckets"] == [2, 2]
+    assert all(checkout(client, product_id).status_code == 200 for _ in range(4))
+
+    # products.stock still shows 4 (the reaper is off); a price-only edit sends it back
+    r = client.put(f"/admin/products/{product_id}", json=product_body(price=120.0), headers=admin_headers)
+    assert r.status_code == 200 and r.json()["stock"] == 0
+    inventory = client.get(f"/admin/inventory/{product_id}", headers=admin_headers).json()
+    assert inventory["buckets"] == [0, 0] and inventory["sold"] == 4
+    assert checkout(client, product_id).status_code == 409
+
+    r = client.put(f"/admin/products/{product_id}", json=product_body(stock=10), headers=admin_headers)
+    assert r.status_code == 409
+
+    r = client.put(f"/admin/inventory/{product_id}/stock", json={"available": 6}, headers=admin_headers)
+    assert r.json()["buckets"] == [3, 3]
+    assert checkout(client, product_id, 6).status_code == 200
+    assert checkout(client, product_id).status_code == 409
+
+
+def test_import_reports_stock_changes_of_split_products(client, admin_headers, make_product):
+    product_id = make_product(stock=4, sku="SPLIT-1")
+    client.put(f"/admin/inventory/{product_id}/buckets", json={"buckets": 2}, headers=admin_headers)
+    assert checkout(client, product_id).status_code == 200
+
+    head = "sku,name,description,price,stock,category,image_url"
+    row = "SPLIT-1,Test product,A product under test,150,{},electronics,https://example.com/p.png"
+    unchanged, changed = row.format(4), row.format(9)  # 4 is the stale display copy
+    r = client.post("/admin/products/import?format=csv", content=f"{head}\n{unchanged}", headers=admin_headers)
+    assert r.json()["upserted"] == 1 and r.json()["failed"] == 0
+    r = client.post("/admin/products/import?format=csv", content=f"{head}\n{changed}", headers=admin_headers)
+    assert r.json()["upserted"] == 0 and r.json()["errors"][0]["row"] == 2
+
+    product = next(p for p in client.get("/admin/products/", headers=admin_headers).json() if p["id"] == product_id)
+    assert product["price"] == 150 and product["stock"] == 3
+    assert client.get(f"/admin/inventory/{product_id}", headers=admin_headers).json()["available"] == 3
+
+
+def inventory(client, admin_headers, product_id: int) -> dict:
+    return client.get(f"/admin/inventory/{product_id}", headers=admin_headers).json()
+
+
+def test_reserve_then_checkout_moves_stock_to_sold(client, admin_headers, make_product):
+    product_id = make_product(stock=5)
+    headers = make_user()
+    client.post("/cart/", json={"product_id": product_id, "quantity": 2}, headers=headers)
+
+    assert client.post("/checkout/reserve", headers=headers).status_code == 200
+    state = inventory(client, admin_headers, product_id)
+    assert (state["available"], state["held"], state["sold"], state["buckets"]) == (3, 2, 0, [])
+
+    assert client.post("/checkout/", headers=headers).status_code == 200
+    state = inventory(client, admin_headers, product_id)
+    assert (state["available"], state["held"], state["sold"]) == (3, 0, 2)
+
+
+def test_last_unit_sells_once(client, admin_headers, make_product):
+    product_id = make_product(stock=1)  # unsplit: checkout decrements products.stock
+    buyers = [make_user() for _ in range(2)]
+    for headers in buyers:
+        client.post("/cart/", json={"product_id": product_id, "quantity": 1}, headers=headers)
+
+    start = threading.Barrier(len(buyers))
+    results = [None] * len(buyers)
+
+    def buy(index):
+        start.wait()
+        results[index] = client.post("/checkout/", headers=buyers[index]).status_code
+
+    threads = [threading.Thread(target=buy, args=(index,)) for index in range(len(buyers))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results)[0] == 200 and sorted(results)[1] in (400, 409)
+    state = inventory(client, admin_headers, product_id)
+    assert (state["available"], state["held"], state["sold"]) == (0, 0, 1)
@@ -0,0 +1,178 @@
+# tests/test_mail.py
+"""MailWorker against a local aiosmtpd relay (pip install aiosmtpd).
+
+The relay accepts every recipient except busy*@ (451, try again later) and
+bad*@ (550, no such user).
+"""
+import os
+import socket
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+pytest.importorskip("aiosmtpd")
+from aiosmtpd.controller import Controller  # noqa: E402
+
+
+class Relay:
+    def __init__(self):
+        self.received = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("busy"):
+            return "451 4.3.0 Mailbox busy, try again later"
+        if address.startswith("bad"):
+            return "550 5.1.1 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received.append(envelope)
+        return "250 Message accepted"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def relay(monkeypatch):
+    from app.core.config import settings
+
+    handler = Relay()
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    monkeypatch.setattr(settings, "EMAIL_HOST", "127.0.0.1")
+    monkeypatch.setattr(settings, "EMAIL_PORT", controller.port)
+    monkeypatch.setattr(settings, "EMAIL_STARTTLS", False)
+    monkeypatch.setattr(settings, "EMAIL_PASSWORD", "")
+    monkeypatch.setattr(settings, "MAIL_RETRY_BASE", 5.0)
+    monkeypatch.setattr(settings, "MAIL_MAX_ATTEMPTS", 3)
+    handler.controller = controller
+    yield handler
+    handler.controller.stop()
+
+
+@pytest.fixture
+def worker(client, db):
+    from app.mail.models import OutboxEmail
+    from app.mail.outbox import MailWorker
+
+    db.query(OutboxEmail).delete()
+    db.commit()
+    worker = MailWorker()
+    yield worker
+    worker.connection.close()
+
+
+def queue(db, *addresses) -> list:
+    from app.mail.outbox import enqueue
+
+    rows = [enqueue(db, address, "Reset your password", "<p>Hi</p>") for address in addresses]
+    db.commit()
+    return [row.id for row in rows]
+
+
+def outbox(db, mail_id: int):
+    from app.mail.models import OutboxEmail
+
+    db.expire_all()
+    return db.get(OutboxEmail, mail_id)
+
+
+def make_due(db, mail_id: int):
+    from app.core.database import utcnow
+    from app.mail.models import OutboxEmail
+
+    db.execute(update(OutboxEmail).where(OutboxEmail.id == mail_id).values(next_attempt_at=utcnow()))
+    db.commit()
+
+
+def test_sends_over_one_connection(relay, worker, db):
+    ids = queue(db, "alice@example.com", "bob@example.com")
+    assert worker.drain() is None  # nothing left pending
+
+    assert [envelope.rcpt_tos for envelope in relay.received] == [["alice@example.com"], ["bob@example.com"]]
+    assert relay.received[0].content.decode().count("Reset your password") == 1
+    for mail_id in ids:
+        row = outbox(db, mail_id)
+        assert (row.status, row.attempts, row.last_error) == ("sent", 1, None)
+        assert row.sent_at is not None
+    assert worker.sent == 2
+
+
+def test_transient_failure_retries_with_backoff(relay, worker, db):
+    (mail_id,) = queue(db, "busy@example.com")
+
+    wait = worker.drain()
+    row = outbox(db, mail_id)
+    assert (row.status, row.attempts) == ("pending", 1)
+    assert "451" in row.last_error
+    assert 5 * 0.8 - 1 <= wait <= 5 * 1.2  # MAIL_RETRY_BASE, +-20% jitter
+
+    make_due(db, mail_id)
+    wait = worker.drain()
+    assert outbox(db, mail_id).attempts == 2
+    assert 10 * 0.8 - 1 <= wait <= 10 * 1.2  # doubled
+
+    make_due(db, mail_id)
+    assert worker.drain() is None  # MAIL_MAX_ATTEMPTS reached
+    row = outbox(db, mail_id)
+    assert (row.status, row.attempts) == ("failed", 3)
+    assert relay.received == []
+
+
+def test_permanent_failure_is_not_retried(relay, worker, db):
+    bad, good = queue(db, "bad@example.com", "carol@example.com")
+    assert worker.drain() is None
+
+    row = outbox(db, bad)
+    assert (row.status, row.attempts) == ("failed", 1)
+    assert "550" in row.last_error
+    assert outbox(db, good).status == "sent"  # the rest of the batch goes on
+    assert worker.failed == 1
+
+
+def test_relay_down_defers_the_batch(relay, worker, db):
+    relay.controller.stop()
+    first, second = queue(db, "dave@example.com", "erin@example.com")
+
+    wait = worker.drain()
+    assert wait is not None and wait > 0
+    row = outbox(db, first)
+    assert (row.status, row.attempts) == ("pending", 1)  # the try that found the relay down
+    row = outbox(db, second)
+    assert (row.status, row.attempts) == ("pending", 0)  # untried: no attempt charged
+
+    relay.controller = Controller(relay, hostname="127.0.0.1", port=relay.controller.port)  # back up
+    relay.controller.start()
+    make_due(db, first)
+    make_due(db, second)
+    assert worker.drain() is None
+    assert outbox(db, first).status == outbox(db, second).status == "sent"
+    assert len(relay.received) == 2
+
+
+@pytest.mark.skipif(not os.getenv("TEST_POSTGRES_URL"), reason="TEST_POSTGRES_URL not set")
+def test_backoff_with_a_non_utc_session_time_zone(relay, worker, monkeypatch):
+    from app.mail import outbox as outbox_module
+    from app.mail.models import OutboxEmail
+
+    engine = create_engine(os.environ["TEST_POSTGRES_URL"], connect_args={"options": "-c timezone=Asia/Kolkata"})
+    OutboxEmail.__table__.drop(engine, checkfirst=True)
+    OutboxEmail.__table__.create(engine)
+    Session = sessionmaker(bind=engine, expire_on_commit=False)
+    monkeypatch.setattr(outbox_module, "SessionLocal", Session)
+    try:
+        with Session() as db:
+            (mail_id,) = queue(db, "busy@example.com")
+            wait = worker.drain()
+            assert 5 * 0.8 - 1 <= wait <= 5 * 1.2  # not off by the +05:30 offset
+            row = outbox(db, mail_id)
+            assert row.next_attempt_at - row.created_at < timedelta(seconds=10)
+    finally:
+        engine.dispose()
@@ -0,0 +1,26 @@
+# tests/test_metrics.py
+import threading
+
+
+def test_shards_of_exited_threads_are_folded():
+    from app.core.metrics import _Shards
+
+    shards = _Shards()
+
+    def work():
+        cells = shards.mine()
+        cells[("requests", ())] = cells.get(("requests", ()), 0) + 1
+        cells[("latency", ())] = [1, 0, 0.5, 1]
+
+    for _ in range(20):
+        threads = [threading.Thread(target=work) for _ in range(25)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(shards._live) <= 26  # this batch (+ one still exiting), not every thread so far
+
+    collected = shards.collect()
+    assert len(shards._live) == 0 and len(collected) == 1
+    assert collected[0] == {("requests", ()): 500, ("latency", ()): [500, 0, 250.0, 500]}
+
@@ -0,0 +1,72 @@
+# tests/test_orders.py
+from conftest import make_user
+
+
+def place_order(client, headers, product_id: int) -> dict:
+    client.post("/cart/", json={"product_id": product_id, "quantity": 1}, headers=headers)
+    r = client.post("/checkout/", headers=headers)
+    assert r.status_code == 200
+    return r.json()
+
+
+def test_order_times_are_utc_everywhere(client, make_product):
+    headers = make_user()
+    order = place_order(client, headers, make_product())
+    assert order["created_at"].endswith("Z")
+
+    summary, = client.get("/orders/", params={"summary": "true"}, headers=headers).json()
+    full, = client.get("/orders/", headers=headers).json()
+    detail = client.get(f"/orders/{order['id']}", headers=headers).json()
+    assert summary["created_at"] == full["created_at"] == detail["created_at"] == order["created_at"]
+
+
+def test_history_pages_through_tied_timestamps(client, make_product):
+    from datetime import datetime, timedelta, timezone
+    from app.core.database import SessionLocal
+    from app.core.pagination import encode_cursor
+    from app.orders.models import Order, OrderItem
+
+    headers = make_user()
+    first = place_order(client, headers, make_product())
+    user_id = client.get("/auth/profile", headers=headers).json()["id"]
+    product_id = make_product()
+    noon = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+    with SessionLocal() as session:  # three orders in the same microsecond, two older ones
+        for created_at in (noon, noon, noon, noon - timedelta(days=1), noon - timedelta(days=2)):
+            order = Order(user_id=user_id, total_amount=100.0, status="paid", created_at=created_at)
+            session.add(order)
+            session.flush()
+            session.add(OrderItem(order_id=order.id, product_id=product_id, quantity=2, price_at_purchase=50.0))
+        session.commit()
+
+    for summary in ("false", "true"):
+        everything = client.get("/orders/", params={"summary": summary}, headers=headers).json()
+        assert len(everything) == 6 and everything[0]["id"] == first["id"]
+        keys = [(order["created_at"], order["id"]) for order in everything]
+        assert keys == sorted(keys, reverse=True)  # newest first, ties by id
+
+        pages, cursor = [], None
+        while True:
+            params = {"summary": summary, "limit": 2, **({"cursor": cursor} if cursor else {})}
+            r = client.get("/orders/", params=params, headers=headers)
+            pages.append(r.json())
+            cursor = r.headers.get("X-Next-Cursor")
+            if cursor is None or len(pages) > 6:
+                break
+        assert [order for page in pages for order in page] == everything
+        if summary == "true":
+            assert all("items" not in order for order in everything)
+            assert [(o["item_count"], o["total_quantity"]) for o in everything[1:]] == [(1, 2)] * 5
+        else:
+            assert all(len(order["items"]) == 1 for order in everything)
+
+    # a cursor written with another UTC offset (or none) points at the same place
+    tied = [order for order in everything if order["created_at"] == "2026-03-01T12:00:00Z"]
+    assert len(tied) == 3
+    expected = [order["id"] for order in everything if (order["created_at"], order["id"]) < ("2026-03-01T12:00:00Z", tied[0]["id"])]
+    for written in ("2026-03-01T17:30:00+05:30", "2026-03-01T12:00:00", "2026-03-01T12:00:00Z"):
+        r = client.get("/orders/", params={"cursor": encode_cursor(written, tied[0]["id"]), "limit": 10}, headers=headers)
+        assert [order["id"] for order in r.json()] == expected, written
+    for bad in (["yesterday", 1], [{}, []], ["2026-03-01T12:00:00Z", "1"]):
+        r = client.get("/orders/", params={"cursor": encode_cursor(*bad)}, headers=headers)
+        assert r.status_code == 400
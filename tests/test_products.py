@@ -0,0 +1,65 @@
+# tests/test_products.py
+import pytest
+
+
+@pytest.mark.parametrize("path", ["/products/", "/products/facets"])
+def test_inverted_price_range_is_rejected(client, make_product, path):
+    make_product(price=1250.0)
+    r = client.get(path, params={"min_price": 1300, "max_price": 1200})  # both inside one facet bucket
+    assert r.status_code == 422
+    assert client.get(path, params={"min_price": 1250, "max_price": 1250}).status_code == 200
+
+
+def test_facets_count_what_the_list_returns(client, make_product):
+    make_product(price=1250.0, category="facet-check")
+    make_product(price=1490.0, category="facet-check")
+    params = {"category": "facet-check", "min_price": 1200, "max_price": 1300}
+    listed = client.get("/products/", params=params).json()
+    counts = client.get("/products/facets", params=params).json()
+    assert [p["price"] for p in listed] == [1250.0]
+    assert counts["total"] == 1
+
+
+@pytest.mark.parametrize("sort_by", ["id", "price", "name", "stock"])
+def test_cursor_pages_cover_the_list_once(client, make_product, sort_by):
+    category = f"walk-{sort_by}"
+    for index in range(11):  # repeated prices / names / stocks: pages split inside the ties
+        make_product(price=float(index % 3), stock=index % 2, name=f"p{index % 4}", category=category)
+    params = {"category": category, "sort_by": sort_by}
+    everything = client.get("/products/", params={**params, "page_size": 100}).json()
+
+    seen, cursor = [], None
+    for _ in range(len(everything)):
+        r = client.get("/products/", params={**params, "page_size": 3, **({"cursor": cursor} if cursor else {})})
+        assert r.status_code == 200
+        seen += r.json()
+        cursor = r.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert [p["id"] for p in seen] == [p["id"] for p in everything]
+    assert len(everything) == 11
+
+
+@pytest.mark.parametrize("values", [
+    [{}, []], ["price", [], 1], ["price", "cheap", 1], ["price", 1.0, "1"], ["price", 1.0, True], ["id"],
+])
+def test_malformed_cursor_is_a_400(client, values):
+    from app.core.pagination import encode_cursor
+
+    r = client.get("/products/", params={"sort_by": "price", "cursor": encode_cursor(*values)})
+    assert r.status_code == 400, r.text
+    assert client.get("/products/", params={"cursor": "not base64 json"}).status_code == 400
+
+
+def test_cross_origin_scripts_can_read_the_cursor(monkeypatch, client, make_product):
+    from fastapi.testclient import TestClient
+    from app.core.config import settings
+    from app.main import create_app
+
+    make_product()
+    monkeypatch.setattr(settings, "CORS_ORIGINS", ["https://shop.example.com"])
+    cors = TestClient(create_app())
+    r = cors.get("/products/", params={"page_size": 1}, headers={"Origin": "https://shop.example.com"})
+    assert r.headers["access-control-allow-origin"] == "https://shop.example.com"
+    assert "X-Next-Cursor" in r.headers["access-control-expose-headers"].split(", ")
+    assert "X-Next-Cursor" in r.headers
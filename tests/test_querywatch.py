@@ -0,0 +1,43 @@
+# tests/test_querywatch.py
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+
+@pytest.fixture
+def strict(client, monkeypatch):
+    """An app with the query watch middleware, in strict mode, whose routes use the app's (watched) engine."""
+    from app.core.config import settings
+    from app.core.database import SessionLocal
+    from app.core.querywatch import QueryWatchMiddleware
+
+    monkeypatch.setattr(settings, "QUERY_WATCH", "strict")
+    app = FastAPI()
+    app.add_middleware(QueryWatchMiddleware)
+
+    @app.get("/items/{count}")
+    def items(count: int):
+        with SessionLocal() as session:  # one lookup per item: the N+1 shape
+            return [session.scalar(text("SELECT :id"), {"id": i}) for i in range(count)]
+
+    return app
+
+
+def test_strict_mode_raises_on_n_plus_one(strict):
+    from app.core.config import settings
+    from app.core.querywatch import QueryWatchError
+
+    with TestClient(strict) as client:
+        assert client.get(f"/items/{settings.QUERY_WATCH_N_PLUS_ONE - 1}").status_code == 200
+        with pytest.raises(QueryWatchError, match=r"GET /items/\{count\} ran .* N\+1 suspect"):
+            client.get(f"/items/{settings.QUERY_WATCH_N_PLUS_ONE}")
+
+
+def test_strict_mode_cannot_change_the_response(strict):
+    from app.core.config import settings
+
+    # the check runs once the response has gone out: the client still got it
+    with TestClient(strict, raise_server_exceptions=False) as client:
+        r = client.get(f"/items/{settings.QUERY_WATCH_N_PLUS_ONE}")
+    assert r.status_code == 200 and len(r.json()) == settings.QUERY_WATCH_N_PLUS_ONE
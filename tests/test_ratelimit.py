@@ -0,0 +1,102 @@
+# tests/test_ratelimit.py
+"""RedisRateLimitBackend's scripts on fakeredis (pip install redis fakeredis lupa;
+lupa runs the Lua). Backends on one FakeServer are workers sharing a Redis."""
+import asyncio
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+pytest.importorskip("redis.asyncio")
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+
+@pytest.fixture
+def fake_redis(client, monkeypatch):
+    """One fake Redis server; every backend built during the test talks to it."""
+    import redis.asyncio
+
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(redis.asyncio, "from_url", lambda url: fakeredis.FakeAsyncRedis(server=server))
+    return server
+
+
+def redis_backend():
+    from app.core.ratelimit import _backend_for
+
+    return _backend_for("redis://localhost:6379/0")
+
+
+def test_take_spends_the_burst_then_waits(fake_redis):
+    backend = redis_backend()
+
+    async def takes():
+        return [await backend.take("search:ip:1", rate=1.0, burst=3) for _ in range(4)]
+
+    *admitted, refused = asyncio.run(takes())
+    assert admitted == [0, 0, 0]
+    assert 0 < refused <= 1  # one token at 1/s
+
+
+def test_in_flight_cap_is_shared_by_workers(fake_redis):
+    worker1, worker2 = redis_backend(), redis_backend()
+
+    async def run():
+        results = [await worker1.acquire("signin:ip:1", 2), await worker2.acquire("signin:ip:1", 2)]
+        results.append(await worker1.acquire("signin:ip:1", 2))  # full
+        await worker2.release("signin:ip:1")
+        results.append(await worker1.acquire("signin:ip:1", 2))
+        results.append(await worker1.acquire("signin:ip:2", 2))  # other key
+        return results
+
+    assert asyncio.run(run()) == [True, True, False, True, True]
+
+
+def test_release_after_an_expired_lease_keeps_the_cap(fake_redis, monkeypatch):
+    from app.core.ratelimit import RedisRateLimitBackend
+
+    monkeypatch.setattr(RedisRateLimitBackend, "LEASE_SECONDS", 1)
+    backend = redis_backend()
+
+    async def run():
+        assert await backend.acquire("signin:ip:1", 1)
+        await asyncio.sleep(1.2)  # the request outlived its lease: the slot was freed already
+        await backend.release("signin:ip:1")
+        await backend.release("signin:ip:1")  # a second release is a no-op too
+        count = await fakeredis.FakeAsyncRedis(server=fake_redis).get("ratelimit:in_flight:signin:ip:1")
+        return count, [await backend.acquire("signin:ip:1", 1) for _ in range(2)]
+
+    count, admitted = asyncio.run(run())
+    assert count is None
+    assert admitted == [True, False]
+
+
+@pytest.fixture
+def limited(fake_redis, monkeypatch):
+    from app.core import ratelimit
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(ratelimit, "rate_limit_backend", redis_backend())
+    app = FastAPI()
+
+    @app.get("/expensive", dependencies=[Depends(ratelimit.RateLimit("expensive", per_minute=6, burst=2))])
+    def expensive():
+        return {"ok": True}
+
+    return app
+
+
+def test_rate_limit_dependency_on_redis(limited):
+    with TestClient(limited) as client:
+        assert [client.get("/expensive").status_code for _ in range(2)] == [200, 200]
+        r = client.get("/expensive")
+    assert r.status_code == 429
+    assert 1 <= int(r.headers["Retry-After"]) <= 10  # a token every 10s
+
+
+def test_redis_outage_admits_requests(limited, fake_redis):
+    fake_redis.connected = False
+    with TestClient(limited) as client:
+        assert [client.get("/expensive").status_code for _ in range(3)] == [200, 200, 200]
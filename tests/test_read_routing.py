@@ -0,0 +1,92 @@
+# tests/test_read_routing.py
+"""Replica routing with a second SQLite file as the replica.
+
+The replica is a copy of the primary taken once and never updated, so
+anything written after the copy is replication lag that never ends.
+"""
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+
+from conftest import make_user
+
+
+@pytest.fixture
+def lagging_replica(client, tmp_path, monkeypatch):
+    """Call it to snapshot the primary into replica.db and route reads there."""
+    from app.core import read_routing
+    from app.core.database import engine, replica_set
+    from app.products.catalog_cache import catalog_cache
+
+    catalog_cache.bump()  # nothing cached from earlier tests
+    read_routing.recent_writers.clear()
+    engines = []
+
+    def lagging_replica():
+        path = tmp_path / "replica.db"
+        source, target = sqlite3.connect(engine.url.database), sqlite3.connect(path)
+        source.backup(target)
+        source.close()
+        target.close()
+        engines.append(create_engine(f"sqlite:///{path}"))
+        monkeypatch.setattr(replica_set, "engines", engines[-1:])
+        monkeypatch.setattr(replica_set, "_down_until", [0.0])
+
+    yield lagging_replica
+    monkeypatch.undo()
+    for replica in engines:
+        replica.dispose()
+
+
+def test_catalog_reads_go_to_the_replica_until_it_fails(app, lagging_replica, make_product):
+    from app.core.database import replica_set
+
+    lagging_replica()
+    product_id = make_product()
+    http = TestClient(app)
+    assert http.get(f"/products/{product_id}").status_code == 404  # not on the replica yet
+
+    replica_set.engines[0] = create_engine("sqlite:////nonexistent/replica.db")
+    assert http.get(f"/products/{product_id}").status_code == 200  # retried on the primary
+    assert replica_set.is_down(0)
+    assert http.get(f"/products/{product_id}").status_code == 200  # skipped while down
+
+
+def test_reads_stay_on_the_primary_after_checkout(app, lagging_replica, make_product):
+    from app.core.read_routing import recent_writers
+
+    lagging_replica()
+    product_id = make_product()
+    headers = make_user()
+    http = TestClient(app)
+    http.post("/cart/", json={"product_id": product_id, "quantity": 1}, headers=headers)
+    order = http.post("/checkout/", headers=headers).json()
+
+    def sees_order() -> bool:
+        r = http.get("/orders/", params={"summary": "true"}, headers=headers)
+        return any(row["id"] == order["id"] for row in r.json())
+
+    assert sees_order()
+    recent_writers.clear()  # another worker: only the cookie says "primary"
+    assert sees_order()
+    http.cookies.clear()  # window over
+    assert not sees_order()
+
+
+def test_admin_write_does_not_cache_the_replica_copy(app, lagging_replica, make_product, admin_headers, monkeypatch):
+    from app.core import read_routing
+
+    product_id = make_product(price=100.0)
+    lagging_replica()
+    http = TestClient(app)
+    assert http.get(f"/products/{product_id}").json()["price"] == 100.0
+
+    body = {"name": "Test product", "description": "A product under test", "price": 120.0, "stock": 10,
+            "category": "electronics", "image_url": "https://example.com/p.png"}
+    assert http.put(f"/admin/products/{product_id}", json=body, headers=admin_headers).status_code == 200
+    assert http.get(f"/products/{product_id}").json()["price"] == 120.0  # refilled from the primary
+
+    monkeypatch.setattr(read_routing, "_all_primary_until", 0.0)  # window over
+    assert http.get(f"/products/{product_id}").json()["price"] == 120.0  # cached, not the replica's 100